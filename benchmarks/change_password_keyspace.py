@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import time
+from project.core import get_redis
+from benchmarks.common import app_client, auth_headers, create_user, delete_keys, login, summarize
+
+
+# ==============================
+# قياس زمن تغيير كلمة المرور مع عدد كبير من المفاتيح غير المرتبطة في Redis
+# ==============================
+
+# إبطال الجلسات عند تغيير كلمة المرور كان يمر على كامل مفاتيح Redis (SCAN)،
+# فيزداد زمنه مع عدد جلسات جميع المستخدمين. يقيس هذا السكربت زمن /change-password
+# قبل إضافة مفاتيح جلسات لمستخدمين آخرين وبعدها، ويجب أن يبقى الزمن ثابتًا.
+# python -m benchmarks.change_password_keyspace [--keys 1000000] [--runs 10]
+
+UNRELATED_PREFIX = "user_token:bench_other_"
+BATCH_SIZE = 10000
+
+
+async def fill_unrelated_keys(count: int) -> None:
+    redis = get_redis()
+    for start in range(0, count, BATCH_SIZE):
+        async with redis.pipeline(transaction=False) as pipe:
+            for index in range(start, min(count, start + BATCH_SIZE)):
+                pipe.set(f"{UNRELATED_PREFIX}{index}:{index:022d}", "active", ex=3600)
+            await pipe.execute()
+
+
+async def measure(client, user: dict, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        headers = auth_headers(await login(client, user))
+        new_password = f"{user['hashed_password']}x"
+        start = time.perf_counter()
+        response = await client.put(
+            "/api/auth/change-password",
+            headers=headers,
+            json={"old_password": user["hashed_password"], "new_password": new_password},
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        user["hashed_password"] = new_password
+        # iat بالثواني الصحيحة، والتوكن الصادر في نفس ثانية تغيير كلمة المرور مرفوض
+        await asyncio.sleep(1)
+    return samples
+
+
+async def main(keys: int, runs: int) -> None:
+    async with app_client() as client:
+        user = await create_user(client)
+
+        print(f"unrelated keys: 0        change-password {summarize(await measure(client, user, runs))}")
+        await fill_unrelated_keys(keys)
+        try:
+            print(f"unrelated keys: {keys:<8} change-password {summarize(await measure(client, user, runs))}")
+        finally:
+            await delete_keys(f"{UNRELATED_PREFIX}*", BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="زمن تغيير كلمة المرور مع عدد كبير من المفاتيح غير المرتبطة")
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.keys, args.runs))
@@ -0,0 +1,132 @@
+import asyncio
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+from httpx import ASGITransport, AsyncClient
+from main import app
+from project.core import engine, get_redis, limiter
+
+
+# ==============================
+# أدوات مشتركة للقياسات
+# ==============================
+
+# القياسات تشغّل التطبيق داخل نفس العملية (دون شبكة HTTP) مع Redis وقاعدة البيانات
+# المحددتين في الإعدادات (.env)، حتى تقيس كلفة المسار نفسه فقط.
+# التشغيل من جذر المشروع: poetry run python -m benchmarks.<اسم القياس>
+
+
+@asynccontextmanager
+async def app_client():
+    """
+    تشغيل دورة حياة التطبيق وإرجاع عميل HTTP داخلي له.
+    """
+    # حدود عدد المحاولات لا تُحتسب أثناء القياس
+    limiter.enabled = False
+    try:
+        async with app.router.lifespan_context(app):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://bench") as client:
+                yield client
+    finally:
+        await engine.dispose()
+
+
+async def create_user(client: AsyncClient, password: str = "bench-password") -> dict:
+    """
+    تسجيل مستخدم جديد باسم عشوائي وإرجاع بياناته.
+    """
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    user = {
+        "firstName": "bench",
+        "lastName": "user",
+        "username": username,
+        "gender": True,
+        "email": f"{username}@example.com",
+        "hashed_password": password,
+    }
+    response = await client.post("/api/auth/register", json=user)
+    response.raise_for_status()
+    # iat بالثواني الصحيحة، والتوكن الصادر في نفس ثانية last_password_change مرفوض
+    await asyncio.sleep(1)
+    return user
+
+
+async def login(client: AsyncClient, user: dict) -> dict:
+    """
+    تسجيل الدخول وإرجاع رمزي الوصول والتحديث.
+    """
+    response = await client.post(
+        "/api/auth/login",
+        json={"username": user["username"], "password": user["hashed_password"]},
+    )
+    response.raise_for_status()
+    return response.json()["data"]
+
+
+async def delete_keys(pattern: str, batch_size: int = 10000) -> None:
+    """
+    حذف جميع مفاتيح Redis المطابقة للنمط على دفعات (SCAN ثم UNLINK) دون حجب الخادم.
+    """
+    redis = get_redis()
+    batch = []
+    async for key in redis.scan_iter(match=pattern, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            await redis.unlink(*batch)
+            batch.clear()
+    if batch:
+        await redis.unlink(*batch)
+
+
+def auth_headers(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def throughput(
+    request: Callable[[], Awaitable], seconds: float, concurrency: int
+) -> tuple[int, float]:
+    """
+    تنفيذ الطلب بشكل متزامن من عدة عملاء طوال المدة المحددة، وإرجاع (عدد الطلبات، الطلبات في الثانية).
+    """
+    deadline = time.perf_counter() + seconds
+    count = 0
+
+    async def worker():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            await request()
+            count += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return count, count / (time.perf_counter() - start)
+
+
+async def latencies(request: Callable[[], Awaitable], count: int) -> list[float]:
+    """
+    تنفيذ الطلب بالتتابع وإرجاع زمن كل تنفيذ بالميلي ثانية.
+    """
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await request()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: list[float]) -> str:
+    """
+    ملخص الأزمنة: الوسيط و p95 و p99 بالميلي ثانية.
+    """
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return (
+        f"p50={statistics.median(ordered):.2f}ms "
+        f"p95={percentile(0.95):.2f}ms p99={percentile(0.99):.2f}ms"
+    )
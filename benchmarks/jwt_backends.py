@@ -0,0 +1,103 @@
+import argparse
+import time
+import tracemalloc
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from project.core.jwt_backend import JWT_BACKENDS
+
+
+# ==============================
+# مقارنة أداء مكتبات JWT
+# ==============================
+
+# لكل مكتبة (JWT_BACKEND) وخوارزمية: عدد عمليات التوقيع والتحقق في الثانية،
+# ومتوسط أقصى ذاكرة محجوزة أثناء كل استدعاء (tracemalloc، بعد عمليات إحماء).
+# التوكن بنفس حجم توكن الوصول الذي تصدره الخدمة. python-jose لا يدعم EdDSA.
+# python -m benchmarks.jwt_backends [--seconds 2] [--allocation-calls 1000]
+
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+PEMS = {
+    "HS256": "benchmark-secret-key-with-enough-length-for-hs256",
+    "ES256": _pem(ec.generate_private_key(ec.SECP256R1())),
+    "EdDSA": _pem(ed25519.Ed25519PrivateKey.generate()),
+}
+
+UNSUPPORTED = {("jose", "EdDSA")}
+
+
+def claims() -> dict:
+    now = int(time.time())
+    return {
+        "sub": "bench_user",
+        "uid": "6f1c1d4e-8a55-4c8f-9d38-1b0f6f7f2a10",
+        "iat": now,
+        "exp": now + 3600,
+        "jti": "3b0e8a3c5f7d4e21a9c6b2d1e0f9a8b7",
+    }
+
+
+def ops_per_second(call, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            call()
+        count += 50
+    return count / (time.perf_counter() - start)
+
+
+def bytes_per_call(call, calls: int) -> float:
+    # tracemalloc لا يحسب مجموع الحجوزات، لذلك يُقاس أقصى حجز أثناء كل استدعاء ويُؤخذ المتوسط
+    for _ in range(100):
+        call()
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+    finally:
+        tracemalloc.stop()
+    return total / calls
+
+
+def main(seconds: float, allocation_calls: int) -> None:
+    print(f"{'backend':<8} {'alg':<6} {'encode/s':>10} {'decode/s':>10} {'encode B':>9} {'decode B':>9}")
+    for name, backend_class in JWT_BACKENDS.items():
+        backend = backend_class()
+        for algorithm, pem in PEMS.items():
+            if (name, algorithm) in UNSUPPORTED:
+                continue
+            private_key = backend.load_private_key(pem, algorithm)
+            public_key = private_key if algorithm == "HS256" else backend.public_key(private_key)
+            payload = claims()
+            token = backend.encode(payload, private_key, algorithm, {"kid": "bench"})
+
+            encode = lambda: backend.encode(payload, private_key, algorithm, {"kid": "bench"})
+            decode = lambda: backend.decode(token, public_key, [algorithm])
+            print(
+                f"{name:<8} {algorithm:<6} "
+                f"{ops_per_second(encode, seconds):>10.0f} {ops_per_second(decode, seconds):>10.0f} "
+                f"{bytes_per_call(encode, allocation_calls):>9.0f} "
+                f"{bytes_per_call(decode, allocation_calls):>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="مقارنة أداء مكتبات JWT")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--allocation-calls", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.seconds, args.allocation_calls)
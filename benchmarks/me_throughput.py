@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+from project.core import verified_token_cache
+from benchmarks.common import app_client, auth_headers, create_user, login, throughput
+
+
+# ==============================
+# قياس أداء /me مع الذاكرة المؤقتة للتوكنات وبدونها
+# ==============================
+
+# نفس التوكن يُرسل من عدة عملاء متزامنين، مرة مع تعطيل الذاكرة المؤقتة
+# (فك التوكن + Redis + قاعدة البيانات في كل طلب) ومرة مع تفعيلها (AUTH_CACHE_ENABLED).
+# python -m benchmarks.me_throughput [--seconds 5] [--concurrency 20]
+
+
+async def main(seconds: float, concurrency: int) -> None:
+    async with app_client() as client:
+        user = await create_user(client)
+        headers = auth_headers(await login(client, user))
+
+        async def read_me():
+            response = await client.get("/api/auth/me", headers=headers)
+            response.raise_for_status()
+
+        for enabled in (False, True):
+            verified_token_cache.enabled = enabled
+            verified_token_cache.clear()
+            # طلب تمهيدي يملأ الذاكرة المؤقتة عند تفعيلها
+            await read_me()
+            count, rate = await throughput(read_me, seconds, concurrency)
+            state = "on " if enabled else "off"
+            print(f"auth cache {state}: {count} requests, {rate:.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="قياس أداء /me مع الذاكرة المؤقتة للتوكنات وبدونها")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.concurrency))
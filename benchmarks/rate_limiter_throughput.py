@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import time
+import uuid
+from limits import parse_many
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from project.core import get_redis, limiter, parse_limits, settings
+
+
+# ==============================
+# مقارنة أداء مقيّد معدل الطلبات مع slowapi
+# ==============================
+
+# حدان لكل طلب كما في مسار تسجيل الدخول ("10/minute" و "30/day")، بأعداد كبيرة حتى لا يُرفض أي طلب
+# (الفاصل بين الطلبات في GCRA بالميلي ثانية، لذلك لا يقل عن 1 ms):
+# - المقيّد الحالي: سكربت واحد غير متزامن لجميع الحدود في كل طلب
+# - slowapi: تخزين limits المتزامن (الاستراتيجية الافتراضية fixed-window)، طلب إلى Redis لكل حد
+#   ويحجب حلقة الأحداث أثناء انتظاره
+# يُقاس عدد الطلبات في الثانية لعدة عملاء متزامنين، ومعه أطول توقف لحلقة الأحداث.
+# python -m benchmarks.rate_limiter_throughput [--requests 20000] [--concurrency 50]
+
+LIMITS = "60000/minute;86400000/day"
+
+
+class LoopLag:
+    """
+    قياس أطول تأخير في حلقة الأحداث (مؤشر على العمليات الحاجبة).
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.worst = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.worst = max(self.worst, time.perf_counter() - start - self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def run(hit, requests: int, concurrency: int) -> tuple[float, float]:
+    remaining = requests
+
+    async def worker(identity: str):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await hit(identity)
+            # إفساح المجال لبقية الطلبات كما يحدث بين طلبات HTTP الحقيقية
+            await asyncio.sleep(0)
+
+    with LoopLag() as lag:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(f"10.0.0.{index}") for index in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, lag.worst * 1000
+
+
+async def main(requests: int, concurrency: int) -> None:
+    scope = f"bench_{uuid.uuid4().hex[:8]}"
+    native_limits = parse_limits(LIMITS)
+
+    async def native_hit(identity: str):
+        await limiter.hit(scope, identity, native_limits)
+
+    redis_url = settings.REDIS_URL or (
+        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+    )
+    storage = storage_from_string(redis_url)
+    slowapi_limiter = FixedWindowRateLimiter(storage)
+    slowapi_limits = parse_many(LIMITS)
+
+    async def slowapi_hit(identity: str):
+        # slowapi يستدعي hit لكل حد بشكل متزامن داخل حلقة الأحداث
+        for item in slowapi_limits:
+            slowapi_limiter.hit(item, scope, identity)
+
+    try:
+        for name, hit in (("native async limiter", native_hit), ("slowapi (limits)", slowapi_hit)):
+            await hit("warm-up")
+            rate, lag = await run(hit, requests, concurrency)
+            print(f"{name:<22} {rate:>9.0f} req/s   worst event-loop stall {lag:.1f} ms")
+    finally:
+        await get_redis().aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="مقارنة أداء مقيّد معدل الطلبات مع slowapi")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
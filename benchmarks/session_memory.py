@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+from uuid import uuid4
+from project.core import get_redis, issue_token, settings
+from project.services.token_state import store_active_token
+from project.services.token_key_format import token_key_format
+from benchmarks.common import delete_keys
+
+
+# ==============================
+# قياس ذاكرة Redis لكل جلسة
+# ==============================
+
+# يخزّن N جلسة عبر مسار تسجيل الدخول الفعلي (store_active_token) ويقيس الفرق في used_memory،
+# ثم يكرر نفس القياس بالصيغة القديمة للمفاتيح (التوكن الكامل داخل المفتاح) للمقارنة.
+# يحتاج إلى خادم Redis حقيقي (INFO غير مدعوم في fakeredis).
+# python -m benchmarks.session_memory [--sessions 100000 1000000]
+
+USERNAME_PREFIX = "bench_mem_"
+CONCURRENCY = 500
+
+
+async def used_memory() -> int:
+    return int((await get_redis().info("memory"))["used_memory"])
+
+
+async def store_sessions(count: int, legacy: bool) -> None:
+    redis = get_redis()
+    ttl = settings.ACCESS_TOKEN_EXPIRE_24HOURS * 3600
+
+    async def store(index: int):
+        context = issue_token({"sub": f"{USERNAME_PREFIX}{index}", "uid": str(uuid4())})
+        if legacy:
+            # الصيغة القديمة: التوكن الكامل جزء من المفتاح
+            await redis.set(token_key_format(context.subject, context.token), "active", ex=ttl)
+        else:
+            await store_active_token(redis, context)
+
+    for start in range(0, count, CONCURRENCY):
+        await asyncio.gather(*(store(index) for index in range(start, min(count, start + CONCURRENCY))))
+
+
+async def bytes_per_session(count: int, legacy: bool) -> float:
+    await delete_keys(f"*{USERNAME_PREFIX}*")
+    before = await used_memory()
+    await store_sessions(count, legacy)
+    after = await used_memory()
+    await delete_keys(f"*{USERNAME_PREFIX}*")
+    return (after - before) / count
+
+
+async def main(sizes: list[int]) -> None:
+    redis = get_redis()
+    try:
+        for count in sizes:
+            current = await bytes_per_session(count, legacy=False)
+            legacy = await bytes_per_session(count, legacy=True)
+            print(
+                f"{count:>8} sessions: jti keys {current:.0f} B/session, "
+                f"full-token keys {legacy:.0f} B/session ({settings.SESSION_STRATEGY})"
+            )
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ذاكرة Redis لكل جلسة")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions))
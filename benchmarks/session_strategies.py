@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+from uuid import uuid4
+from project.core import get_redis, issue_token, settings, verified_token_cache
+from project.services.token_state import logout_token, store_active_token
+from benchmarks.common import (
+    app_client,
+    auth_headers,
+    create_user,
+    delete_keys,
+    latencies,
+    login,
+    summarize,
+)
+
+
+# ==============================
+# مقارنة طرق تتبع الجلسات (SESSION_STRATEGY)
+# ==============================
+
+# لكل وضع (hybrid / allowlist / denylist):
+# - ذاكرة Redis لكل جلسة (MEMORY USAGE لمفاتيحها) بعد تسجيل دخول N جلسة وخروج نسبة منها
+# - حجم الكتابة لكل جلسة: عدد التغييرات على المفاتيح (rdb_changes_since_last_save)
+#   وحجم الأوامر المرسلة إلى Redis (total_net_input_bytes)
+# - زمن /me بالتتابع مع تعطيل الذاكرة المؤقتة للتوكنات، حتى يُقرأ Redis في كل طلب
+# الوضع يُغيّر أثناء التشغيل، ويحتاج إلى خادم Redis حقيقي (INFO غير مدعوم في fakeredis).
+# python -m benchmarks.session_strategies [--sessions 100000] [--logout-ratio 0.2] [--requests 2000]
+
+MODES = ("hybrid", "allowlist", "denylist")
+USERNAME_PREFIX = "bench_mode_"
+CONCURRENCY = 500
+
+
+async def redis_counters() -> tuple[int, int]:
+    info = await get_redis().info()
+    return (
+        int(info["rdb_changes_since_last_save"]),
+        int(info["total_net_input_bytes"]),
+    )
+
+
+async def sessions_memory() -> int:
+    # مجموع MEMORY USAGE لمفاتيح الجلسات؛ فرق used_memory غير ثابت بين الأوضاع،
+    # لأن Redis لا يعيد كل الذاكرة فور حذف مفاتيح الوضع السابق
+    redis = get_redis()
+    keys = [key async for key in redis.scan_iter(match=f"*{USERNAME_PREFIX}*", count=10000)]
+    total = 0
+    for start in range(0, len(keys), 10000):
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys[start : start + 10000]:
+                pipe.memory_usage(key, samples=0)
+            total += sum(size or 0 for size in await pipe.execute())
+    return total
+
+
+async def in_batches(func, items) -> None:
+    for start in range(0, len(items), CONCURRENCY):
+        await asyncio.gather(*(func(item) for item in items[start : start + CONCURRENCY]))
+
+
+async def session_costs(count: int, logout_ratio: float) -> tuple[float, float, float]:
+    """
+    تسجيل دخول count جلسة وخروج نسبة منها، وإرجاع (الذاكرة، التغييرات، البايتات) لكل جلسة.
+    """
+    redis = get_redis()
+    contexts = [
+        issue_token({"sub": f"{USERNAME_PREFIX}{index}", "uid": str(uuid4())})
+        for index in range(count)
+    ]
+    await delete_keys(f"*{USERNAME_PREFIX}*")
+    changes_before, input_before = await redis_counters()
+
+    await in_batches(lambda context: store_active_token(redis, context), contexts)
+    await in_batches(
+        lambda context: logout_token(redis, context), contexts[: int(count * logout_ratio)]
+    )
+
+    changes_after, input_after = await redis_counters()
+    memory = await sessions_memory()
+    await delete_keys(f"*{USERNAME_PREFIX}*")
+    return (
+        memory / count,
+        (changes_after - changes_before) / count,
+        (input_after - input_before) / count,
+    )
+
+
+async def me_latency(client, user: dict, requests: int) -> str:
+    # تسجيل دخول جديد في كل وضع، لأن التوكنات الصادرة في denylist لا مفاتيح "active" لها
+    headers = auth_headers(await login(client, user))
+
+    async def read_me():
+        response = await client.get("/api/auth/me", headers=headers)
+        response.raise_for_status()
+
+    await read_me()
+    return summarize(await latencies(read_me, requests))
+
+
+async def main(sessions: int, logout_ratio: float, requests: int) -> None:
+    verified_token_cache.enabled = False
+    async with app_client() as client:
+        user = await create_user(client)
+        print(f"{sessions} sessions, {logout_ratio:.0%} logged out, /me x {requests}")
+        for mode in MODES:
+            settings.SESSION_STRATEGY = mode
+            memory, changes, input_bytes = await session_costs(sessions, logout_ratio)
+            latency = await me_latency(client, user, requests)
+            print(
+                f"{mode:<9} memory {memory:>6.0f} B/session  "
+                f"writes {changes:.2f} keys/session  input {input_bytes:>5.0f} B/session  "
+                f"/me {latency}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="مقارنة طرق تتبع الجلسات")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--logout-ratio", type=float, default=0.2)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.logout_ratio, args.requests))
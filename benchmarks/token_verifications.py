@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import time
+from project.core import get_jwt_backend, settings, verified_token_cache
+from benchmarks.common import app_client, auth_headers, create_user, login
+
+
+# ==============================
+# عدد عمليات التحقق من توقيع JWT لكل طلب
+# ==============================
+
+# يُحسب كل استدعاء لـ decode في مكتبة JWT المستخدمة أثناء تنفيذ كل مسار (دون خطوات التجهيز
+# مثل تسجيل الدخول المسبق)، مع متوسط زمن عملية التحقق الواحدة.
+# التوكن يجب أن يُفك مرة واحدة فقط لكل طلب مهما كان عدد الخدمات التي تستخدمه.
+# python -m benchmarks.token_verifications [--runs 20]
+
+INTROSPECTION_KEY = "bench-introspection-key"
+INTROSPECTION_BATCH = 10
+
+
+class VerificationCounter:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.active = False
+
+    def install(self) -> None:
+        backend = get_jwt_backend()
+        decode = backend.decode
+
+        def counting_decode(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return decode(*args, **kwargs)
+            finally:
+                if self.active:
+                    self.calls += 1
+                    self.seconds += time.perf_counter() - start
+
+        backend.decode = counting_decode
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+
+
+async def main(runs: int) -> None:
+    counter = VerificationCounter()
+    counter.install()
+    settings.INTROSPECTION_API_KEYS = [INTROSPECTION_KEY]
+
+    async with app_client() as client:
+        user = await create_user(client)
+        results = []
+
+        async def run(name: str, prepare, request, count: int = runs):
+            counter.reset()
+            for _ in range(count):
+                prepared = await prepare()
+                counter.active = True
+                try:
+                    response = await request(prepared)
+                finally:
+                    counter.active = False
+                response.raise_for_status()
+            per_call = counter.seconds / counter.calls * 1e6 if counter.calls else 0.0
+            results.append((name, counter.calls / count, per_call))
+
+        async def fresh_headers():
+            return auth_headers(await login(client, user))
+
+        async def nothing():
+            return None
+
+        headers = await fresh_headers()
+
+        verified_token_cache.enabled = False
+        await run("GET /me", nothing, lambda _: client.get("/api/auth/me", headers=headers))
+        verified_token_cache.enabled = True
+        await client.get("/api/auth/me", headers=headers)
+        await run("GET /me (auth cache)", nothing, lambda _: client.get("/api/auth/me", headers=headers))
+        verified_token_cache.enabled = False
+
+        await run(
+            "POST /login",
+            nothing,
+            lambda _: client.post(
+                "/api/auth/login",
+                json={"username": user["username"], "password": user["hashed_password"]},
+            ),
+        )
+        await run(
+            "PATCH /update-profile",
+            nothing,
+            lambda _: client.patch(
+                "/api/auth/update-profile", headers=headers, json={"firstName": "bench"}
+            ),
+        )
+        await run(
+            "POST /logout",
+            fresh_headers,
+            lambda prepared: client.post("/api/auth/logout", headers=prepared),
+        )
+
+        refresh_token = (await login(client, user))["refresh_token"]
+
+        async def refresh(_):
+            nonlocal refresh_token
+            response = await client.post(
+                "/api/auth/refresh-token", json={"refresh_token": refresh_token}
+            )
+            refresh_token = response.json()["data"]["refresh_token"]
+            return response
+
+        await run("POST /refresh-token", nothing, refresh)
+
+        tokens = [(await login(client, user))["access_token"] for _ in range(INTROSPECTION_BATCH)]
+        await run(
+            f"POST /introspect ({INTROSPECTION_BATCH} tokens)",
+            nothing,
+            lambda _: client.post(
+                "/api/auth/introspect",
+                headers={"X-API-Key": INTROSPECTION_KEY},
+                json={"tokens": tokens},
+            ),
+        )
+
+        async def change_password(prepared):
+            new_password = f"{user['hashed_password']}x"
+            response = await client.put(
+                "/api/auth/change-password",
+                headers=prepared,
+                json={"old_password": user["hashed_password"], "new_password": new_password},
+            )
+            user["hashed_password"] = new_password
+            return response
+
+        async def headers_after_password_change():
+            # iat بالثواني الصحيحة، والتوكن الصادر في نفس ثانية تغيير كلمة المرور مرفوض
+            await asyncio.sleep(1)
+            return await fresh_headers()
+
+        await run("PUT /change-password", headers_after_password_change, change_password, count=3)
+        await run(
+            "PATCH /deactivate-account",
+            headers_after_password_change,
+            lambda prepared: client.patch("/api/auth/deactivate-account", headers=prepared),
+            count=1,
+        )
+
+    print(f"{'endpoint':<32} {'verifications/request':>22} {'us/verification':>16}")
+    for name, per_request, per_call in results:
+        print(f"{name:<32} {per_request:>22.2f} {per_call:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="عدد عمليات التحقق من توقيع JWT لكل طلب")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
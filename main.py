@@ -1,27 +1,47 @@
 import os
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from project.apis.v1 import auth_system
+from project.services import prepare_token_partitions, token_reaper
 from fastapi.middleware.cors import CORSMiddleware
 from project.core import (
     settings,
     CustomException,
     SuccessResponse,
     create_tables,
+    engine,
+    replica_engines,
+    pool_autoscaler,
+    load_signing_keys,
+    get_jwks,
     get_redis,
-    custom_rate_limit_handler,
+    metrics,
+    password_hasher,
+    limiter,
+    RateLimitMiddleware,
     custom_http_exception_handler,
 )
 from contextlib import asynccontextmanager
-from slowapi.errors import RateLimitExceeded
 
 
-# إنشاء الجداول في قاعدة البيانات تلقائياً عند بدء التشغيل
+# إنشاء الجداول في قاعدة البيانات تلقائياً عند بدء التشغيل (خارج بيئة الإنتاج)
 # والتحقق من اتصال ريديس
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting up...")
-    await create_tables()
+    # تحميل مفاتيح توقيع JWT والتحقق منها قبل استقبال الطلبات
+    load_signing_keys()
+    # في الإنتاج يُدار المخطط عبر الترحيلات فقط (alembic upgrade head)
+    if settings.ENVIRONMENT != "production":
+        await create_tables()
+        await prepare_token_partitions()
+    # تشغيل مجمع عمليات تشفير كلمات المرور قبل استقبال الطلبات
+    password_hasher.start()
+    # تشغيل مهمة تنظيف التوكنات المنتهية (دون أي DDL عند التشغيل)
+    await token_reaper.start()
+    # التحجيم التكيفي لمجمعات اتصالات قاعدة البيانات (POOL_ADAPTIVE)
+    await pool_autoscaler.start(engine, *replica_engines)
     try:
         redis_: Redis | None = get_redis()
         await redis_.ping()
@@ -30,17 +50,20 @@ async def lifespan(app: FastAPI):
         print(f"❌ Redis not connected: {e}")
     yield
     print("🛑 Shutting down...")
+    await token_reaper.stop()
+    await pool_autoscaler.stop()
+    password_hasher.shutdown()
 
 
 # إنشاء تطبيق FastAPI
 app = FastAPI(lifespan=lifespan, title=settings.APP_NAME, version=settings.VERSION)
 
-# تضمين إعداد استثناءات المقيّد بعدد مرات المحاولات
-app.add_exception_handler(RateLimitExceeded, custom_rate_limit_handler)
-
 # تضمين إعداد استثناءات HTTP مخصصة
 app.add_exception_handler(CustomException, custom_http_exception_handler)
 
+# تطبيق حدود عدد المحاولات لكل مسار قبل تنفيذ أي dependency
+app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
 # إعدادات CORS للسماح بالوصول من الواجهة الأمامية
 app.add_middleware(
     CORSMiddleware,
@@ -71,6 +94,23 @@ async def root():
     )
 
 
+# المفاتيح العامة للتحقق من التوكنات محليًا في الخدمات الأخرى (بصيغة JWKS القياسية)
+@app.get("/.well-known/jwks.json")
+async def read_jwks():
+    return JSONResponse(
+        content=get_jwks(),
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_CACHE_SECONDS}"},
+    )
+
+
+# عرض مقاييس الخدمات الداخلية (معطل افتراضيًا)
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics")
+    async def read_metrics():
+        return SuccessResponse(message="تم جلب المقاييس بنجاح", data=metrics.snapshot())
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,59 @@
+"""المخطط الأولي (users و tokens كما كانت تُنشأ عبر create_all)
+
+قواعد البيانات التي أُنشئت سابقًا عبر create_all تُعلَّم بهذه النسخة دون تنفيذها:
+alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("firstName", sa.String(255), nullable=False),
+        sa.Column("lastName", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(255), nullable=False, unique=True),
+        sa.Column("gender", sa.Boolean(), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("emailIsVerified", sa.Boolean(), nullable=False),
+        sa.Column("phoneNumber", sa.String(20)),
+        sa.Column("locations", sa.String(255)),
+        sa.Column("birthDate", sa.Date()),
+        sa.Column("birthPlace", sa.String(255)),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("profilePhoto", sa.String(255)),
+        sa.Column("registrationDate", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("isActive", sa.Boolean(), nullable=False),
+        sa.Column("last_password_change", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_table(
+        "tokens",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("token", sa.String(500), nullable=False, unique=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tokens")
+    op.drop_table("users")
@@ -0,0 +1,54 @@
+"""رموز تحديث معتمة محفوظة ببصمتها، وفهارس مسارات الاستعلام الأساسية
+
+رموز التحديث السابقة (JWT) لا يمكن تحويلها إلى بصمات صالحة، فتُحذف
+ويحتاج المستخدمون إلى تسجيل الدخول مجددًا.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM tokens")
+    with op.batch_alter_table("tokens") as batch:
+        batch.drop_column("token")
+        batch.add_column(sa.Column("token_digest", sa.String(64), nullable=False))
+        batch.create_unique_constraint("uq_tokens_token_digest", ["token_digest"])
+
+    # التوكنات النشطة لكل مستخدم مرتبة بوقت الإنشاء (تطبيق الحد الأقصى للجلسات)
+    op.create_index(
+        "ix_tokens_user_id_is_active_created_at",
+        "tokens",
+        ["user_id", "is_active", "created_at"],
+    )
+    # مهمة التنظيف: التوكنات المنتهية، والمعطلة حسب وقت إنشائها
+    op.create_index("ix_tokens_expires_at", "tokens", ["expires_at"])
+    op.create_index(
+        "ix_tokens_inactive_created_at",
+        "tokens",
+        ["created_at"],
+        postgresql_where=sa.text("NOT is_active"),
+        sqlite_where=sa.text("NOT is_active"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tokens_inactive_created_at", table_name="tokens")
+    op.drop_index("ix_tokens_expires_at", table_name="tokens")
+    op.drop_index("ix_tokens_user_id_is_active_created_at", table_name="tokens")
+
+    op.execute("DELETE FROM tokens")
+    with op.batch_alter_table("tokens") as batch:
+        batch.drop_constraint("uq_tokens_token_digest", type_="unique")
+        batch.drop_column("token_digest")
+        batch.add_column(sa.Column("token", sa.String(500), nullable=False))
+        batch.create_unique_constraint("tokens_token_key", ["token"])
@@ -0,0 +1,148 @@
+"""تقسيم جدول التوكنات حسب expires_at (PostgreSQL مع TOKENS_PARTITIONED فقط)
+
+يُنفذ التحويل فقط إذا كان الإعداد مفعلًا والجدول غير مقسم، وإلا لا يفعل شيئًا.
+يُفعّل TOKENS_PARTITIONED قبل أول alembic upgrade head على قاعدة بيانات جديدة؛
+ولا يُستخدم downgrade لتفعيله على قاعدة بيانات قائمة، لأنه يمر بالترحيل 0004
+ويحذف العمود users.tenant وبياناته.
+تُنقل التوكنات غير المنتهية فقط، فالمنتهية لا فائدة منها.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timedelta, timezone
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from project.core import settings
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, user_id, token_digest, is_active, created_at, expires_at"
+INDEXES = (
+    "ix_tokens_user_id_is_active_created_at",
+    "ix_tokens_expires_at",
+    "ix_tokens_inactive_created_at",
+)
+
+# أقسام الجدول كما تنشئها مهمة التنظيف وقت كتابة هذا الترحيل (نفس التسمية والمحاذاة)،
+# مكتوبة هنا مباشرة حتى لا يتغير ما يفعله الترحيل إذا تغيرت الخدمة لاحقًا
+PARTITION_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _partition_ranges(now: datetime) -> list[tuple[str, datetime, datetime]]:
+    span = timedelta(days=max(1, settings.TOKENS_PARTITION_DAYS))
+    horizon = now + timedelta(weeks=settings.ACCESS_TOKEN_EXPIRE_WEEK) + span
+    start = PARTITION_EPOCH + ((now - PARTITION_EPOCH) // span) * span
+
+    ranges = []
+    while start < horizon:
+        ranges.append((f"tokens_p{start:%Y%m%d}", start, start + span))
+        start += span
+    return ranges
+
+
+def _is_partitioned() -> bool:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = 'tokens'::regclass"
+            )
+        ).scalar()
+    )
+
+
+def _rename_old_table() -> None:
+    # أسماء الفهارس والمفتاح الأساسي عامة على مستوى المخطط، فتُحرر قبل إنشاء الجدول الجديد
+    op.execute("ALTER TABLE tokens RENAME TO tokens_old")
+    op.execute("ALTER TABLE tokens_old RENAME CONSTRAINT tokens_pkey TO tokens_old_pkey")
+    for index in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def _create_tokens_table(partitioned: bool) -> None:
+    op.create_table(
+        "tokens",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("token_digest", sa.String(64), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint(
+            *(("id", "expires_at") if partitioned else ("id",)), name="tokens_pkey"
+        ),
+        **({"postgresql_partition_by": "RANGE (expires_at)"} if partitioned else {}),
+    )
+    op.create_index(
+        "ix_tokens_user_id_is_active_created_at",
+        "tokens",
+        ["user_id", "is_active", "created_at"],
+    )
+    op.create_index("ix_tokens_expires_at", "tokens", ["expires_at"])
+    op.create_index(
+        "ix_tokens_inactive_created_at",
+        "tokens",
+        ["created_at"],
+        postgresql_where=sa.text("NOT is_active"),
+    )
+    if partitioned:
+        op.create_index(
+            "ix_tokens_token_digest", "tokens", ["token_digest", "expires_at"], unique=True
+        )
+    else:
+        op.create_unique_constraint("uq_tokens_token_digest", "tokens", ["token_digest"])
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql" or not settings.TOKENS_PARTITIONED:
+        return
+    if _is_partitioned():
+        return
+
+    _rename_old_table()
+    op.execute("ALTER TABLE tokens_old DROP CONSTRAINT IF EXISTS uq_tokens_token_digest")
+    _create_tokens_table(partitioned=True)
+
+    # إنشاء الأقسام قبل نقل البيانات حتى يبقى القسم الاحتياطي فارغًا
+    for name, start, end in _partition_ranges(datetime.now(timezone.utc)):
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tokens "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    # قسم احتياطي حتى لا يفشل الإدراج إذا تأخر إنشاء الأقسام
+    op.execute("CREATE TABLE IF NOT EXISTS tokens_default PARTITION OF tokens DEFAULT")
+
+    op.execute(
+        f"INSERT INTO tokens ({COLUMNS}) SELECT {COLUMNS} FROM tokens_old "
+        "WHERE expires_at > now()"
+    )
+    op.drop_table("tokens_old")
+
+
+def downgrade() -> None:
+    if not _is_partitioned():
+        return
+
+    _rename_old_table()
+    op.execute("DROP INDEX IF EXISTS ix_tokens_token_digest")
+    _create_tokens_table(partitioned=False)
+    op.execute(
+        f"INSERT INTO tokens ({COLUMNS}) SELECT {COLUMNS} FROM tokens_old "
+        "WHERE expires_at > now()"
+    )
+    # حذف الجدول المقسم يحذف جميع أقسامه
+    op.drop_table("tokens_old")
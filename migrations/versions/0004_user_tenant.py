@@ -0,0 +1,26 @@
+"""مجموعة (مستأجر) المستخدم لإبطال توكنات المجموعة كاملة بكتابة واحدة
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("tenant", sa.String(64), nullable=True))
+    op.create_index("ix_users_tenant", "users", ["tenant"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_tenant", table_name="users")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("tenant")
@@ -1,4 +1,3 @@
-from datetime import timedelta
 from redis.asyncio import Redis
 from fastapi import Request, APIRouter, Depends
 from fastapi.encoders import jsonable_encoder
@@ -6,51 +5,55 @@ from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.background import BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, or_
-from jose import JWTError
-from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 from project.core import (
     settings,
-    oauth2_scheme,
     limiter,
     logger,
-    verify_password,
+    verify_password_async,
     get_db,
-    get_password_hash,
-    decode_token,
+    get_read_db,
+    save_changes,
+    release_connection,
+    after_commit,
+    get_password_hash_async,
     get_redis,
+    verified_token_cache,
     generate_token_link,
     verify_token_link,
     BadRequestException,
     PermissionDeniedException,
     NotAuthenticatedException,
-    TokenExpiredException,
     CredentialsValidationException,
     ServerErrorException,
     SuccessResponse,
     CreatedResponse,
+    TokenContext,
 )
-from project.models import User, Token
+from project.models import User, AuthPrincipal
 from project.schemas import (
     UserSchema,
     UserCreationSchema,
     UserLoginSchema,
     UserUpdateSchema,
     PasswordChangingSchema,
-    TokenSchema,
     RefreshTokenRequest,
+    TokenIntrospectionRequest,
     ForgotPasswordSchema,
     ResetPasswordSchema,
     VerifyEmailSchema,
     jsonResponseSchema,
 )
 from project.services import (
-    create_access_token,
-    create_and_store_refresh_token,
+    process_refresh,
+    introspect_tokens,
+    verify_introspection_client,
     get_current_user,
-    add_token_to_blacklist,
-    add_all_tokens_to_blacklist,
+    get_current_user_profile,
+    get_token_context,
+    bump_user_cache_version,
+    set_user_epoch,
+    deactivate_all_user_refresh_tokens,
     process_logout,
-    get_remaining_time,
     process_login,
     send_forgot_password_email,
     send_account_confirmation_email,
@@ -81,8 +84,7 @@ async def login_form(
 
 
 @auth_router.post("/login", response_model=jsonResponseSchema)
-@limiter.limit("10/minute")
-@limiter.limit("30/day")
+@limiter.limit("10/minute", "30/day")
 async def login_json(
     request: Request,
     data: UserLoginSchema,
@@ -99,7 +101,7 @@ async def login_json(
 
 
 @auth_router.get("/me", response_model=jsonResponseSchema)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_profile)):
     if not current_user:
         logger.warning("محاولة غير مصرح بها للوصول إلى /me")
         raise NotAuthenticatedException()
@@ -107,7 +109,7 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     logger.info("تم جلب بيانات المستخدم {current_user.username} بنجاح")
     return SuccessResponse(
         message="تم جلب بيانات المستخدم بنجاح",
-        data=data,
+        data=jsonable_encoder(data),
     )
 
 
@@ -125,6 +127,7 @@ async def register_user(
     logger.debug("التحقق من وجود مستخدم مسبق")
     result = await db.execute(query)
     existing_user = result.scalars().first()
+    await release_connection(db)
 
     if existing_user:
         if (
@@ -142,7 +145,7 @@ async def register_user(
             logger.warning("البريد الإلكتروني مستخدَم مسبقًا")
             raise CredentialsValidationException("البريد الإلكتروني مستخدَم فعلا")
 
-    hashed_password = get_password_hash(user_create.hashed_password)
+    hashed_password = await get_password_hash_async(user_create.hashed_password)
     new_user = User(
         firstName=user_create.firstName,
         lastName=user_create.lastName,
@@ -159,8 +162,7 @@ async def register_user(
 
     try:
         db.add(new_user)
-        await db.commit()
-        await db.refresh(new_user)
+        await save_changes(db)
     except Exception as e:
         logger.error("فشل في إنشاء مستخدم جديد - خطأ في قاعدة البيانات")
         raise ServerErrorException("حدث خطأ أثناء إنشاء المستخدم")
@@ -177,55 +179,60 @@ async def register_user(
 async def change_password(
     request: Request,
     password_change: PasswordChangingSchema,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
     redis: Redis = Depends(get_redis),
 ):
-    if not verify_password(password_change.old_password, current_user.hashed_password):
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise BadRequestException()
+    # عدم حجز اتصال قاعدة البيانات أثناء التحقق من كلمة المرور وتشفيرها
+    await release_connection(db)
+
+    if not await verify_password_async(
+        password_change.old_password, user.hashed_password
+    ):
         logger.warning(
             "محاولة تغيير كلمة مرور فاشلة: كلمة المرور القديمة غير صحيحة للمستخدم."
         )
         raise CredentialsValidationException("كلمة المرور القديمة خاطئة")
 
     # تحديث كلمة المرور
+    new_hashed_password = await get_password_hash_async(password_change.new_password)
     try:
-        current_user.hashed_password = get_password_hash(password_change.new_password)
-        current_user.last_password_change = func.now()  # تحديث وقت آخر تغيير
-        await db.commit()
+        user.hashed_password = new_hashed_password
+        user.last_password_change = func.now()  # تحديث وقت آخر تغيير
+        await save_changes(db)
     except Exception as e:
         logger.error("فشل في تحديث كلمة المرور: %s", e)
         raise ServerErrorException("حدث خطأ أثناء تحديث كلمة المرور")
-
-    payload = decode_token(token)
-
-    # وضع التوكن الحالي في القائمة السوداء وحذف جميع الجلسات السابقة
-    deleted1 = await add_token_to_blacklist(
-        redis, payload, token, get_remaining_time(token)
+    await after_commit(db, verified_token_cache.invalidate_subject, current_user.username)
+    await after_commit(db, bump_user_cache_version, redis, user.id)
+
+    # إبطال جميع جلسات المستخدم (بما فيها التوكن الحالي) بكتابة واحدة بدل المرور على كل جلسة،
+    # بعد حفظ كلمة المرور الجديدة حتى لا تُبطل الجلسات إذا فشل الحفظ
+    await after_commit(db, set_user_epoch, redis, user.id)
+    await deactivate_all_user_refresh_tokens(user.id, db)
+    logger.info(
+        "تم تغيير كلمة المرور بنجاح وإبطال الجلسات للمستخدم: %s",
+        current_user.username,
+    )
+    return SuccessResponse(
+        message="تم تحديث كلمة المرور بنجاح وتم إبطال جميع الجلسات السابقة",
     )
-    deleted2 = await add_all_tokens_to_blacklist(redis, payload)
-
-    if deleted1 and deleted2:
-        logger.info(
-            "تم تغيير كلمة المرور بنجاح وإبطال الجلسات للمستخدم: %s",
-            current_user.username,
-        )
-        return SuccessResponse(
-            message="تم تحديث كلمة المرور بنجاح وتم إبطال جميع الجلسات السابقة",
-        )
 
 
 @auth_router.post("/logout", response_model=jsonResponseSchema)
 @limiter.limit("10/minute")
 async def logout(
     request: Request,
-    current_user: User = Depends(get_current_user),
-    token: str = Depends(oauth2_scheme),
+    current_user: AuthPrincipal = Depends(get_current_user),
+    token_context: TokenContext = Depends(get_token_context),
     redis: Redis = Depends(get_redis),
 ):
     logger.info("محاولة تسجيل خروج")
 
-    if await process_logout(token, redis):
+    if await process_logout(token_context, redis):
         logger.info("تم تسجيل الخروج بنجاح")
         return SuccessResponse(
             message="تم تسجيل الخروج بنجاح",
@@ -241,55 +248,8 @@ async def refresh_access_token(
     redis: Redis = Depends(get_redis),
 ):
     logger.info("طلب تحديث توكن")
-    try:
-        refresh_token = payload.refresh_token
-
-        payload = decode_token(refresh_token)
-
-        username = payload.get("sub")
-
-        query = select(User).where((User.username == username))
-
-        result = await db.execute(query)
-        user = result.scalars().first()
-
-        query = select(Token).where(
-            (Token.user_id == user.id)
-            & (Token.is_active == True)
-            & (Token.token == refresh_token)
-        )
-        result = await db.execute(query)
-        the_token = result.scalars().first()
-        logger.debug("تم العثور على المستخدم المطابق للتوكن")
-
-        if not the_token or the_token.is_active is False:
-            logger.warning("فشل التحقق من رمز التحديث: غير موجود أو غير نشط")
-            raise TokenExpiredException("رمز التحديث منتهي الصلاحية أو غير صالح")
-
-    except ExpiredSignatureError as e:
-        logger.warning("انتهت صلاحية التوكن.")
-        raise TokenExpiredException("انتهت صلاحية التوكن")
-
-    except JWTClaimsError as e:
-        logger.error("المحتوى الداخلي للتوكن غير صالح.")
-        raise TokenExpiredException("المحتوى الداخلي للتوكن غير صالح")
-
-    except JWTError as e:
-        logger.error("توكن غير صالح.")
-        raise TokenExpiredException("توكن غير صالح")
-
-    new_access_token = await create_access_token(user, redis)
-    logger.debug("تم إنشاء access token جديد")
-
-    # توليد refresh token جديد
-    new_refresh_token = await create_and_store_refresh_token(user, db)
-    logger.debug("تم إنشاء refresh token جديد")
-
-    data = TokenSchema(
-        access_token=new_access_token,
-        token_type="bearer",
-        refresh_token=new_refresh_token,
-    )
+    # الطلبات المتزامنة أو المكررة بنفس الرمز تحصل على نفس الزوج الجديد
+    data = await process_refresh(payload.refresh_token, db, redis)
     logger.info("تم تحديث توكن الوصول لمستخدم بنجاح")
     return SuccessResponse(
         message="تم تحديث رمز الوصول بنجاح",
@@ -297,6 +257,25 @@ async def refresh_access_token(
     )
 
 
+@auth_router.post(
+    "/introspect",
+    response_model=jsonResponseSchema,
+    dependencies=[Depends(verify_introspection_client)],
+)
+async def introspect(
+    payload: TokenIntrospectionRequest,
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+):
+    logger.info("طلب فحص %d توكن", len(payload.tokens))
+    # نتيجة لكل توكن بنفس ترتيب الطلب
+    results = await introspect_tokens(payload.tokens, db, redis)
+    return SuccessResponse(
+        message="تم فحص التوكنات بنجاح",
+        data={"tokens": results},
+    )
+
+
 @auth_router.post("/forgot-password")
 async def forgot_password(
     data: ForgotPasswordSchema,
@@ -329,6 +308,7 @@ async def forgot_password(
 async def reset_password(
     data: ResetPasswordSchema,
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     logger.info("طلب إعادة تعيين كلمة المرور")
     try:
@@ -342,22 +322,30 @@ async def reset_password(
     if not user:
         logger.warning("فشل التحقق من التوكن - المستخدم غير موجود")
         raise BadRequestException()
+    await release_connection(db)
 
-    user.hashed_password = get_password_hash(data.new_password)
+    user.hashed_password = await get_password_hash_async(data.new_password)
+    user.last_password_change = func.now()  # تحديث وقت آخر تغيير
     logger.debug("تم تحديث كلمة مرور المستخدم")
     try:
-        await db.commit()
+        await save_changes(db)
         logger.info("تم تغيير كلمة المرور بنجاح")
     except Exception as e:
         logger.error("فشل في استعادة كلمة المرور - خطأ في قاعدة البيانات")
         raise ServerErrorException("حدث خطأ أثناء استعادة كلمة المرور")
+    await after_commit(db, verified_token_cache.invalidate_subject, user.username)
+    await after_commit(db, bump_user_cache_version, redis, user.id)
+
+    # إبطال جميع الجلسات السابقة للمستخدم بعد حفظ كلمة المرور الجديدة
+    await after_commit(db, set_user_epoch, redis, user.id)
+    await deactivate_all_user_refresh_tokens(user.id, db)
 
     return SuccessResponse(message="تم تغيير كلمة المرور بنجاح.", data=None)
 
 
 @auth_router.post("/account-verification")
 async def send_verification_email(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_profile),
     background_tasks: BackgroundTasks = BackgroundTasks(),
     redis: Redis = Depends(get_redis),
 ):
@@ -392,6 +380,7 @@ async def send_verification_email(
 async def verify_email(
     data: VerifyEmailSchema,
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     logger.info("محاولة تأكيد البريد الإلكتروني")
     try:
@@ -416,11 +405,12 @@ async def verify_email(
     user.emailIsVerified = True
     logger.debug("تم تعيين البريد كمؤكد")
     try:
-        await db.commit()
+        await save_changes(db)
         logger.info("تم تأكيد البريد الإلكتروني بنجاح")
     except Exception as e:
         logger.error("فشل في التحقق من البريد الإلكتروني - خطأ في قاعدة البيانات")
         raise ServerErrorException("حدث خطأ أثناء التحقق من البريد الإلكتروني")
+    await after_commit(db, bump_user_cache_version, redis, user.id)
     return SuccessResponse(
         message="تم التحقق من البريد الإلكتروني بنجاح",
         data=data.dict(),
@@ -432,8 +422,9 @@ async def verify_email(
 async def update_profile(
     request: Request,
     updated_data: UserUpdateSchema,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     logger.info("طلب تعديل بيانات الحساب")
 
@@ -444,17 +435,19 @@ async def update_profile(
         logger.warning("فشل تعديل البيانات - المستخدم غير موجود")
         raise BadRequestException()
 
+    previous_username = user.username
     update_fields = updated_data.model_dump(exclude_unset=True)
     for field, value in update_fields.items():
         setattr(user, field, value)
 
     try:
-        await db.commit()
-        await db.refresh(user)
+        await save_changes(db)
         logger.info("تم تعديل بيانات الحساب بنجاح")
     except Exception as e:
         logger.error("فشل في تعديل البيانات - خطأ: %s", e)
         raise ServerErrorException("حدث خطأ أثناء تعديل بيانات الحساب")
+    await after_commit(db, verified_token_cache.invalidate_subject, previous_username)
+    await after_commit(db, bump_user_cache_version, redis, user.id)
 
     response_data = UserSchema.model_validate(user)
     return SuccessResponse(
@@ -467,8 +460,9 @@ async def update_profile(
 @limiter.limit("1/day")
 async def deactivate_account(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis),
 ):
     logger.info("طلب تعطيل الحساب")
 
@@ -486,10 +480,12 @@ async def deactivate_account(
     user.isActive = False
 
     try:
-        await db.commit()
+        await save_changes(db)
         logger.info("تم تعطيل الحساب بنجاح")
     except Exception as e:
         logger.error("فشل في تعطيل الحساب - خطأ: %s", e)
         raise ServerErrorException("حدث خطأ أثناء تعطيل الحساب")
+    await after_commit(db, verified_token_cache.invalidate_subject, user.username)
+    await after_commit(db, bump_user_cache_version, redis, user.id)
 
     return SuccessResponse(message="تم تعطيل الحساب بنجاح", data=None)
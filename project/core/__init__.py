@@ -1,6 +1,11 @@
 from project.core.config import *
 from project.core.database import *
+from project.core.db_pool import *
+from project.core.jwt_backend import *
 from project.core.security import *
+from project.core.metrics import *
+from project.core.password_hashing import *
+from project.core.auth_cache import *
 from project.core.redis import *
 from project.core.rateLimiter import *
 from project.core.httpException import *
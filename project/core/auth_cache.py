@@ -0,0 +1,112 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+from project.core.config import settings
+from project.core.metrics import metrics
+from project.core.security import TokenContext
+
+
+# ==============================
+# ذاكرة مؤقتة داخل العملية للتوكنات التي تم التحقق منها
+# ==============================
+
+# تحتفظ بسياق التوكن والمستخدم الذي تم التحقق منه مقابل بصمة التوكن، حتى تتخطى الطلبات
+# المتكررة من نفس العميل فك التوكن واستعلامات Redis وقاعدة البيانات.
+# مدة بقاء كل عنصر لا تتجاوز انتهاء صلاحية التوكن ولا نافذة التقادم المحددة،
+# لأن الإبطال هنا محلي لكل عامل والعمال الآخرون يعتمدون على انتهاء النافذة.
+class VerifiedTokenCache:
+    def __init__(self, enabled: bool, max_size: int, ttl: float):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl = ttl
+        # digest -> (expires_at, subject, context, principal)
+        self._entries: OrderedDict[str, tuple[float, str, TokenContext, Any]] = OrderedDict()
+        self._by_subject: dict[str, set[str]] = {}
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> tuple[TokenContext, Any] | None:
+        """
+        إرجاع سياق التوكن والمستخدم المخزنين إن وُجدا ولم تنته صلاحيتهما.
+        """
+        if not self.enabled:
+            return None
+
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.incr("auth_cache.misses")
+            return None
+
+        expires_at, subject, context, principal = entry
+        if expires_at <= time.time():
+            self._remove(key, subject)
+            metrics.incr("auth_cache.misses")
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.incr("auth_cache.hits")
+        return context, principal
+
+    def set(self, context: TokenContext, principal: Any) -> None:
+        """
+        تخزين المستخدم الذي تم التحقق منه حتى انتهاء التوكن أو نافذة التقادم (أيهما أقرب).
+        """
+        if not self.enabled:
+            return
+
+        expires_at = min(float(context.expires_at or 0), time.time() + self.ttl)
+        if expires_at <= time.time():
+            return
+
+        key = self.digest(context.token)
+        subject = context.subject
+        self._entries[key] = (expires_at, subject, context, principal)
+        self._entries.move_to_end(key)
+        self._by_subject.setdefault(subject, set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            old_key, (_, old_subject, _, _) = self._entries.popitem(last=False)
+            self._discard_subject_key(old_subject, old_key)
+            metrics.incr("auth_cache.evictions")
+
+    def invalidate_token(self, token: str) -> None:
+        """
+        حذف توكن واحد من الذاكرة المؤقتة (عند تسجيل الخروج).
+        """
+        key = self.digest(token)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._discard_subject_key(entry[1], key)
+
+    def invalidate_subject(self, subject: str) -> None:
+        """
+        حذف جميع توكنات المستخدم من الذاكرة المؤقتة (تغيير كلمة المرور أو تعطيل الحساب).
+        """
+        for key in self._by_subject.pop(subject, set()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_subject.clear()
+
+    def _remove(self, key: str, subject: str) -> None:
+        self._entries.pop(key, None)
+        self._discard_subject_key(subject, key)
+
+    def _discard_subject_key(self, subject: str, key: str) -> None:
+        keys = self._by_subject.get(subject)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[subject]
+
+
+verified_token_cache = VerifiedTokenCache(
+    enabled=settings.AUTH_CACHE_ENABLED,
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+)
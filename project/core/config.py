@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -16,6 +17,13 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_24HOURS: int = 24
     ACCESS_TOKEN_EXPIRE_7DAYS: int = 7
     ACCESS_TOKEN_EXPIRE_WEEK: int = 1
+    JWT_BACKEND: str = "jose"
+    JWT_KEY_ALGORITHM: str = "ES256"
+    JWT_ACTIVE_KID: str | None = None
+    JWT_PRIVATE_KEYS: dict[str, str] = {}
+    JWT_PUBLIC_KEYS: dict[str, str] = {}
+    JWT_ACCEPT_LEGACY_TOKENS: bool = True
+    JWKS_CACHE_SECONDS: int = 300
 
     REDIS_HOST: str
     REDIS_PORT: int
@@ -28,6 +36,16 @@ class Settings(BaseSettings):
     POOL_TIMEOUT: int = 20
     CONNECT_TIMEOUT: int = 10
     COMMAND_TIMEOUT: int = 60
+    DB_UNIT_OF_WORK: bool = True
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_STICKY_SECONDS: int = 5
+    POOL_ADAPTIVE: bool = False
+    POOL_MAX_CONNECTIONS: int = 40
+    POOL_ADAPT_INTERVAL_SECONDS: int = 30
+    POOL_WAIT_THRESHOLD_MS: int = 50
+    DB_MAX_CONNECTIONS: int = 0
+    DB_RESERVED_CONNECTIONS: int = 10
+    APP_WORKERS: int = 1
 
     MAIL_SERVER: str
     MAIL_PORT: int
@@ -35,6 +53,36 @@ class Settings(BaseSettings):
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
 
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_TIMEOUT: float = 5.0
+
+    AUTH_CACHE_ENABLED: bool = False
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: float = 5.0
+
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_LOCK_MILLISECONDS: int = 500
+
+    SESSION_STRATEGY: Literal["hybrid", "allowlist", "denylist"] = "hybrid"
+
+    REFRESH_GRACE_SECONDS: int = 10
+    REFRESH_LOCK_MILLISECONDS: int = 2000
+
+    TOKEN_REAPER_ENABLED: bool = True
+    TOKEN_REAPER_INTERVAL_SECONDS: int = 300
+    TOKEN_REAPER_BATCH_SIZE: int = 1000
+    TOKEN_REAPER_MAX_BATCHES: int = 100
+    TOKEN_REAPER_INACTIVE_RETENTION_SECONDS: int = 3600
+    TOKENS_PARTITIONED: bool = False
+    TOKENS_PARTITION_DAYS: int = 7
+
+    INTROSPECTION_API_KEYS: list[str] = []
+    INTROSPECTION_MAX_TOKENS: int = 500
+
+    METRICS_ENABLED: bool = False
+
     class Config:
         if os.getenv("ENVIRONMENT", "development") != "production":
             env_file = os.path.expanduser("~/Desktop/auth_system_open_source/.env")
@@ -1,8 +1,14 @@
+import inspect
+from itertools import cycle
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from sqlalchemy.orm import Session, sessionmaker
+from typing import AsyncGenerator, Callable
 from sqlalchemy.ext.declarative import declarative_base
 from project.core import settings
+from project.core.httpException import ServerErrorException
+from project.core.db_pool import InstrumentedQueuePool, instrument_pool
+from project.core.logging_config import logger
 
 # اختيار المحرك بناءً على نوع قاعدة البيانات
 if "sqlite" in settings.DATABASE_URL:
@@ -13,6 +19,7 @@ if "sqlite" in settings.DATABASE_URL:
         max_overflow=settings.MAX_OVERFLOW,
         pool_timeout=settings.POOL_TIMEOUT,
         pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
     )
 else:
     engine = create_async_engine(
@@ -22,8 +29,11 @@ else:
         max_overflow=settings.MAX_OVERFLOW,
         pool_timeout=settings.POOL_TIMEOUT,
         pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
     )
 
+instrument_pool(engine, "primary")
+
 # إنشاء Session Async
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
@@ -33,10 +43,133 @@ AsyncSessionLocal = sessionmaker(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# ==============================
+# النسخ المتماثلة للقراءة (اختيارية)
+# ==============================
+
+replica_engines = [
+    create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.POOL_SIZE,
+        max_overflow=settings.MAX_OVERFLOW,
+        pool_timeout=settings.POOL_TIMEOUT,
+        pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
+    )
+    for url in settings.DATABASE_REPLICA_URLS
+]
+for index, replica_engine in enumerate(replica_engines):
+    instrument_pool(replica_engine, f"replica{index}")
+_replica_cycle = cycle(replica_engines)
+
+
+class RoutingSession(Session):
+    """
+    جلسة قراءة توجّه استعلامات SELECT إلى النسخ المتماثلة بالتناوب،
+    وأي كتابة أو استعلام بعد use_primary يذهب إلى قاعدة البيانات الأساسية.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engines
+            and not self.info.get("use_primary")
+            and not self._flushing
+            and isinstance(clause, Select)
+        ):
+            return next(_replica_cycle).sync_engine
+        return engine.sync_engine
+
+
+ReadSessionLocal = sessionmaker(
+    class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+)
+
+
+def use_primary(db: AsyncSession) -> None:
+    """
+    توجيه بقية استعلامات الجلسة إلى قاعدة البيانات الأساسية
+    (مثلًا بعد كتابة حديثة من نفس المستخدم لم تصل بعد إلى النسخ المتماثلة).
+    """
+    db.info["use_primary"] = True
+
+
+# جلسة للمسارات التي تقرأ فقط (بيانات المستخدم الحالي و /me)
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with ReadSessionLocal() as db:
+        yield db
+
+
 # دالة للحصول على جلسة قاعدة البيانات
+# في وضع وحدة العمل (DB_UNIT_OF_WORK) تكتفي الخدمات بـ flush عبر save_changes،
+# ويتم الحفظ (commit) مرة واحدة في نهاية الطلب، أو التراجع عند حدوث أي استثناء.
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as db:
-        yield db
+        if not settings.DB_UNIT_OF_WORK:
+            yield db
+            return
+
+        db.info["unit_of_work"] = True
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+
+        if db.info.pop("has_changes", False) or db.new or db.dirty or db.deleted:
+            try:
+                await db.commit()
+            except Exception as e:
+                logger.error("فشل حفظ تغييرات الطلب في قاعدة البيانات", exc_info=True)
+                await db.rollback()
+                raise ServerErrorException("حدث خطأ أثناء حفظ البيانات")
+
+        # الإجراءات التي يجب ألا تُنفذ إلا بعد نجاح الحفظ (مثل إبطال الذاكرة المؤقتة)
+        for func, args in db.info.pop("after_commit", []):
+            await _call(func, *args)
+
+
+async def _call(func: Callable, *args) -> None:
+    result = func(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def save_changes(db: AsyncSession) -> None:
+    """
+    حفظ تغييرات الخدمة: flush فقط في وضع وحدة العمل (الحفظ النهائي في نهاية الطلب)،
+    وإلا commit مباشرة.
+    """
+    if db.info.get("unit_of_work"):
+        await db.flush()
+        db.info["has_changes"] = True
+    else:
+        await db.commit()
+
+
+async def release_connection(db: AsyncSession) -> None:
+    """
+    إعادة اتصال الجلسة إلى المجمع مبكرًا بعد انتهاء القراءات، قبل الأعمال الطويلة
+    (تشفير كلمات المرور، عمليات Redis) أو عند انتهاء حاجة الطلب لقاعدة البيانات.
+    الجلسة لا تحجز اتصالًا أصلًا قبل أول استعلام، وتحجز اتصالًا جديدًا تلقائيًا عند الاستعلام التالي.
+    لا يفعل شيئًا إذا كانت هناك تغييرات لم تُحفظ بعد.
+    """
+    if not db.in_transaction():
+        return
+    if db.info.get("has_changes") or db.new or db.dirty or db.deleted:
+        return
+    # إنهاء معاملة القراءة فقط؛ expire_on_commit=False يُبقي الكائنات المحمّلة صالحة
+    await db.commit()
+
+
+async def after_commit(db: AsyncSession, func: Callable, *args) -> None:
+    """
+    تنفيذ إجراء بعد حفظ تغييرات الطلب، أو مباشرة إذا لم تكن الجلسة في وضع وحدة العمل.
+    """
+    if db.info.get("unit_of_work"):
+        db.info.setdefault("after_commit", []).append((func, args))
+    else:
+        await _call(func, *args)
 
 
 # Base class الكلاس الأساسي لإنشاء النماذج
@@ -0,0 +1,265 @@
+import asyncio
+import time
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from project.core.config import settings
+from project.core.logging_config import logger
+from project.core.metrics import metrics
+
+
+# ==============================
+# مراقبة مجمع اتصالات قاعدة البيانات
+# ==============================
+
+# كل مجمع يسجل في المقاييس (بالبادئة db.pool.<الاسم>):
+# - checkout_wait: زمن انتظار الحصول على اتصال (شاملًا فتح اتصال جديد)
+# - checked_out / overflow / size: الاتصالات المحجوزة، الزائدة عن الحجم الثابت، والسعة الحالية
+# - checkout_duration: مدة حجز الاتصال قبل إعادته
+# - connection_lifetime: عمر الاتصال من فتحه حتى إغلاقه
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    مجمع اتصالات يقيس زمن انتظار الحصول على اتصال، ويسمح بتغيير سعته أثناء التشغيل.
+    """
+
+    name = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # set_capacity يعدّل خاصية داخلية في QueuePool؛ إذا تغير اسمها في إصدار آخر
+        # من SQLAlchemy يجب أن يفشل التشغيل بدل أن يصبح التحجيم بلا أثر بصمت
+        if not isinstance(getattr(self, "_max_overflow", None), int):
+            raise RuntimeError(
+                "إصدار SQLAlchemy غير مدعوم: QueuePool لا يحتوي على _max_overflow"
+            )
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        # إحصاءات الفترة الحالية التي يعتمد عليها التحجيم التكيفي
+        self.window_waits = 0
+        self.window_wait_total = 0.0
+        self.window_timeouts = 0
+        self.window_peak = 0
+
+    def take_window(self) -> tuple[int, float, int, int]:
+        """
+        إرجاع إحصاءات الفترة الحالية (عدد الطلبات، مجموع الانتظار، المهل المنتهية، أقصى حجز) وبدء فترة جديدة.
+        """
+        window = (
+            self.window_waits,
+            self.window_wait_total,
+            self.window_timeouts,
+            self.window_peak,
+        )
+        self._reset_window()
+        return window
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.window_timeouts += 1
+            metrics.incr(f"db.pool.{self.name}.timeouts")
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.window_waits += 1
+            self.window_wait_total += waited
+            metrics.observe(f"db.pool.{self.name}.checkout_wait", waited)
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        # حدث checkin يسبق إعادة الاتصال، لذلك تُحدّث القيم بعد الإعادة فعليًا
+        self.update_gauges()
+
+    def update_gauges(self) -> int:
+        checked_out = self.checkedout()
+        metrics.set_gauge(f"db.pool.{self.name}.checked_out", checked_out)
+        metrics.set_gauge(f"db.pool.{self.name}.overflow", max(0, self.overflow()))
+        return checked_out
+
+    def capacity(self) -> int:
+        """
+        أقصى عدد اتصالات مفتوحة في نفس الوقت (الحجم الثابت + الاتصالات الزائدة).
+        """
+        return self.size() + self._max_overflow
+
+    def set_capacity(self, capacity: int) -> None:
+        """
+        تغيير السعة القصوى دون المساس بالحجم الثابت؛ عند التصغير تُغلق
+        الاتصالات الزائدة تلقائيًا عند إعادتها إلى المجمع.
+        """
+        self._max_overflow = max(0, capacity - self.size())
+        metrics.set_gauge(f"db.pool.{self.name}.size", self.capacity())
+
+
+def instrument_pool(async_engine: AsyncEngine, name: str) -> None:
+    """
+    تسجيل أحداث مجمع الاتصالات للمحرك وتسميته في المقاييس.
+    """
+    pool = async_engine.sync_engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+    pool.name = name
+    prefix = f"db.pool.{name}"
+    metrics.set_gauge(f"{prefix}.size", pool.capacity())
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, record):
+        record.info["connected_at"] = time.monotonic()
+        metrics.incr(f"{prefix}.connects")
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        record.info["checked_out_at"] = time.monotonic()
+        checked_out = pool.update_gauges()
+        pool.window_peak = max(pool.window_peak, checked_out)
+        metrics.incr(f"{prefix}.checkouts")
+        if pool.overflow() > 0:
+            metrics.incr(f"{prefix}.overflow_checkouts")
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, record):
+        checked_out_at = record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            metrics.observe(
+                f"{prefix}.checkout_duration", time.monotonic() - checked_out_at
+            )
+
+    def on_close(dbapi_connection, record=None):
+        info = record.info if record is not None else {}
+        connected_at = info.pop("connected_at", None)
+        if connected_at is not None:
+            metrics.observe(
+                f"{prefix}.connection_lifetime", time.monotonic() - connected_at
+            )
+        metrics.incr(f"{prefix}.closes")
+
+    event.listen(pool, "close", on_close)
+    event.listen(pool, "close_detached", on_close)
+
+
+# ==============================
+# التحجيم التكيفي لمجمع الاتصالات (اختياري)
+# ==============================
+
+# كل فترة تُقارن أزمنة الانتظار بالحد المسموح:
+# - انتظار طويل أو انتهاء مهلة: تكبير السعة حتى الحد الأعلى
+# - لا انتظار وحجز أقل من نصف السعة: تصغيرها حتى الحجم الثابت POOL_SIZE
+# الحد الأعلى هو الأقل بين POOL_MAX_CONNECTIONS ونصيب العامل الواحد من
+# max_connections في قاعدة البيانات بعد حجز DB_RESERVED_CONNECTIONS.
+
+
+async def connection_budget(async_engine: AsyncEngine) -> int | None:
+    """
+    نصيب العامل الواحد من اتصالات قاعدة البيانات، أو None إذا تعذر تحديده.
+    """
+    max_connections = settings.DB_MAX_CONNECTIONS
+    if not max_connections and async_engine.dialect.name == "postgresql":
+        try:
+            async with async_engine.connect() as conn:
+                max_connections = int(
+                    (await conn.execute(text("SHOW max_connections"))).scalar()
+                )
+        except Exception as e:
+            logger.error("فشل في قراءة max_connections من قاعدة البيانات", exc_info=True)
+            return None
+    if not max_connections:
+        return None
+    available = max_connections - settings.DB_RESERVED_CONNECTIONS
+    return max(1, available // max(1, settings.APP_WORKERS))
+
+
+class PoolAutoscaler:
+    """
+    مهمة خلفية تعدّل سعة مجمعات الاتصالات ضمن الحدود المسموحة حسب أزمنة الانتظار.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._limits: dict[InstrumentedQueuePool, tuple[int, int]] = {}
+
+    async def start(self, *engines: AsyncEngine) -> None:
+        if not settings.POOL_ADAPTIVE or self._task is not None:
+            return
+
+        for async_engine in engines:
+            pool = async_engine.sync_engine.pool
+            if not isinstance(pool, InstrumentedQueuePool):
+                continue
+            upper = settings.POOL_MAX_CONNECTIONS
+            budget = await connection_budget(async_engine)
+            if budget is not None:
+                upper = min(upper, budget)
+            if upper < pool.size():
+                logger.warning(
+                    "POOL_SIZE (%d) أكبر من نصيب العامل من اتصالات قاعدة البيانات (%d)",
+                    pool.size(),
+                    upper,
+                )
+            lower = pool.size()
+            upper = max(lower, upper)
+            self._limits[pool] = (lower, upper)
+            # البدء من السعة المحددة في الإعدادات ضمن الحدود
+            pool.set_capacity(min(max(pool.capacity(), lower), upper))
+            logger.info(
+                "التحجيم التكيفي لمجمع %s بين %d و %d اتصال", pool.name, lower, upper
+            )
+
+        if self._limits:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._limits.clear()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.POOL_ADAPT_INTERVAL_SECONDS)
+            for pool, (lower, upper) in self._limits.items():
+                try:
+                    self.adjust(pool, lower, upper)
+                except Exception as e:
+                    logger.error("فشل تعديل سعة مجمع الاتصالات", exc_info=True)
+
+    def adjust(self, pool: InstrumentedQueuePool, lower: int, upper: int) -> int:
+        """
+        تعديل سعة المجمع مرة واحدة حسب إحصاءات الفترة الماضية، وإرجاع السعة الجديدة.
+        """
+        waits, wait_total, timeouts, peak = pool.take_window()
+        average_wait_ms = wait_total / waits * 1000 if waits else 0.0
+        capacity = pool.capacity()
+        step = max(1, capacity // 4)
+
+        if timeouts or average_wait_ms > settings.POOL_WAIT_THRESHOLD_MS:
+            new_capacity = min(upper, capacity + step)
+        elif average_wait_ms < settings.POOL_WAIT_THRESHOLD_MS / 4 and peak < capacity / 2:
+            new_capacity = max(lower, capacity - step)
+        else:
+            new_capacity = capacity
+
+        if new_capacity != capacity:
+            pool.set_capacity(new_capacity)
+            metrics.incr(f"db.pool.{pool.name}.resizes")
+            logger.info(
+                "تم تعديل سعة مجمع %s من %d إلى %d (متوسط الانتظار %.1f ms)",
+                pool.name,
+                capacity,
+                new_capacity,
+                average_wait_ms,
+            )
+        return new_capacity
+
+
+pool_autoscaler = PoolAutoscaler()
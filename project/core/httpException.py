@@ -78,6 +78,15 @@ class ServerErrorException(CustomException):
         )
 
 
+class ServiceUnavailableException(CustomException):
+    def __init__(self, message="الخادم مشغول حاليًا، يرجى المحاولة لاحقًا"):
+        super().__init__(
+            message,
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
+
 class RateLimitExceededException(CustomException):
     def __init__(self, message="تم تجاوز عدد المحاولات المسموح به"):
         super().__init__(
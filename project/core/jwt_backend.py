@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Optional
+from project.core.config import settings
+
+
+# ==============================
+# مكتبات JWT القابلة للاستبدال
+# ==============================
+
+# جميع عمليات JWT في الخدمة تمر عبر واجهة صغيرة واحدة، وتُختار المكتبة عبر JWT_BACKEND:
+# - "jose": python-jose (الافتراضي)، يدعم HS256 و ES256
+# - "pyjwt": PyJWT مع cryptography، يدعم EdDSA أيضًا
+# كلا المكتبتين تطبقان نفس قواعد التحقق: exp و nbf إن وُجدا، ونوع iat وsub،
+# وأي خطأ في التوقيع أو المحتوى يُرفع كـ InvalidTokenError.
+
+
+class InvalidTokenError(Exception):
+    """
+    توكن غير صالح (توقيع خاطئ، انتهت صلاحيته، خوارزمية غير مسموحة، أو محتوى غير صالح).
+    """
+
+
+class JWTBackend(ABC):
+    """
+    الواجهة المشتركة لمكتبات JWT؛ كل مكتبة جديدة يجب أن تنفذ جميع الدوال.
+    """
+
+    name: str
+
+    @abstractmethod
+    def load_private_key(self, pem: str, algorithm: str) -> Any: ...
+
+    @abstractmethod
+    def load_public_key(self, pem: str, algorithm: str) -> Any: ...
+
+    @abstractmethod
+    def public_key(self, private_key: Any) -> Any: ...
+
+    @abstractmethod
+    def to_jwk(self, public_key: Any, algorithm: str) -> dict: ...
+
+    @abstractmethod
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: Optional[dict] = None
+    ) -> str: ...
+
+    @abstractmethod
+    def decode(self, token: str, key: Any, algorithms: list[str]) -> dict: ...
+
+    @abstractmethod
+    def get_unverified_header(self, token: str) -> dict: ...
+
+
+class JoseBackend(JWTBackend):
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwk, jwt
+
+        self._errors = JWTError
+        self._jwk = jwk
+        self._jwt = jwt
+
+    def load_private_key(self, pem: str, algorithm: str) -> Any:
+        return self._jwk.construct(pem, algorithm)
+
+    def load_public_key(self, pem: str, algorithm: str) -> Any:
+        return self._jwk.construct(pem, algorithm)
+
+    def public_key(self, private_key: Any) -> Any:
+        return private_key.public_key()
+
+    def to_jwk(self, public_key: Any, algorithm: str) -> dict:
+        return public_key.to_dict()
+
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: Optional[dict] = None
+    ) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithms: list[str]) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._errors as e:
+            raise InvalidTokenError(str(e)) from e
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._errors as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class PyJWTBackend(JWTBackend):
+    name = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt
+        except ImportError as e:
+            raise ValueError("مكتبة PyJWT غير مثبتة (JWT_BACKEND=pyjwt)") from e
+
+        self._jwt = jwt
+        self._errors = jwt.PyJWTError
+        # python-jose يتحقق من أن iat رقم فقط، ولا يرفض التوكن إذا كان في المستقبل
+        self._options = {"verify_iat": False}
+
+    def _algorithm(self, algorithm: str):
+        return self._jwt.get_algorithm_by_name(algorithm)
+
+    def load_private_key(self, pem: str, algorithm: str) -> Any:
+        return self._algorithm(algorithm).prepare_key(pem)
+
+    def load_public_key(self, pem: str, algorithm: str) -> Any:
+        return self._algorithm(algorithm).prepare_key(pem)
+
+    def public_key(self, private_key: Any) -> Any:
+        return private_key.public_key()
+
+    def to_jwk(self, public_key: Any, algorithm: str) -> dict:
+        return {
+            **self._algorithm(algorithm).to_jwk(public_key, as_dict=True),
+            "alg": algorithm,
+        }
+
+    def encode(
+        self, claims: dict, key: Any, algorithm: str, headers: Optional[dict] = None
+    ) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithms: list[str]) -> dict:
+        try:
+            claims = self._jwt.decode(
+                token, key, algorithms=algorithms, options=self._options
+            )
+        except self._errors as e:
+            raise InvalidTokenError(str(e)) from e
+        if "iat" in claims and not isinstance(claims["iat"], (int, float)):
+            raise InvalidTokenError("iat يجب أن يكون رقمًا")
+        return claims
+
+    def get_unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._errors as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+JWT_BACKENDS = {
+    JoseBackend.name: JoseBackend,
+    PyJWTBackend.name: PyJWTBackend,
+}
+
+
+@lru_cache()
+def get_jwt_backend() -> JWTBackend:
+    """
+    مكتبة JWT المحددة في الإعدادات (JWT_BACKEND).
+    """
+    backend = JWT_BACKENDS.get(settings.JWT_BACKEND)
+    if backend is None:
+        raise ValueError(f"مكتبة JWT غير مدعومة: {settings.JWT_BACKEND}")
+    return backend()
@@ -0,0 +1,81 @@
+import time
+from threading import Lock
+
+
+# سجل مقاييس بسيط داخل العملية (عدادات، قيم لحظية، وأزمنة تنفيذ)
+# يُستخدم لمراقبة الخدمات الداخلية دون الاعتماد على مكتبة خارجية
+class Metrics:
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: dict[str, int] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """
+        زيادة عداد بالقيمة المحددة.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        تعيين قيمة لحظية (مثل عدد العمليات الجارية).
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        تسجيل زمن تنفيذ عملية (العدد، المجموع، والحد الأقصى).
+        """
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def timer(self, name: str) -> "_Timer":
+        """
+        مدير سياق لقياس زمن تنفيذ كتلة من الكود.
+        """
+        return _Timer(self, name)
+
+    def snapshot(self) -> dict:
+        """
+        إرجاع نسخة من جميع المقاييس الحالية.
+        """
+        with self._lock:
+            timings = {
+                name: {
+                    **values,
+                    "avg": values["total"] / values["count"] if values["count"] else 0.0,
+                }
+                for name, values in self._timings.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: Metrics, name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+metrics = Metrics()
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from project.core.config import settings
+from project.core.httpException import ServiceUnavailableException
+from project.core.logging_config import logger
+from project.core.metrics import metrics
+from project.core.security import get_password_hash, verify_password
+
+
+# ==============================
+# خدمة تشفير كلمات المرور غير المتزامنة
+# ==============================
+
+# bcrypt عملية مكلفة على المعالج (عشرات إلى مئات الميلي ثانية)،
+# لذلك تُنفذ في مجمع عمليات منفصل حتى لا تُجمّد حلقة الأحداث
+# وبقية الطلبات الجارية على نفس العامل.
+class PasswordHasher:
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+    def start(self) -> None:
+        """
+        إنشاء مجمع العمليات (يُفضّل استدعاؤها عند بدء التشغيل قبل إنشاء أي خيوط).
+        """
+        if self._executor is not None:
+            return
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info("تم تشغيل مجمع عمليات التشفير بعدد عمال: %d", self.workers)
+        else:
+            # عند تعطيل مجمع العمليات نستخدم خيوطًا (bcrypt يحرر الـ GIL أثناء الحساب)
+            self._executor = ThreadPoolExecutor(thread_name_prefix="password-hasher")
+            logger.info("تم تشغيل مجمع خيوط التشفير")
+
+    def shutdown(self) -> None:
+        """
+        إيقاف مجمع العمليات وإلغاء المهام التي لم تبدأ بعد.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self, executor: Executor) -> None:
+        # قد يكتشف عدة طلبات متزامنة نفس المجمع المعطل، فيُعاد إنشاؤه مرة واحدة فقط
+        if self._executor is executor:
+            self.shutdown()
+            self.start()
+
+    async def _run(self, operation: str, func, *args):
+        if self._in_flight >= self.max_queue:
+            metrics.incr("password_hashing.rejected")
+            logger.warning("تم رفض عملية تشفير: تجاوز الحد الأقصى لطابور الانتظار")
+            raise ServiceUnavailableException()
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        metrics.set_gauge("password_hashing.in_flight", self._in_flight)
+        start = time.perf_counter()
+        executor = self._executor
+        try:
+            future = loop.run_in_executor(executor, func, *args)
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("password_hashing.timeouts")
+            logger.error("انتهت المهلة المحددة لعملية التشفير: %s", operation)
+            raise ServiceUnavailableException()
+        except BrokenProcessPool:
+            # توقف إحدى العمليات فجأة (مثل نفاد الذاكرة) يعطّل المجمع بالكامل،
+            # فيُعاد إنشاؤه حتى لا تفشل جميع الطلبات اللاحقة حتى إعادة التشغيل
+            metrics.incr("password_hashing.broken_pool")
+            logger.error("تعطل مجمع عمليات التشفير، تتم إعادة إنشائه: %s", operation)
+            self._restart(executor)
+            raise ServiceUnavailableException()
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("password_hashing.in_flight", self._in_flight)
+            metrics.incr(f"password_hashing.{operation}")
+            metrics.observe(f"password_hashing.{operation}", time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        """
+        إرجاع النسخة المشفرة لكلمة المرور دون حجب حلقة الأحداث.
+        """
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        التحقق من كلمة المرور دون حجب حلقة الأحداث.
+        """
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
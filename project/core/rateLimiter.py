@@ -1,33 +1,254 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from slowapi.errors import RateLimitExceeded
-import re
-import os
+from starlette.routing import Match
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 from project.core.config import settings
+from project.core.redis import get_redis
+from project.core.metrics import metrics
+from project.core.logging_config import logger
 
 
-# إعداد معدل الطلبات باستخدام SlowAPI
+# إعداد معدل الطلبات باستخدام Redis بشكل غير متزامن
 ENVIRONMENT = settings.ENVIRONMENT or "development"
 
-REDIS_HOST = settings.REDIS_HOST or "localhost"
-REDIS_PORT = settings.REDIS_PORT or "6379"
-REDIS_DB = settings.REDIS_DB or 0
-if REDIS_HOST == "localhost":
-    STORAGE_URI = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
-else:
-    STORAGE_URI = f"rediss://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
-
 DEFAULT_LIMIT = "7/hour" if ENVIRONMENT == "production" else "3/minute"
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["3/minute"],
-    storage_uri=STORAGE_URI,
+RATE_LIMIT_PREFIX = "rate_limit"
+
+_UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# صيغ الحدود المقبولة: "10/minute" أو "10 per minute" أو "10 per 2 hours"
+_LIMIT_PATTERN = re.compile(
+    r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$"
 )
 
 
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    count: int
+    period_num: int
+    unit: str
+
+    @property
+    def period(self) -> int:
+        # طول النافذة بالثواني
+        return self.period_num * _UNIT_SECONDS[self.unit]
+
+    def __str__(self) -> str:
+        return f"{self.count} per {self.period_num} {self.unit}"
+
+
+def parse_limits(*limit_values: str) -> tuple[RateLimit, ...]:
+    """
+    تحويل نصوص الحدود (مثل "10/minute" أو "10/minute;30/day") إلى كائنات RateLimit.
+    """
+    limits = []
+    for value in limit_values:
+        for part in value.split(";"):
+            match = _LIMIT_PATTERN.match(part.lower())
+            if not match:
+                raise ValueError(f"صيغة حد غير صالحة: {part!r}")
+            limits.append(
+                RateLimit(
+                    count=int(match.group(1)),
+                    period_num=int(match.group(2) or 1),
+                    unit=match.group(3),
+                )
+            )
+    return tuple(limits)
+
+
+class RateLimitExceeded(Exception):
+    """
+    استثناء تجاوز الحد المسموح، يحمل الحد الذي تم تجاوزه ومدة الانتظار بالثواني.
+    """
+
+    def __init__(self, limit: RateLimit, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.detail = str(limit)
+        super().__init__(self.detail)
+
+
+# خوارزمية GCRA لجميع حدود المسار في استدعاء واحد:
+# لكل حد مفتاح يحمل "وقت الوصول النظري" (TAT) بالميلي ثانية.
+# يتم فحص جميع الحدود أولًا، ولا يُسجّل الطلب في أي منها إلا إذا سمحت به جميعًا،
+# حتى لا تستهلك الطلبات المرفوضة من رصيد الحدود الأخرى.
+# ARGV: لكل حد (الفاصل بين الطلبات، طول النافذة) بالميلي ثانية
+# النتيجة: {0، 0} عند السماح، أو {رقم الحد المتجاوز، مدة الانتظار بالميلي ثانية}
+RATE_LIMIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2 - 1])
+    local period = tonumber(ARGV[i * 2])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        return {i, allow_at - now}
+    end
+    tats[i] = new_tat
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tats[i], 'PX', tats[i] - now)
+end
+return {0, 0}
+"""
+
+
+@lru_cache()
+def _script(redis: Redis) -> AsyncScript:
+    # تسجيل السكربت مرة واحدة، ثم يُستدعى عبر EVALSHA
+    return redis.register_script(RATE_LIMIT_SCRIPT)
+
+
+def get_remote_address(request: Request) -> str:
+    return request.client.host if request.client else "127.0.0.1"
+
+
+class Limiter:
+    """
+    مقيّد معدل طلبات غير متزامن يعتمد على اتصال Redis الخاص بالتطبيق،
+    ويقيّم جميع حدود المسار بطلب واحد إلى Redis.
+    """
+
+    def __init__(self, key_func=get_remote_address, enabled: bool = True):
+        self.key_func = key_func
+        self.enabled = enabled
+        # جدول الحدود لكل دالة مسار، يُملأ عبر الديكوريتر limit
+        self.route_limits: dict = {}
+
+    def _keys(self, scope: str, identity: str, limits) -> list[str]:
+        return [
+            f"{RATE_LIMIT_PREFIX}:{scope}:{limit.count}:{limit.period}:{identity}"
+            for limit in limits
+        ]
+
+    async def hit(self, scope: str, identity: str, limits: tuple[RateLimit, ...]):
+        """
+        تسجيل طلب على جميع الحدود، ويرفع RateLimitExceeded إذا تجاوز أيًا منها.
+        """
+        if not self.enabled or not limits:
+            return
+
+        # الحد الصفري يرفض جميع الطلبات دون الحاجة إلى Redis
+        for limit in limits:
+            if limit.count <= 0:
+                metrics.incr("rate_limit.rejected")
+                raise RateLimitExceeded(limit, limit.period)
+
+        args = []
+        for limit in limits:
+            args.extend((limit.period * 1000 // limit.count, limit.period * 1000))
+
+        try:
+            index, retry_after_ms = await _script(get_redis())(
+                keys=self._keys(scope, identity, limits), args=args
+            )
+        except Exception as e:
+            # عدم توفر Redis لا يجب أن يوقف الخدمة بالكامل
+            logger.error("فشل التحقق من معدل الطلبات في Redis", exc_info=True)
+            metrics.incr("rate_limit.errors")
+            return
+
+        if index:
+            metrics.incr("rate_limit.rejected")
+            raise RateLimitExceeded(
+                limits[int(index) - 1], max(1, math.ceil(int(retry_after_ms) / 1000))
+            )
+        metrics.incr("rate_limit.allowed")
+
+    def limit(self, *limit_values: str):
+        """
+        ديكوريتر لتسجيل حد أو أكثر للمسار، مثل: limit("10/minute", "30/day").
+        لا يغلّف الدالة، بل يسجل الحدود في جدول المسارات الذي يطبّقه RateLimitMiddleware
+        قبل تنفيذ أي dependency أو قراءة جسم الطلب.
+        """
+        limits = parse_limits(*limit_values)
+
+        def decorator(func):
+            self.route_limits[func] = self.route_limits.get(func, ()) + limits
+            return func
+
+        return decorator
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware يطبّق جدول حدود المسارات، ويرفض الطلبات المتجاوزة بـ 429
+    قبل حل الـ dependencies (جلسات قاعدة البيانات، قراءة الجسم، التحقق من المستخدم).
+    """
+
+    def __init__(self, app, limiter: Limiter):
+        self.app = app
+        self.limiter = limiter
+        self._static: dict[tuple[str, str], tuple[str, tuple[RateLimit, ...]]] | None = None
+        self._dynamic: list = []
+
+    def _build_table(self, router):
+        # المسارات الثابتة تُطابق مباشرة من القاموس، وذات المتغيرات بمطابقة المسار
+        static, dynamic = {}, []
+        for route in router.routes:
+            endpoint = getattr(route, "endpoint", None)
+            limits = self.limiter.route_limits.get(endpoint)
+            if not limits:
+                continue
+            scope_name = f"{endpoint.__module__}.{endpoint.__name__}"
+            if getattr(route, "param_convertors", None):
+                dynamic.append((route, scope_name, limits))
+                continue
+            for method in getattr(route, "methods", None) or ():
+                static[(method, route.path)] = (scope_name, limits)
+        self._static, self._dynamic = static, dynamic
+
+    def _match(self, scope):
+        entry = self._static.get((scope["method"], scope["path"]))
+        if entry is not None:
+            return entry
+        for route, scope_name, limits in self._dynamic:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return scope_name, limits
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self._static is None:
+            self._build_table(scope["app"].router)
+
+        entry = self._match(scope)
+        if entry is not None:
+            scope_name, limits = entry
+            request = Request(scope)
+            try:
+                await self.limiter.hit(scope_name, self.limiter.key_func(request), limits)
+            except RateLimitExceeded as exc:
+                response = await custom_rate_limit_handler(request, exc)
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+
+limiter = Limiter(key_func=get_remote_address)
+
+
 # دالة لتحويل الأرقام إلى وحدات زمنية باللغة العربية
 def arabic_unit(number: int, unit: str) -> str:
     number = int(number)
@@ -53,19 +274,12 @@ def arabic_unit(number: int, unit: str) -> str:
 
 # استثناء مخصص لمعالجة تجاوز الحد المسموح به
 async def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    detail = str(exc.detail)
-
-    # استخراج العدد والفترة من الرسالة
-    match = re.search(r"(\d+)\s+per\s+(\d+)?\s?(\w+)", detail)
-
-    if match:
-        count = int(match.group(1))
-        period_num = match.group(2) or "1"
-        period_unit = match.group(3)
+    limit = getattr(exc, "limit", None)
 
-        period_text = arabic_unit(period_num, period_unit)
+    if limit is not None:
+        period_text = arabic_unit(limit.period_num, limit.unit)
 
-        msg = f"لقد تجاوزت الحد المسموح به وهو {count} محاولة كل {period_text}. يرجى الانتظار ثم المحاولة مجددًا."
+        msg = f"لقد تجاوزت الحد المسموح به وهو {limit.count} محاولة كل {period_text}. يرجى الانتظار ثم المحاولة مجددًا."
     else:
         msg = "لقد تجاوزت الحد المسموح به. يرجى المحاولة لاحقًا."
 
@@ -78,4 +292,5 @@ async def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
             "message": msg,
             "statusCode": 429,
         },
+        headers={"Retry-After": str(getattr(exc, "retry_after", 60))},
     )
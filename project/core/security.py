@@ -1,9 +1,15 @@
+import hashlib
+import secrets
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Union
 from fastapi.security import OAuth2PasswordBearer
 from project.core import settings
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from project.core.jwt_backend import InvalidTokenError, get_jwt_backend
 
 from project.core.httpException import BadRequestException, ServerErrorException, TokenExpiredException
 from project.core.logging_config import logger
@@ -30,35 +36,211 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# ==============================
+# مفاتيح توقيع JWT
+# ==============================
+
+# عند ضبط JWT_ACTIVE_KID تُوقّع التوكنات بالمفتاح الخاص لهذا المعرّف (ES256 افتراضيًا)
+# مع ترويسة kid، ويُنشر الجزء العام من جميع المفاتيح عبر JWKS حتى تتحقق الخدمات
+# الأخرى من التوكنات محليًا دون مشاركة السر أو الرجوع إلى /me.
+# تدوير المفاتيح دون انقطاع: إضافة المفتاح الجديد إلى JWT_PRIVATE_KEYS ونشره،
+# ثم تحويل JWT_ACTIVE_KID إليه، ونقل القديم إلى JWT_PUBLIC_KEYS حتى تنتهي توكناته، ثم حذفه.
+
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    public_key: Any
+    # None للمفاتيح المتقاعدة التي تُستخدم للتحقق فقط
+    private_key: Optional[Any] = None
+
+
+def _read_key(kid: str, path: str, private: bool) -> Any:
+    backend = get_jwt_backend()
+    try:
+        with open(path, encoding="utf-8") as key_file:
+            pem = key_file.read()
+        if private:
+            return backend.load_private_key(pem, settings.JWT_KEY_ALGORITHM)
+        return backend.load_public_key(pem, settings.JWT_KEY_ALGORITHM)
+    except Exception as e:
+        raise ValueError(f"تعذر تحميل مفتاح JWT ({kid}) من {path}") from e
+
+
+@lru_cache()
+def load_signing_keys() -> dict[str, SigningKey]:
+    """
+    تحميل مفاتيح التوقيع والتحقق مرة واحدة (يُفضّل استدعاؤها عند بدء التشغيل لاكتشاف الأخطاء مبكرًا).
+    """
+    keys = {}
+    for kid, path in settings.JWT_PUBLIC_KEYS.items():
+        keys[kid] = SigningKey(
+            kid, settings.JWT_KEY_ALGORITHM, _read_key(kid, path, private=False)
+        )
+    for kid, path in settings.JWT_PRIVATE_KEYS.items():
+        private_key = _read_key(kid, path, private=True)
+        keys[kid] = SigningKey(
+            kid,
+            settings.JWT_KEY_ALGORITHM,
+            get_jwt_backend().public_key(private_key),
+            private_key,
+        )
+
+    active_kid = settings.JWT_ACTIVE_KID
+    if active_kid and (active_kid not in keys or keys[active_kid].private_key is None):
+        raise ValueError(f"لا يوجد مفتاح خاص لمعرّف التوقيع النشط: {active_kid}")
+    return keys
+
+
+def active_signing_key() -> Optional[SigningKey]:
+    """
+    مفتاح التوقيع الحالي، أو None عند استخدام السر المشترك SECRET_KEY.
+    """
+    if not settings.JWT_ACTIVE_KID:
+        return None
+    return load_signing_keys()[settings.JWT_ACTIVE_KID]
+
+
+@lru_cache()
+def get_jwks() -> dict:
+    """
+    المفاتيح العامة بصيغة JWKS لنشرها للخدمات التي تتحقق من التوكنات محليًا.
+    """
+    return {
+        "keys": [
+            {
+                **get_jwt_backend().to_jwk(key.public_key, key.algorithm),
+                "kid": key.kid,
+                "use": "sig",
+            }
+            for key in load_signing_keys().values()
+        ]
+    }
+
+
+def _verification_key(token: str) -> tuple[Any, list[str]]:
+    # اختيار مفتاح التحقق حسب ترويسة kid، والخوارزمية المسموحة معه فقط
+    kid = get_jwt_backend().get_unverified_header(token).get("kid")
+    if kid is None:
+        # توكنات السر المشترك (قبل التحويل إلى المفاتيح غير المتماثلة)
+        if settings.JWT_ACTIVE_KID and not settings.JWT_ACCEPT_LEGACY_TOKENS:
+            raise InvalidTokenError("توكن بدون kid")
+        return settings.SECRET_KEY, [settings.ALGORITHM]
+
+    key = load_signing_keys().get(kid)
+    if key is None:
+        raise InvalidTokenError("kid غير معروف")
+    return key.public_key, [key.algorithm]
+
+
 # ==============================
 # إدارة JWT Token
 # ==============================
 
 
-def create_token(
+@dataclass(frozen=True, slots=True)
+class TokenContext:
+    """
+    توكن تم التحقق منه مرة واحدة مع محتواه، يُمرّر لجميع الخدمات خلال الطلب
+    بدل إعادة فك التوكن في كل خدمة.
+    """
+
+    token: str
+    claims: Mapping
+
+    @property
+    def subject(self) -> Optional[str]:
+        return self.claims.get("sub")
+
+    @property
+    def user_id(self) -> Optional[str]:
+        return self.claims.get("uid")
+
+    @property
+    def tenant(self) -> Optional[str]:
+        return self.claims.get("tenant")
+
+    @property
+    def token_id(self) -> str:
+        # التوكنات القديمة التي صدرت قبل إضافة jti تُعرّف بالتوكن الكامل
+        return self.claims.get("jti") or self.token
+
+    @property
+    def issued_at(self) -> Optional[int]:
+        return self.claims.get("iat")
+
+    @property
+    def expires_at(self) -> Optional[int]:
+        return self.claims.get("exp")
+
+    @property
+    def remaining_seconds(self) -> float:
+        """
+        المدة المتبقية من صلاحية التوكن بالثواني (صفر إذا انتهت).
+        """
+        if not self.expires_at:
+            return 0.0
+        return max(0.0, self.expires_at - time.time())
+
+
+def issue_token(
     data: dict,
     expires_delta: Optional[timedelta] = None,
     default_expire: timedelta = timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_24HOURS),
-):
+) -> TokenContext:
     """
-    إنشاء JWT Token عام.
+    إنشاء JWT Token مع إرجاع محتواه مباشرة دون الحاجة لفكه من جديد.
 
     :param data: البيانات التي سيتم تضمينها في التوكن.
     :param expires_delta: مدة صلاحية مخصّصة (اختياري).
     :param default_expire: مدة الصلاحية الافتراضية عند عدم تحديد expires_delta.
-    :return: توكن مشفر.
+    :return: التوكن المشفر ومحتواه.
     """
     logger.debug("بدء إنشاء JWT Token")
     to_encode = data.copy()
 
-    expire = datetime.now(timezone.utc) + (expires_delta or default_expire)
-    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
-
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or default_expire)
+    # jti: معرّف عشوائي قصير يُستخدم في مفاتيح Redis بدل التوكن الكامل
+    to_encode.update(
+        {
+            "exp": int(expire.timestamp()),
+            "iat": int(now.timestamp()),
+            "jti": secrets.token_urlsafe(16),
+        }
     )
+
+    signing_key = active_signing_key()
+    if signing_key is not None:
+        encoded_jwt = get_jwt_backend().encode(
+            to_encode,
+            signing_key.private_key,
+            algorithm=signing_key.algorithm,
+            headers={"kid": signing_key.kid},
+        )
+    else:
+        encoded_jwt = get_jwt_backend().encode(
+            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
     logger.debug("تم إنشاء JWT Token بنجاح")
-    return encoded_jwt
+    return TokenContext(token=encoded_jwt, claims=MappingProxyType(to_encode))
+
+
+def create_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    default_expire: timedelta = timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_24HOURS),
+):
+    """
+    إنشاء JWT Token عام.
+
+    :param data: البيانات التي سيتم تضمينها في التوكن.
+    :param expires_delta: مدة صلاحية مخصّصة (اختياري).
+    :param default_expire: مدة الصلاحية الافتراضية عند عدم تحديد expires_delta.
+    :return: توكن مشفر.
+    """
+    return issue_token(data, expires_delta, default_expire).token
 
 
 def decode_token(token: str) -> Union[dict, None]:
@@ -70,16 +252,45 @@ def decode_token(token: str) -> Union[dict, None]:
     """
     logger.debug("محاولة فك JWT Token")
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        key, algorithms = _verification_key(token)
+        payload = get_jwt_backend().decode(token, key, algorithms=algorithms)
         logger.debug("تم فك JWT Token بنجاح")
         return payload
-    except JWTError as e:
+    except InvalidTokenError as e:
         logger.warning("فشل فك JWT Token: توكن غير صالح")
         raise TokenExpiredException("توكن غير صالح")
 
 
+def parse_token(token: str) -> TokenContext:
+    """
+    فك تشفير JWT Token مرة واحدة وإرجاعه كسياق ثابت يُعاد استخدامه خلال الطلب.
+    """
+    payload = decode_token(token)
+    return TokenContext(token=token, claims=MappingProxyType(payload))
+
+
+# ==============================
+# رموز التحديث (Refresh Tokens)
+# ==============================
+
+# رمز التحديث قيمة عشوائية معتمة لا تحمل أي بيانات، ولا يُخزن منها في قاعدة البيانات
+# إلا بصمتها (SHA-256) حتى لا تبقى الرموز نفسها محفوظة، ويتم التحقق بالبحث عن البصمة فقط.
+
+
+def generate_refresh_token() -> str:
+    """
+    إنشاء رمز تحديث عشوائي معتم.
+    """
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    إرجاع بصمة رمز التحديث بطول ثابت (64 حرفًا) لتخزينها والبحث بها.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 # ==============================
 # انشاء روابط التوكن المرسلة عبر البريد الإلكتروني
 # ==============================
@@ -5,22 +5,59 @@ from sqlalchemy import (
     String,
     DateTime,
     Boolean,
+    Index,
+    UniqueConstraint,
 )
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from project.core import Base
-from sqlalchemy.sql import func
+from project.core import Base, settings
+from sqlalchemy.sql import func, text
+
+
+# تقسيم جدول التوكنات حسب وقت الانتهاء (PostgreSQL فقط)، فيُحذف كل قسم منتهٍ دفعة واحدة.
+# القيود الفريدة في الجدول المقسم يجب أن تتضمن عمود التقسيم، لذلك يدخل expires_at
+# في المفتاح الأساسي وفي فهرس بصمة الرمز.
+TOKENS_PARTITIONED = settings.TOKENS_PARTITIONED and settings.DATABASE_URL.startswith(
+    "postgresql"
+)
+
+# شرط الفهرس الجزئي للتوكنات المعطلة. الاستعلامات تستخدم نفس النص حرفيًا، لأن
+# Token.is_active == False يُكتب في SQLite كـ "is_active = 0" ولا يطابقه المخطط مع الفهرس.
+TOKEN_INACTIVE = text("NOT tokens.is_active")
 
 
 class Token(Base):
     __tablename__ = "tokens"
+    __table_args__ = (
+        # التوكنات النشطة لكل مستخدم مرتبة بوقت الإنشاء (تطبيق الحد الأقصى للجلسات)
+        Index("ix_tokens_user_id_is_active_created_at", "user_id", "is_active", "created_at"),
+        # مهمة التنظيف: التوكنات المنتهية، والمعطلة حسب وقت إنشائها
+        Index("ix_tokens_expires_at", "expires_at"),
+        Index(
+            "ix_tokens_inactive_created_at",
+            "created_at",
+            postgresql_where=text("NOT is_active"),
+            sqlite_where=text("NOT is_active"),
+        ),
+    )
+    if not TOKENS_PARTITIONED:
+        __table_args__ += (UniqueConstraint("token_digest", name="uq_tokens_token_digest"),)
+    else:
+        __table_args__ += (
+            Index("ix_tokens_token_digest", "token_digest", "expires_at", unique=True),
+            {"postgresql_partition_by": "RANGE (expires_at)"},
+        )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    token = Column(String(500), nullable=False, unique=True)
+    # بصمة SHA-256 لرمز التحديث المعتم، ولا يُخزن الرمز نفسه
+    token_digest = Column(String(64), nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(
+        DateTime(timezone=True), nullable=False, primary_key=TOKENS_PARTITIONED
+    )
 
     user = relationship("User", back_populates="tokens")
 
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime,timezone
 from sqlalchemy import Date
 from sqlalchemy import (
@@ -16,6 +17,8 @@ from project.core import Base
 # User Model
 class User(Base):
     __tablename__ = "users"
+    # جلب القيم الافتراضية المحسوبة في قاعدة البيانات مع الإدراج نفسه (RETURNING) بدل refresh
+    __mapper_args__ = {"eager_defaults": True}
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     firstName = Column(String(255), nullable=False)
     lastName = Column(String(255), nullable=False)
@@ -32,9 +35,43 @@ class User(Base):
     registrationDate = Column(DateTime(timezone=True), nullable=False, default=func.now())
     isActive = Column(Boolean, nullable=False, default=True)
     last_password_change = Column(DateTime(timezone=True), nullable=False, default=datetime.now(timezone.utc))
+    # المجموعة (المستأجر) التي ينتمي لها المستخدم، تُستخدم لإبطال توكنات المجموعة كاملة
+    tenant = Column(String(64), index=True)
 
     # Relationships
-    tokens = relationship("Token", back_populates="user", lazy="selectin", cascade="all, delete-orphan", passive_deletes=True)
+    # لا يتم تحميل التوكنات تلقائيًا مع كل استعلام على المستخدم؛
+    # يجب طلبها صراحةً (selectinload) في المكان الذي يحتاجها فقط
+    tokens = relationship("Token", back_populates="user", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
-        return f"<User(id={self.id}, email='{self.email}')>"
\ No newline at end of file
+        return f"<User(id={self.id}, email='{self.email}')>"
+
+
+# الحد الأدنى من بيانات المستخدم الذي يحتاجه مسار المصادقة
+@dataclass(frozen=True, slots=True)
+class AuthPrincipal:
+    id: uuid.UUID
+    username: str
+    isActive: bool
+    last_password_change: datetime | None
+    tenant: str | None = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            isActive=user.isActive,
+            last_password_change=user.last_password_change,
+            tenant=user.tenant,
+        )
+
+
+# الأعمدة التي يُحمّلها مسار المصادقة بدل كائن المستخدم الكامل
+AUTH_PRINCIPAL_COLUMNS = (
+    User.id,
+    User.username,
+    User.isActive,
+    User.last_password_change,
+    User.tenant,
+)
\ No newline at end of file
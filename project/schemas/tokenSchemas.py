@@ -1,5 +1,6 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from project.core.config import settings
 
 class TokenSchema(BaseModel):
     access_token: str
@@ -8,4 +9,8 @@ class TokenSchema(BaseModel):
 
 
 class RefreshTokenRequest(BaseModel):
-    refresh_token: str
\ No newline at end of file
+    refresh_token: str
+
+class TokenIntrospectionRequest(BaseModel):
+    # الطلبات الأكبر من الحد تُرفض (422) أثناء التحقق من الطلب قبل فحص أي توكن
+    tokens: list[str] = Field(max_length=settings.INTROSPECTION_MAX_TOKENS)
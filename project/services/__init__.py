@@ -1,15 +1,17 @@
+from project.services.get_token_context import *
 from project.services.get_current_user import *
-from project.services.add_token_to_blacklist import *
-from project.services.add_token_to_redis import *
-from project.services.add_all_tokens_to_blacklist import *
-from project.services.is_token_in_redis import *
+from project.services.token_state import *
+from project.services.user_cache import *
 from project.services.process_logout import *
-from project.services.delete_user_from_redis import *
 from project.services.get_remaining_time import *
 from project.services.process_login import *
 from project.services.token_key_format import *
 from project.services.create_and_store_refresh_token import *
+from project.services.rotate_refresh_token import *
+from project.services.process_refresh import *
+from project.services.introspect_tokens import *
 from project.services.create_access_token import *
 from project.services.deactivate_refresh_tokens import *
+from project.services.token_reaper import *
 from project.services.send_email import *
 from project.services.render_email_template import *
\ No newline at end of file
@@ -3,15 +3,14 @@ from redis.asyncio import Redis
 from project.core import (
     logger,
     settings,
-    create_token,
-    decode_token,
+    issue_token,
 )
-from project.models import User
-from project.services.add_token_to_redis import add_token_to_redis
+from project.models import User, AuthPrincipal
+from project.services.token_state import store_active_token
 
 
 async def create_access_token(
-    user: User,
+    user: User | AuthPrincipal,
     redis: Redis,
 ) -> str:
     """
@@ -21,18 +20,19 @@ async def create_access_token(
     logger.debug("بدء إنشاء رمز الوصول وتخزينه في Redis")
     access_token_expires = timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_24HOURS)
     logger.debug("جاري إنشاء التوكن للمستخدم: %s", user.username)
-    access_token = create_token(
-        data={"sub": user.username},
+    claims = {"sub": user.username, "uid": str(user.id)}
+    if user.tenant:
+        # يُقرأ وقت إبطال توكنات المجموعة مع حالة التوكن
+        claims["tenant"] = user.tenant
+    # محتوى التوكن معروف عند إنشائه، فلا حاجة لفكه من جديد
+    access_token = issue_token(
+        data=claims,
         expires_delta=access_token_expires,
     )
     logger.debug("تم إنشاء التوكن بنجاح")
-    payload = decode_token(access_token)
-    logger.debug("تم فك تشفير التوكن بنجاح")
-
-    expire_in = int(access_token_expires.total_seconds())
 
     logger.debug("محاولة تخزين التوكن في Redis")
-    await add_token_to_redis(redis, payload, access_token, expire_in)
+    await store_active_token(redis, access_token)
 
     logger.info("تم إنشاء وتخزين رمز الوصول.")
-    return access_token
+    return access_token.token
@@ -1,52 +1,57 @@
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func
 from project.core import (
     logger,
     settings,
-    create_token,
+    save_changes,
+    generate_refresh_token,
+    hash_refresh_token,
     ServerErrorException,
 )
-from project.models import User
+from project.models import User, Token
 from project.services.deactivate_refresh_tokens import deactivate_user_refresh_tokens
 
 
-# دالة منفصلة لإنشاء وحفظ refresh token في قاعدة البيانات
-async def create_and_store_refresh_token(user: User, db: AsyncSession) -> str:
-    logger.debug("بدء إنشاء وحفظ refresh token في قاعدة البيانات")
+# الحد الأقصى لتوكنات التحديث النشطة لكل مستخدم
+MAX_ACTIVE_REFRESH_TOKENS = 3
 
+
+def new_refresh_token(user_id) -> tuple[str, Token]:
+    """
+    إنشاء رمز تحديث معتم مع كائن التوكن الذي يحمل بصمته (دون حفظه).
+    """
     refresh_token_expires = timedelta(weeks=settings.ACCESS_TOKEN_EXPIRE_WEEK)
-    logger.debug("بدء إنشاء وحفظ refresh token في قاعدة البيانات")
-    refresh_token = create_token(
-        data={"sub": user.username},
-        expires_delta=refresh_token_expires,
+    refresh_token = generate_refresh_token()
+    # وقت الإنشاء بدقة الميكروثانية حتى يكون ترتيب التوكنات (الأحدث أولًا) ثابتًا
+    created_at = datetime.now(timezone.utc)
+    token_obj = Token(
+        user_id=user_id,
+        token_digest=hash_refresh_token(refresh_token),
+        is_active=True,
+        created_at=created_at,
+        expires_at=created_at + refresh_token_expires,
     )
-    logger.debug("تم إنشاء refresh token بنجاح")
+    return refresh_token, token_obj
 
-    expires_at = datetime.now(timezone.utc) + refresh_token_expires
 
-    # تخزين التوكن في قاعدة البيانات
-    from project.models import Token  # استيراد داخل الدالة لتفادي الدوران
+# دالة منفصلة لإنشاء وحفظ refresh token في قاعدة البيانات
+async def create_and_store_refresh_token(user: User, db: AsyncSession) -> str:
+    logger.debug("بدء إنشاء وحفظ refresh token في قاعدة البيانات")
+
+    refresh_token, token_obj = new_refresh_token(user.id)
+    logger.debug("تم إنشاء refresh token بنجاح")
 
-    logger.debug("تجهيز كائن التوكن وتخزينه في قاعدة البيانات")
-    token_obj = Token(
-        user_id=user.id,
-        token=refresh_token,
-        is_active=True,
-        expires_at=expires_at,
-    )
     try:
+        # تعطيل التوكنات الزائدة مع ترك مكان للتوكن الجديد، ثم الحفظ في معاملة واحدة
+        await deactivate_user_refresh_tokens(
+            user.id, db, MAX_ACTIVE_REFRESH_TOKENS - 1
+        )
         db.add(token_obj)
-        await db.commit()
+        await save_changes(db)
         logger.info("تم تخزين refresh token بنجاح في قاعدة البيانات")
     except Exception as e:
         logger.error(f"فشل في انشاء refresh token - خطأ في قاعدة البيانات: {e}")
         await db.rollback()
         raise ServerErrorException("حدث خطأ أثناء انشاء رمز التحديث. يرجى المحاولة مرة أخرى لاحقًا.")
 
-    logger.debug("محاولة تعطيل جميع توكنات التحديث النشطة السابقة للمستخدم")
-    # تعطيل جميع توكنات التحديث النشطة للمستخدم قبل إنشاء توكن جديد
-    await deactivate_user_refresh_tokens(user.id, db)
-    logger.info("تم تعطيل جميع توكنات التحديث النشطة السابقة بنجاح")
-
     return refresh_token
@@ -1,6 +1,7 @@
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from project.core import logger, BadRequestResponse, ServerErrorException
+from sqlalchemy.orm import aliased
+from project.core import logger, save_changes, BadRequestException, ServerErrorException
 from project.models import Token
 
 
@@ -16,45 +17,60 @@ async def deactivate_all_user_refresh_tokens(
         logger.debug("بدء تعطيل جميع توكنات التحديث النشطة للمستخدم")
         query = update(Token).where(Token.user_id == user_id).values(is_active=False)
         await db.execute(query)
-        await db.commit()
+        await save_changes(db)
         logger.info("تم تعطيل جميع توكنات التحديث النشطة للمستخدم بنجاح")
     except Exception as e:
         logger.error("فشل أثناء تعطيل جميع توكنات التحديث", exc_info=True)
         raise ServerErrorException("فشل أثناء تعطيل جميع توكنات التحديث")
 
 
+def excess_refresh_tokens(user_id, max_tokens: int, exclude_digest: str | None = None):
+    """
+    استعلام فرعي يرجع معرّفات توكنات التحديث النشطة الزائدة عن أحدث max_tokens توكن،
+    باستخدام دالة النافذة row_number بدل تحميل التوكنات إلى بايثون.
+    """
+    token = aliased(Token)
+    conditions = [token.user_id == user_id, token.is_active == True]
+    if exclude_digest is not None:
+        conditions.append(token.token_digest != exclude_digest)
+
+    ranked = (
+        select(
+            token.id,
+            func.row_number()
+            .over(order_by=(token.created_at.desc(), token.id.desc()))
+            .label("rank"),
+        )
+        .where(*conditions)
+        .subquery()
+    )
+    return select(ranked.c.id).where(ranked.c.rank > max_tokens)
+
+
 async def deactivate_user_refresh_tokens(
     user_id: int,
     db: AsyncSession,
     max_tokens: int = 3,
 ):
     """
-    تعطيل توكنات التحديث النشطة الخاصة بالمستخدم اذا تجاوزت العدد المسموح.
+    تعطيل توكنات التحديث النشطة الخاصة بالمستخدم اذا تجاوزت العدد المسموح،
+    باستعلام UPDATE واحد ضمن المعاملة الحالية (الحفظ مسؤولية المستدعي).
     """
 
-    logger.debug("بدء فحص عدد توكنات التحديث النشطة للمستخدم")
-    if max_tokens <= 0:
-        logger.warning("الحد الأقصى للتوكنات غير صالح (أقل من أو يساوي صفر)")
-        raise BadRequestResponse("الحد الأقصى للتوكنات يجب أن يكون أكبر من صفر")
+    logger.debug("بدء تعطيل توكنات التحديث الزائدة للمستخدم")
+    if max_tokens < 0:
+        logger.warning("الحد الأقصى للتوكنات غير صالح (أقل من صفر)")
+        raise BadRequestException("الحد الأقصى للتوكنات يجب ألا يكون أقل من صفر")
 
     query = (
-        select(Token)
-        .where(Token.user_id == user_id, Token.is_active == True)
-        .order_by(Token.created_at.asc())
+        update(Token)
+        .where(Token.id.in_(excess_refresh_tokens(user_id, max_tokens)))
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
     )
-    result = await db.execute(query)
-    active_tokens = result.scalars().all()
-
     try:
-        logger.debug("عدد التوكنات النشطة الحالية: %d", len(active_tokens))
-        if len(active_tokens) > max_tokens:
-            tokens_to_deactivate = active_tokens[: len(active_tokens) - max_tokens]
-            logger.debug("عدد التوكنات التي سيتم تعطيلها: %d", len(tokens_to_deactivate))
-            for token in tokens_to_deactivate:
-                token.is_active = False
-            await db.commit()
-            logger.info("تم تعطيل التوكنات الزائدة بنجاح")
-        logger.debug("لم يتم تجاوز الحد الأقصى، لا حاجة لتعطيل أي توكن")
+        result = await db.execute(query)
+        logger.debug("عدد التوكنات التي تم تعطيلها: %d", result.rowcount)
     except Exception as e:
-        logger.error("فشل أثناء التحقق أو تعطيل التوكنات", exc_info=True)
+        logger.error("فشل أثناء تعطيل التوكنات الزائدة", exc_info=True)
         raise ServerErrorException("فشل أثناء التحقق أو تعطيل التوكنات")
@@ -1,81 +1,151 @@
+from typing import Any
+from uuid import UUID
 from fastapi import Depends
-from jose import JWTError
-from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from project.core import (
-    oauth2_scheme,
     logger,
-    get_db,
-    decode_token,
+    get_read_db,
+    use_primary,
+    release_connection,
     get_redis,
+    verified_token_cache,
+    TokenContext,
     TokenExpiredException,
     NotAuthenticatedException,
     BadRequestException,
 )
-from project.models import User
-from project.services.is_token_in_redis import (
-    is_token_blacklisted_in_redis,
-    is_token_active_in_redis,
+from project.models import User, AuthPrincipal, AUTH_PRINCIPAL_COLUMNS
+from project.services.get_token_context import resolve_token
+from project.services.user_cache import get_cached_principal, has_recent_write
+from project.services.token_state import (
+    TOKEN_BLACKLISTED,
+    TokenState,
+    get_token_state,
 )
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-    redis: Redis = Depends(get_redis),
-) -> User:
+def verify_token_claims(context: TokenContext) -> None:
+    if not context.subject:
+        raise TokenExpiredException("اسم المستخدم غير موجود داخل التوكن")
+    if not context.issued_at:
+        raise TokenExpiredException("وقت إصدار التوكن مفقود")
 
-    try:
 
-        payload = decode_token(token)
+def verify_token_state(context: TokenContext, token_state: TokenState) -> None:
+    if token_state.status == TOKEN_BLACKLISTED:
+        raise NotAuthenticatedException(
+            "تم تسجيل الخروج من هذا التوكن أو تم إلغاؤه"
+        )
 
-        if not isinstance(payload, dict):
-            raise TokenExpiredException("المحتوى الداخلي للتوكن غير صالح")
+    if not token_state.is_active:
+        raise NotAuthenticatedException("التوكن غير نشط، الرجاء تسجيل الدخول مجددًا")
 
-        username: str = payload.get("sub")
-        iat: int = payload.get("iat")  # وقت إصدار التوكن
+    # التحقق من أن التوكن لم يصدر قبل تغيير كلمة المرور دون الرجوع لقاعدة البيانات
+    if token_state.is_revoked_for(context):
+        raise TokenExpiredException("تم تغيير كلمة المرور بعد إصدار هذا التوكن")
 
-        if not username:
-            raise TokenExpiredException("اسم المستخدم غير موجود داخل التوكن")
-        if not iat:
-            raise TokenExpiredException("وقت إصدار التوكن مفقود")
 
-        if await is_token_blacklisted_in_redis(payload, token, redis):
-            raise NotAuthenticatedException(
-                "تم تسجيل الخروج من هذا التوكن أو تم إلغاؤه"
-            )
+async def _verify_token(context: TokenContext, redis: Redis) -> TokenState:
+    verify_token_claims(context)
 
-        if not await is_token_active_in_redis(payload, token, redis):
-            raise NotAuthenticatedException("التوكن غير نشط، الرجاء تسجيل الدخول مجددًا")
+    # قراءة حالة التوكن ووقت إلغاء توكنات المستخدم بطلب واحد إلى Redis
+    token_state = await get_token_state(redis, context)
+    verify_token_state(context, token_state)
+    return token_state
 
-        result = await db.execute(select(User).where(User.username == username))
-        user = result.scalars().first()
 
-        # التحقق من وجود المستخدم
-        if user is None:
-            raise BadRequestException()
-        
-        # التحقق من أن حساب المستخدم نشط
-        if not user.isActive:
-            logger.warning("حساب هذا المستخدم غير نشط")
-            raise NotAuthenticatedException()
+def verify_user(user: AuthPrincipal | User | None, context: TokenContext) -> None:
+    # التحقق من وجود المستخدم
+    if user is None:
+        raise BadRequestException()
+
+    # التحقق من أن حساب المستخدم نشط
+    if not user.isActive:
+        logger.warning("حساب هذا المستخدم غير نشط")
+        raise NotAuthenticatedException()
+
+    # التحقق من أن التوكن لم يصدر قبل تغيير كلمة المرور
+    if (
+        user.last_password_change
+        and context.issued_at < user.last_password_change.timestamp()
+    ):
+        raise TokenExpiredException("تم تغيير كلمة المرور بعد إصدار هذا التوكن")
 
-        # التحقق من أن التوكن لم يصدر قبل تغيير كلمة المرور
-        if user.last_password_change and iat < user.last_password_change.timestamp():
-            raise TokenExpiredException("تم تغيير كلمة المرور بعد إصدار هذا التوكن")
 
+async def get_current_user(
+    resolved: tuple[TokenContext, Any | None] = Depends(resolve_token),
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+) -> AuthPrincipal:
+    """
+    المستخدم الحالي كبيانات مصادقة فقط (المعرّف، الاسم، الحالة، آخر تغيير لكلمة المرور).
+    """
+
+    # عند تفعيل الذاكرة المؤقتة نتخطى فك التوكن وعمليات Redis وقاعدة البيانات
+    context, cached_user = resolved
+    if cached_user is not None:
+        return cached_user
+
+    token_state = await _verify_token(context, redis)
+    if token_state.recent_write:
+        # النسخ المتماثلة قد لا تحتوي بعد على آخر تعديل لهذا المستخدم
+        use_primary(db)
+
+    # تحميل الأعمدة اللازمة للمصادقة فقط بدل كائن المستخدم الكامل
+    async def load_principal(condition) -> AuthPrincipal | None:
+        result = await db.execute(select(*AUTH_PRINCIPAL_COLUMNS).where(condition))
+        row = result.first()
+        await release_connection(db)
+        return AuthPrincipal(**row._mapping) if row is not None else None
+
+    if context.user_id:
+        # قراءة المستخدم من Redis، ولا يتم الرجوع لقاعدة البيانات إلا عند غيابه
+        user = await get_cached_principal(
+            redis,
+            context.user_id,
+            lambda: load_principal(User.id == UUID(context.user_id)),
+        )
+    else:
+        # التوكنات القديمة لا تحمل معرّف المستخدم
+        user = await load_principal(User.username == context.subject)
+
+    verify_user(user, context)
+
+    verified_token_cache.set(context, user)
+    return user
+
+
+async def get_current_user_profile(
+    resolved: tuple[TokenContext, Any | None] = Depends(resolve_token),
+    db: AsyncSession = Depends(get_read_db),
+    redis: Redis = Depends(get_redis),
+) -> User:
+    """
+    المستخدم الحالي ككائن كامل للمسارات التي تعرض بياناته، باستعلام واحد فقط.
+    """
+
+    context, cached_user = resolved
+    if cached_user is not None:
+        if await has_recent_write(redis, cached_user.id):
+            use_primary(db)
+        user = await db.get(User, cached_user.id)
+        await release_connection(db)
+        if user is None:
+            raise BadRequestException()
         return user
 
-    except ExpiredSignatureError as e:
-        logger.warning("انتهت صلاحية التوكن.")
-        raise TokenExpiredException("انتهت صلاحية التوكن")
+    token_state = await _verify_token(context, redis)
+    if token_state.recent_write:
+        # النسخ المتماثلة قد لا تحتوي بعد على آخر تعديل لهذا المستخدم
+        use_primary(db)
+
+    result = await db.execute(select(User).where(User.username == context.subject))
+    user = result.scalars().first()
+    await release_connection(db)
 
-    except JWTClaimsError as e:
-        logger.error("المحتوى الداخلي للتوكن غير صالح.")
-        raise TokenExpiredException("المحتوى الداخلي للتوكن غير صالح")
+    verify_user(user, context)
 
-    except JWTError as e:
-        logger.error("توكن غير صالح.")
-        raise TokenExpiredException("توكن غير صالح")
+    verified_token_cache.set(context, AuthPrincipal.from_user(user))
+    return user
@@ -0,0 +1,28 @@
+from typing import Any
+from fastapi import Depends
+from project.core import (
+    oauth2_scheme,
+    parse_token,
+    verified_token_cache,
+    TokenContext,
+)
+
+
+# تُحل مرة واحدة لكل طلب (FastAPI يخزن نتيجة الاعتماديات داخل الطلب):
+# إما من الذاكرة المؤقتة للتوكنات التي تم التحقق منها، أو بفك التوكن مرة واحدة.
+async def resolve_token(
+    token: str = Depends(oauth2_scheme),
+) -> tuple[TokenContext, Any | None]:
+    cached = verified_token_cache.get(token)
+    if cached is not None:
+        return cached
+    return parse_token(token), None
+
+
+async def get_token_context(
+    resolved: tuple[TokenContext, Any | None] = Depends(resolve_token),
+) -> TokenContext:
+    """
+    سياق التوكن الحالي (المحتوى والمدة المتبقية) دون إعادة فك التوكن.
+    """
+    return resolved[0]
@@ -0,0 +1,139 @@
+import secrets
+from uuid import UUID
+from fastapi import Header
+from redis.asyncio import Redis
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from project.core import (
+    logger,
+    metrics,
+    settings,
+    parse_token,
+    use_primary,
+    release_connection,
+    verified_token_cache,
+    TokenContext,
+    CustomException,
+    BadRequestException,
+    PermissionDeniedException,
+)
+from project.models import User, AuthPrincipal, AUTH_PRINCIPAL_COLUMNS
+from project.services.get_current_user import (
+    verify_token_claims,
+    verify_token_state,
+    verify_user,
+)
+from project.services.token_state import get_token_states
+
+
+# ==============================
+# فحص التوكنات دفعة واحدة (للبوابات)
+# ==============================
+
+# بدل استدعاء /me لكل طلب تمرره البوابة، تُرسل البوابة مجموعة توكنات في طلب واحد:
+# فك التوكنات محليًا، ثم حالة جميعها من Redis عبر pipeline واحد،
+# ثم مستخدميها باستعلام IN واحد، بنفس قواعد التحقق التي يطبقها get_current_user.
+
+INACTIVE = {"active": False}
+
+
+async def verify_introspection_client(
+    x_api_key: str | None = Header(default=None),
+) -> None:
+    """
+    السماح فقط للبوابات التي تحمل أحد مفاتيح INTROSPECTION_API_KEYS في ترويسة X-API-Key.
+    """
+    if not x_api_key or not any(
+        secrets.compare_digest(x_api_key, key) for key in settings.INTROSPECTION_API_KEYS
+    ):
+        logger.warning("طلب فحص توكنات من جهة غير مصرح لها")
+        raise PermissionDeniedException()
+
+
+def _parse(token: str) -> tuple[TokenContext | None, AuthPrincipal | None]:
+    cached = verified_token_cache.get(token)
+    if cached is not None:
+        return cached
+    try:
+        context = parse_token(token)
+        verify_token_claims(context)
+        if context.user_id:
+            UUID(context.user_id)
+    except (CustomException, ValueError) as e:
+        return None, None
+    return context, None
+
+
+async def _load_principals(
+    db: AsyncSession, contexts: list[TokenContext]
+) -> tuple[dict[str, AuthPrincipal], dict[str, AuthPrincipal]]:
+    user_ids = {UUID(context.user_id) for context in contexts if context.user_id}
+    # التوكنات القديمة لا تحمل معرّف المستخدم
+    usernames = {context.subject for context in contexts if not context.user_id}
+
+    conditions = []
+    if user_ids:
+        conditions.append(User.id.in_(user_ids))
+    if usernames:
+        conditions.append(User.username.in_(usernames))
+    if not conditions:
+        return {}, {}
+
+    result = await db.execute(select(*AUTH_PRINCIPAL_COLUMNS).where(or_(*conditions)))
+    principals = [AuthPrincipal(**row._mapping) for row in result]
+    await release_connection(db)
+    return (
+        {str(principal.id): principal for principal in principals},
+        {principal.username: principal for principal in principals},
+    )
+
+
+async def introspect_tokens(
+    tokens: list[str], db: AsyncSession, redis: Redis
+) -> list[dict]:
+    """
+    فحص مجموعة توكنات وإرجاع نتيجة لكل توكن بنفس الترتيب:
+    {"active": True, ...محتوى التوكن} أو {"active": False}.
+    """
+    if len(tokens) > settings.INTROSPECTION_MAX_TOKENS:
+        raise BadRequestException(
+            f"الحد الأقصى لعدد التوكنات في الطلب الواحد هو {settings.INTROSPECTION_MAX_TOKENS}"
+        )
+
+    results: list[dict] = [INACTIVE] * len(tokens)
+    pending: list[tuple[int, TokenContext]] = []
+    for index, token in enumerate(tokens):
+        context, cached_user = _parse(token)
+        if cached_user is not None:
+            results[index] = {"active": True, **context.claims}
+        elif context is not None:
+            pending.append((index, context))
+
+    # حالة جميع التوكنات ووقت إلغاء توكنات مستخدميها بذهاب وإياب واحد إلى Redis
+    states = await get_token_states(redis, [context for _, context in pending])
+    candidates = []
+    for (index, context), token_state in zip(pending, states):
+        try:
+            verify_token_state(context, token_state)
+        except CustomException as e:
+            continue
+        if token_state.recent_write:
+            use_primary(db)
+        candidates.append((index, context))
+
+    by_id, by_username = await _load_principals(db, [context for _, context in candidates])
+    for index, context in candidates:
+        if context.user_id:
+            user = by_id.get(context.user_id)
+        else:
+            user = by_username.get(context.subject)
+        try:
+            verify_user(user, context)
+        except CustomException as e:
+            continue
+        verified_token_cache.set(context, user)
+        results[index] = {"active": True, **context.claims}
+
+    metrics.incr("introspection.tokens", len(tokens))
+    metrics.incr("introspection.active", sum(result["active"] for result in results))
+    return results
@@ -4,7 +4,8 @@ from sqlalchemy import select
 from project.core import (
     logger,
     CredentialsValidationException,
-    verify_password,
+    verify_password_async,
+    release_connection,
 )
 from project.models import User
 from project.schemas import TokenSchema
@@ -23,12 +24,14 @@ async def process_login(
     query = select(User).where(User.username == username)
     result = await db.execute(query)
     user = result.scalars().first()
+    # عدم حجز اتصال قاعدة البيانات أثناء التحقق من كلمة المرور (عملية طويلة)
+    await release_connection(db)
 
     if not user:
         logger.warning("المستخدم غير موجود: %s", username)
         raise CredentialsValidationException("اسم المستخدم أو كلمة المرور غير صحيحة")
     
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         logger.warning("كلمة مرور غير صحيحة للمستخدم: %s", username)
         raise CredentialsValidationException("اسم المستخدم أو كلمة المرور غير صحيحة")
     
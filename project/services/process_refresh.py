@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from project.core import logger, metrics, settings, hash_refresh_token
+from project.schemas import TokenSchema
+from project.services.create_access_token import create_access_token
+from project.services.rotate_refresh_token import rotate_refresh_token
+
+
+# ==============================
+# دمج طلبات التحديث المتزامنة
+# ==============================
+
+# العملاء الذين يرسلون نفس رمز التحديث أكثر من مرة (عدة تبويبات أو إعادة محاولة)
+# يحصلون على نفس الزوج المُدوّر بدل تدوير الرمز عدة مرات:
+# - داخل العامل: طلب واحد فقط يُنفذ التدوير والبقية تنتظر نتيجته.
+# - بين العمال: قفل قصير في Redis، والنتيجة تُحفظ لمهلة قصيرة باسم بصمة الرمز القديم.
+# النتيجة المحفوظة مشفرة (AES-GCM) بمفتاح مشتق من رمز التحديث القديم نفسه، فلا يمكن
+# قراءتها من Redis دون الرمز، والبصمة في اسم المفتاح لا تكفي لاشتقاقه.
+
+
+def refresh_result_key(digest: str) -> str:
+    return f"refresh_result:{digest}"
+
+
+def refresh_lock_key(digest: str) -> str:
+    return f"refresh_lock:{digest}"
+
+
+# عمليات التحديث الجارية داخل هذا العامل حسب بصمة رمز التحديث
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _result_cipher(refresh_token: str) -> AESGCM:
+    # مفتاح منفصل عن بصمة البحث (SHA-256 للرمز) عبر HMAC بتسمية خاصة
+    key = hmac.new(b"refresh_result", refresh_token.encode(), hashlib.sha256).digest()
+    return AESGCM(key)
+
+
+def _encrypt_result(refresh_token: str, digest: str, result: TokenSchema) -> str:
+    nonce = os.urandom(12)
+    ciphertext = _result_cipher(refresh_token).encrypt(
+        nonce, result.model_dump_json().encode(), digest.encode()
+    )
+    return base64.urlsafe_b64encode(nonce + ciphertext).decode()
+
+
+async def _read_result(
+    redis: Redis, refresh_token: str, digest: str
+) -> TokenSchema | None:
+    raw = await redis.get(refresh_result_key(digest))
+    if not raw:
+        return None
+    data = base64.urlsafe_b64decode(raw)
+    try:
+        plaintext = _result_cipher(refresh_token).decrypt(
+            data[:12], data[12:], digest.encode()
+        )
+    except InvalidTag:
+        logger.warning("تعذر فك تشفير نتيجة التحديث المحفوظة")
+        return None
+    return TokenSchema.model_validate_json(plaintext)
+
+
+async def process_refresh(
+    refresh_token: str, db: AsyncSession, redis: Redis
+) -> TokenSchema:
+    """
+    تدوير رمز التحديث وإنشاء رمز وصول جديد مرة واحدة فقط لكل رمز تحديث،
+    وإرجاع نفس النتيجة للطلبات المتزامنة أو المكررة خلال مهلة قصيرة.
+    """
+    digest = hash_refresh_token(refresh_token)
+
+    result = await _read_result(redis, refresh_token, digest)
+    if result is not None:
+        metrics.incr("refresh.coalesced")
+        logger.debug("إرجاع نتيجة تحديث سابقة لنفس رمز التحديث")
+        return result
+
+    # طلب آخر في نفس العامل يُحدّث بهذا الرمز حاليًا
+    pending = _in_flight.get(digest)
+    if pending is not None:
+        metrics.incr("refresh.coalesced")
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[digest] = future
+    try:
+        result = await _refresh(refresh_token, digest, db, redis)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        # منع تحذير "استثناء لم يُسترجع" عند عدم وجود منتظرين
+        future.exception()
+        raise
+    finally:
+        _in_flight.pop(digest, None)
+
+
+async def _refresh(
+    refresh_token: str, digest: str, db: AsyncSession, redis: Redis
+) -> TokenSchema:
+    lock_key = refresh_lock_key(digest)
+    lock_ttl = settings.REFRESH_LOCK_MILLISECONDS
+
+    # عامل واحد فقط يُدوّر الرمز، والبقية تنتظر نتيجته من Redis
+    acquired = await redis.set(lock_key, 1, nx=True, px=lock_ttl)
+    if not acquired:
+        for _ in range(max(1, lock_ttl // 25)):
+            await asyncio.sleep(0.025)
+            result = await _read_result(redis, refresh_token, digest)
+            if result is not None:
+                metrics.incr("refresh.coalesced")
+                return result
+        logger.debug("انتهت مهلة انتظار نتيجة التحديث من عامل آخر")
+
+    try:
+        metrics.incr("refresh.rotations")
+        # تعطيل الرمز القديم وإنشاء رمز جديد في معاملة واحدة
+        user, new_refresh_token = await rotate_refresh_token(refresh_token, db, redis)
+        logger.debug("تم إنشاء refresh token جديد")
+
+        new_access_token = await create_access_token(user, redis)
+        logger.debug("تم إنشاء access token جديد")
+
+        result = TokenSchema(
+            access_token=new_access_token,
+            token_type="bearer",
+            refresh_token=new_refresh_token,
+        )
+        await redis.set(
+            refresh_result_key(digest),
+            _encrypt_result(refresh_token, digest, result),
+            ex=settings.REFRESH_GRACE_SECONDS,
+        )
+        return result
+    finally:
+        if acquired:
+            await redis.delete(lock_key)
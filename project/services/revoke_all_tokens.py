@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+from redis.asyncio import Redis
+from project.core import logger
+from project.services.token_state import set_revocation_epoch
+
+
+async def revoke_all_tokens(
+    redis: Redis, tenant: str | None = None, issued_before: float | None = None
+) -> float:
+    """
+    إبطال جميع توكنات الوصول ورموز التحديث الصادرة قبل الوقت المحدد (الآن افتراضيًا)،
+    لكل المستخدمين أو لمجموعة واحدة، بكتابة واحدة في Redis.
+    """
+    valid_after = await set_revocation_epoch(redis, tenant, issued_before)
+    # الأداة تعمل في عملية منفصلة عن عمال التطبيق، والتوكنات المحفوظة في ذاكرتهم
+    # المؤقتة (AUTH_CACHE_ENABLED) تنتهي خلال AUTH_CACHE_TTL_SECONDS
+    logger.warning(
+        "تم إبطال جميع التوكنات الصادرة قبل %.3f (%s)",
+        valid_after,
+        f"المجموعة: {tenant}" if tenant else "جميع المستخدمين",
+    )
+    return valid_after
+
+
+# للاستخدام عند الحوادث (الوحدة لا تُستورد في project.services حتى تعمل مباشرة عبر -m):
+# python -m project.services.revoke_all_tokens [--tenant TENANT] [--before UNIX_TIME]
+if __name__ == "__main__":
+    from project.core import get_redis
+
+    parser = argparse.ArgumentParser(description="إبطال جميع التوكنات الصادرة قبل وقت معين")
+    parser.add_argument("--tenant", help="إبطال توكنات هذه المجموعة فقط")
+    parser.add_argument("--before", type=float, help="وقت الإبطال (Unix)، الآن افتراضيًا")
+    args = parser.parse_args()
+
+    async def main():
+        redis = get_redis()
+        try:
+            print(await revoke_all_tokens(redis, args.tenant, args.before))
+        finally:
+            await redis.aclose()
+
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
+from sqlalchemy.orm import aliased
+from project.core import (
+    logger,
+    hash_refresh_token,
+    TokenExpiredException,
+    ServerErrorException,
+)
+from project.models import User, Token, AuthPrincipal, AUTH_PRINCIPAL_COLUMNS
+from project.services.deactivate_refresh_tokens import excess_refresh_tokens
+from project.services.create_and_store_refresh_token import (
+    MAX_ACTIVE_REFRESH_TOKENS,
+    new_refresh_token,
+)
+from project.services.token_state import get_revocation_epoch
+
+
+async def rotate_refresh_token(
+    refresh_token: str, db: AsyncSession, redis: Redis
+) -> tuple[AuthPrincipal, str]:
+    """
+    تدوير رمز التحديث في معاملة واحدة وباستعلامين فقط:
+    1. UPDATE واحد يعطّل الرمز القديم وكل ما يتجاوز الحد المسموح، ويرجع بيانات المستخدم.
+    2. INSERT للرمز الجديد.
+    يرفع TokenExpiredException إذا كان الرمز غير موجود أو غير نشط أو منتهي الصلاحية،
+    أو صدر قبل وقت إبطال جماعي (عام أو لمجموعة المستخدم).
+    """
+    logger.debug("بدء تدوير رمز التحديث")
+    digest = hash_refresh_token(refresh_token)
+
+    # صاحب الرمز إذا كان الرمز نشطًا وغير منتهي
+    current = aliased(Token)
+    owner = (
+        select(current.user_id)
+        .where(
+            current.token_digest == digest,
+            current.is_active == True,
+            current.expires_at > datetime.now(timezone.utc),
+        )
+        .scalar_subquery()
+    )
+
+    # بيانات المستخدم تُرجع عبر استعلامات فرعية على المفتاح الأساسي،
+    # لأن RETURNING في SQLite لا يقبل أعمدة جداول FROM
+    principal_columns = [Token.user_id] + [
+        select(column).where(User.id == Token.user_id).scalar_subquery()
+        for column in AUTH_PRINCIPAL_COLUMNS[1:]
+    ]
+    principal_size = len(principal_columns)
+
+    # الرمز القديم + التوكنات الأقدم التي لن يبقى لها مكان بعد إضافة الرمز الجديد
+    query = (
+        update(Token)
+        .where(
+            Token.user_id == owner,
+            Token.is_active == True,
+            or_(
+                Token.token_digest == digest,
+                Token.id.in_(
+                    excess_refresh_tokens(
+                        owner, MAX_ACTIVE_REFRESH_TOKENS - 1, exclude_digest=digest
+                    )
+                ),
+            ),
+        )
+        .values(is_active=False)
+        .returning(*principal_columns, Token.token_digest, Token.created_at)
+        .execution_options(synchronize_session=False)
+    )
+
+    try:
+        rows = (await db.execute(query)).all()
+    except Exception as e:
+        logger.error("فشل أثناء التحقق من رمز التحديث", exc_info=True)
+        await db.rollback()
+        raise ServerErrorException("حدث خطأ أثناء تحديث رمز الوصول")
+
+    # الرمز القديم نفسه قد لا يكون ضمن النتيجة (مثلًا إذا عطّله طلب متزامن بين
+    # تقييم الاستعلام الفرعي وتنفيذ التحديث)، وحينها يُعامل كرمز غير صالح
+    row = next((row for row in rows if row[principal_size] == digest), None)
+    if row is None:
+        logger.warning("فشل التحقق من رمز التحديث: غير موجود أو غير نشط")
+        await db.rollback()
+        raise TokenExpiredException("رمز التحديث منتهي الصلاحية أو غير صالح")
+
+    principal = AuthPrincipal(*row[:principal_size])
+    logger.debug("تم العثور على المستخدم المطابق للتوكن")
+
+    # الإبطال الجماعي: مقارنة وقت إنشاء الرمز بوقت الإبطال العام ووقت إبطال مجموعة المستخدم
+    try:
+        valid_after = await get_revocation_epoch(redis, principal.tenant)
+    except Exception as e:
+        logger.error("فشل أثناء قراءة وقت الإبطال الجماعي من Redis", exc_info=True)
+        await db.rollback()
+        raise ServerErrorException("حدث خطأ أثناء تحديث رمز الوصول")
+
+    created_at = row[principal_size + 1]
+    if created_at.tzinfo is None:
+        # SQLite لا يحفظ المنطقة الزمنية
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    if valid_after is not None and created_at.timestamp() < valid_after:
+        logger.warning("رمز تحديث صدر قبل وقت الإبطال الجماعي")
+        await db.rollback()
+        raise TokenExpiredException("تم إبطال رمز التحديث، الرجاء تسجيل الدخول مجددًا")
+
+    new_token, token_obj = new_refresh_token(principal.id)
+    try:
+        db.add(token_obj)
+        # التدوير يُحفظ فورًا وليس في نهاية الطلب، لأن نتيجته تُنشر لطلبات أخرى
+        # متزامنة بنفس الرمز (process_refresh) ويجب ألا تشير إلى رمز لم يُحفظ بعد
+        await db.commit()
+    except Exception as e:
+        logger.error(f"فشل في تدوير refresh token - خطأ في قاعدة البيانات: {e}")
+        await db.rollback()
+        raise ServerErrorException("حدث خطأ أثناء انشاء رمز التحديث. يرجى المحاولة مرة أخرى لاحقًا.")
+
+    logger.info("تم تدوير رمز التحديث بنجاح")
+    return principal, new_token
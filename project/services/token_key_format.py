@@ -1,6 +1,26 @@
 from project.core import logger
 
 
-def token_key_format(username: str, token: str) -> str:
-    logger.debug("تم توليد المفتاح: user_token:%s:<token>", username)
-    return f"user_token:{username}:{token}"
+def token_key_format(username: str, token_id: str) -> str:
+    logger.debug("تم توليد المفتاح: user_token:%s:<token_id>", username)
+    return f"user_token:{username}:{token_id}"
+
+
+# علامة كتابة حديثة على المستخدم: تُقرأ بياناته من قاعدة البيانات الأساسية حتى تلحق بها النسخ المتماثلة
+def user_recent_write_key(user_id: str) -> str:
+    return f"user_recent_write:{user_id}"
+
+
+# وقت الإبطال العام: أي توكن (وصول أو تحديث) صدر قبله يُعتبر ملغى
+def global_epoch_key() -> str:
+    return "revocation_epoch:global"
+
+
+# وقت إبطال توكنات مجموعة (مستأجر) واحدة
+def tenant_epoch_key(tenant: str) -> str:
+    return f"revocation_epoch:tenant:{tenant}"
+
+
+# وقت "الصلاحية بعد" للمستخدم: أي توكن صدر قبله يُعتبر ملغى (تغيير أو استعادة كلمة المرور)
+def user_epoch_key(user_id: str) -> str:
+    return f"user_epoch:{user_id}"
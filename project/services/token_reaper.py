@@ -0,0 +1,218 @@
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete, or_, select, text
+from project.core import (
+    logger,
+    metrics,
+    settings,
+    engine,
+    AsyncSessionLocal,
+    get_redis,
+)
+from project.models import Token, TOKEN_INACTIVE, TOKENS_PARTITIONED
+
+
+# ==============================
+# تنظيف توكنات التحديث المنتهية
+# ==============================
+
+# صفوف التوكنات لا تُحذف عند تعطيلها، لذلك تعمل مهمة خلفية دورية تحذف
+# المنتهية والمعطلة منها على دفعات محدودة الحجم، كل دفعة في معاملة مستقلة
+# حتى لا تُقفل الجدول لفترة طويلة. عند تفعيل التقسيم (PostgreSQL) تُحذف
+# الأقسام المنتهية بالكامل بدل حذف صفوفها واحدًا واحدًا.
+
+REAPER_LOCK_KEY = "token_reaper_lock"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def _partition_span() -> timedelta:
+    return timedelta(days=max(1, settings.TOKENS_PARTITION_DAYS))
+
+
+def _partition_start(moment: datetime) -> datetime:
+    # بدايات الأقسام ثابتة ومحاذاة لبداية التوقيت حتى تتطابق بين جميع العمال
+    span = _partition_span()
+    return _EPOCH + ((moment - _EPOCH) // span) * span
+
+
+def token_partition_ranges(now: datetime) -> list[tuple[str, datetime, datetime]]:
+    """
+    أسماء وحدود أقسام جدول التوكنات من القسم الحالي حتى أبعد وقت انتهاء ممكن لرمز تحديث جديد.
+    """
+    span = _partition_span()
+    horizon = now + timedelta(weeks=settings.ACCESS_TOKEN_EXPIRE_WEEK) + span
+    start = _partition_start(now)
+
+    ranges = []
+    while start < horizon:
+        ranges.append((f"tokens_p{start:%Y%m%d}", start, start + span))
+        start += span
+    return ranges
+
+
+def token_partition_ddl(name: str, start: datetime, end: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tokens "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+# قسم احتياطي حتى لا يفشل الإدراج إذا تأخر إنشاء الأقسام
+DEFAULT_PARTITION_DDL = "CREATE TABLE IF NOT EXISTS tokens_default PARTITION OF tokens DEFAULT"
+
+
+async def ensure_token_partitions() -> None:
+    """
+    إنشاء أقسام جدول التوكنات القادمة إذا لم تكن موجودة.
+    """
+    if not TOKENS_PARTITIONED:
+        return
+
+    async with engine.begin() as conn:
+        await conn.execute(text(DEFAULT_PARTITION_DDL))
+        for name, start, end in token_partition_ranges(datetime.now(timezone.utc)):
+            await conn.execute(text(token_partition_ddl(name, start, end)))
+    logger.debug("تم التأكد من وجود أقسام جدول التوكنات")
+
+
+async def prepare_token_partitions() -> bool:
+    """
+    مثل ensure_token_partitions لكن يسجل الخطأ بدل رفعه، ويرجع True عند النجاح.
+    """
+    try:
+        await ensure_token_partitions()
+        return True
+    except Exception as e:
+        metrics.incr("token_reaper.partition_errors")
+        logger.error("فشل في إنشاء أقسام جدول التوكنات", exc_info=True)
+        return False
+
+
+async def drop_expired_token_partitions() -> int:
+    """
+    حذف أقسام جدول التوكنات التي انتهت جميع توكناتها. ترجع عدد الأقسام المحذوفة.
+    """
+    if not TOKENS_PARTITIONED:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    dropped = 0
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'tokens'::regclass"
+            )
+        )
+        for name, bound in result.all():
+            match = _UPPER_BOUND.search(bound or "")
+            if not match or datetime.fromisoformat(match.group(1)) > now:
+                continue
+            await conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            dropped += 1
+            logger.info("تم حذف قسم التوكنات المنتهي: %s", name)
+    return dropped
+
+
+async def purge_refresh_tokens(batch_size: int, max_batches: int) -> int:
+    """
+    حذف توكنات التحديث المنتهية أو المعطلة على دفعات محدودة. ترجع عدد الصفوف المحذوفة.
+    """
+    now = datetime.now(timezone.utc)
+    inactive = and_(
+        TOKEN_INACTIVE,
+        Token.created_at
+        < now - timedelta(seconds=settings.TOKEN_REAPER_INACTIVE_RETENTION_SECONDS),
+    )
+    # في الجدول المقسم تُحذف التوكنات المنتهية مع أقسامها
+    condition = inactive if TOKENS_PARTITIONED else or_(Token.expires_at < now, inactive)
+
+    deleted = 0
+    for _ in range(max_batches):
+        batch = select(Token.id).where(condition).limit(batch_size)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                delete(Token)
+                .where(Token.id.in_(batch))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        deleted += result.rowcount
+        metrics.incr("token_reaper.deleted", result.rowcount)
+        if result.rowcount < batch_size:
+            break
+        # إتاحة الفرصة لبقية الطلبات بين الدفعات
+        await asyncio.sleep(0)
+    return deleted
+
+
+class TokenReaper:
+    """
+    مهمة خلفية دورية لتنظيف جدول التوكنات، تعمل مرة واحدة في كل فترة على مستوى جميع العمال.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # لا يتم تنفيذ أي DDL هنا: الأقسام الأولى تُنشأ عبر الترحيلات، والقادمة داخل
+        # run_once تحت قفل Redis حتى لا ينفذها جميع العمال عند التشغيل
+        if not settings.TOKEN_REAPER_ENABLED or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info("تم تشغيل مهمة تنظيف التوكنات")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                metrics.incr("token_reaper.errors")
+                logger.error("فشل أثناء تنظيف التوكنات", exc_info=True)
+            await asyncio.sleep(settings.TOKEN_REAPER_INTERVAL_SECONDS)
+
+    async def run_once(self) -> int | None:
+        """
+        تنفيذ دورة تنظيف واحدة إذا لم ينفذها عامل آخر خلال الفترة الحالية.
+        """
+        acquired = await get_redis().set(
+            REAPER_LOCK_KEY,
+            1,
+            nx=True,
+            ex=max(1, settings.TOKEN_REAPER_INTERVAL_SECONDS - 1),
+        )
+        if not acquired:
+            return None
+
+        with metrics.timer("token_reaper.run"):
+            # فشل إنشاء الأقسام لا يوقف التنظيف، والإدراج يستخدم القسم الاحتياطي حتى الدورة التالية
+            await prepare_token_partitions()
+            dropped = await drop_expired_token_partitions()
+            deleted = await purge_refresh_tokens(
+                settings.TOKEN_REAPER_BATCH_SIZE, settings.TOKEN_REAPER_MAX_BATCHES
+            )
+
+        metrics.incr("token_reaper.partitions_dropped", dropped)
+        metrics.set_gauge("token_reaper.last_run", time.time())
+        metrics.set_gauge("token_reaper.last_deleted", deleted)
+        logger.info("تم تنظيف التوكنات: %d صف و %d قسم", deleted, dropped)
+        return deleted
+
+
+token_reaper = TokenReaper()
@@ -0,0 +1,284 @@
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from project.core import (
+    logger,
+    TokenContext,
+    TokenExpiredException,
+    ServerErrorException,
+    settings,
+)
+from project.services.token_key_format import (
+    token_key_format,
+    user_epoch_key,
+    user_recent_write_key,
+    global_epoch_key,
+    tenant_epoch_key,
+)
+
+
+# ==============================
+# حالة التوكنات في Redis
+# ==============================
+
+# كل توكن له مفتاح واحد في Redis قيمته إحدى الحالات التالية.
+# القراءة تتم بطلب واحد، وكل انتقال بين الحالات يتم ذريًا داخل Redis
+# عبر سكربت Lua حتى لا توجد نافذة سباق بين القراءة والكتابة.
+TOKEN_ACTIVE = "active"
+TOKEN_BLACKLISTED = "blacklisted"
+
+# مفتاح التوكن يحمل معرّفه القصير (jti) بدل التوكن الكامل.
+# ولكل مستخدم وقت "صلاحية بعد" (epoch) يُقرأ مع حالة التوكن في نفس الطلب،
+# فيُلغي تغيير كلمة المرور جميع التوكنات السابقة بكتابة واحدة دون تتبع جلسات كل مستخدم.
+
+# طريقة تتبع الجلسات (SESSION_STRATEGY):
+# - hybrid: مفتاح "active" عند تسجيل الدخول يُستبدل بـ "blacklisted" عند الخروج (السلوك الأصلي)
+# - allowlist: مفتاح "active" فقط، ويُحذف عند الخروج دون أي مفتاح حظر
+# - denylist: لا كتابة عند تسجيل الدخول، ويُكتب مفتاح "blacklisted" فقط عند الخروج
+# في جميع الأوضاع يتم إبطال جميع جلسات المستخدم عبر set_user_epoch.
+# التحويل إلى hybrid أو allowlist من denylist يُبطل التوكنات الصادرة قبله (لا مفاتيح "active" لها).
+
+
+@dataclass(frozen=True, slots=True)
+class TokenState:
+    status: str | None
+    # التوكنات الصادرة قبل هذا الوقت ملغاة (None إذا لم يُحدد):
+    # الأحدث بين وقت الإبطال العام، ووقت إبطال المجموعة، ووقت إبطال المستخدم
+    valid_after: float | None = None
+    # كتابة حديثة على المستخدم: تُقرأ بياناته من قاعدة البيانات الأساسية
+    recent_write: bool = False
+
+    @property
+    def is_active(self) -> bool:
+        # في وضع denylist يكفي ألا يكون التوكن محظورًا
+        if settings.SESSION_STRATEGY == "denylist":
+            return self.status != TOKEN_BLACKLISTED
+        return self.status == TOKEN_ACTIVE
+
+    def is_revoked_for(self, context: TokenContext) -> bool:
+        return (
+            self.valid_after is not None
+            and context.issued_at is not None
+            and context.issued_at < self.valid_after
+        )
+
+
+# تسجيل الخروج: لا يُحظر التوكن إلا إذا كان نشطًا، مع الإبقاء على مدة صلاحيته المتبقية
+LOGOUT_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl <= 0 then
+    ttl = tonumber(ARGV[3])
+end
+redis.call('SET', KEYS[1], ARGV[2], 'PX', ttl)
+return 1
+"""
+
+# تسجيل الخروج في وضع allowlist: حذف التوكن من Redis إذا كان نشطًا
+LOGOUT_DELETE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+@lru_cache()
+def _script(redis: Redis, source: str) -> AsyncScript:
+    # تسجيل السكربت مرة واحدة لكل اتصال، ثم يُستدعى عبر EVALSHA
+    return redis.register_script(source)
+
+
+def _username(context: TokenContext) -> str:
+    username: str = context.subject
+    if username is None:
+        logger.warning("التوكن لا يحتوي على اسم مستخدم.")
+        raise TokenExpiredException("المحتوى الداخلي للتوكن غير صالح")
+    return username
+
+
+def _remaining_ttl(context: TokenContext) -> int:
+    # مدة الصلاحية المتبقية بالثواني (ثانية واحدة على الأقل)
+    return max(1, math.ceil(context.remaining_seconds))
+
+
+def _epoch_keys(tenant: str | None, user_id: str | None = None) -> list[str]:
+    keys = [global_epoch_key()]
+    if tenant:
+        keys.append(tenant_epoch_key(tenant))
+    if user_id:
+        keys.append(user_epoch_key(user_id))
+    return keys
+
+
+def _latest_epoch(values: list) -> float | None:
+    epochs = [float(value) for value in values if value is not None]
+    return max(epochs) if epochs else None
+
+
+def _sticky(context: TokenContext) -> bool:
+    return bool(context.user_id and settings.DATABASE_REPLICA_URLS)
+
+
+def _state_keys(context: TokenContext) -> list[str]:
+    # حالة التوكن، ثم أوقات الإبطال، ثم علامة الكتابة الحديثة (عند وجود نسخ متماثلة)
+    keys = [token_key_format(_username(context), context.token_id)]
+    keys.extend(_epoch_keys(context.tenant, context.user_id))
+    if _sticky(context):
+        keys.append(user_recent_write_key(context.user_id))
+    return keys
+
+
+def _state_from_values(context: TokenContext, values: list) -> TokenState:
+    sticky = _sticky(context)
+    epochs = values[1 : len(values) - 1] if sticky else values[1:]
+    return TokenState(
+        status=values[0],
+        valid_after=_latest_epoch(epochs),
+        recent_write=sticky and values[-1] is not None,
+    )
+
+
+async def get_token_state(redis: Redis, context: TokenContext) -> TokenState:
+    """
+    قراءة حالة التوكن وأوقات الإبطال (العام، المجموعة، المستخدم) من Redis بطلب واحد.
+    """
+    logger.debug("قراءة حالة التوكن من Redis")
+    return _state_from_values(context, await redis.mget(_state_keys(context)))
+
+
+async def get_token_states(
+    redis: Redis, contexts: list[TokenContext]
+) -> list[TokenState]:
+    """
+    قراءة حالة مجموعة من التوكنات دفعة واحدة عبر pipeline (ذهاب وإياب واحد إلى Redis).
+    """
+    if not contexts:
+        return []
+    async with redis.pipeline(transaction=False) as pipe:
+        for context in contexts:
+            pipe.mget(_state_keys(context))
+        results = await pipe.execute()
+    return [
+        _state_from_values(context, values)
+        for context, values in zip(contexts, results)
+    ]
+
+
+async def store_active_token(redis: Redis, context: TokenContext) -> bool:
+    """
+    تخزين التوكن كنشط في Redis لمدة صلاحيته المتبقية.
+    """
+    logger.debug("بدء تخزين التوكن في Redis")
+    username = _username(context)
+    if settings.SESSION_STRATEGY == "denylist":
+        # لا حاجة لأي كتابة: التوكن صالح ما لم يُحظر
+        return True
+    token_key = token_key_format(username, context.token_id)
+
+    try:
+        await redis.set(token_key, TOKEN_ACTIVE, ex=_remaining_ttl(context))
+    except Exception as e:
+        logger.error("فشل أثناء تخزين التوكن في Redis", exc_info=True)
+        raise ServerErrorException("حدث خطأ أثناء محاولة تخزين التوكن في Redis")
+
+    logger.info("تم تخزين التوكن في Redis بنجاح")
+    return True
+
+
+async def logout_token(redis: Redis, context: TokenContext) -> bool:
+    """
+    حظر التوكن ذريًا إذا كان نشطًا. ترجع False إذا لم يكن التوكن نشطًا.
+    """
+    logger.debug("بدء إدراج توكن في القائمة السوداء عند تسجيل الخروج")
+    username = _username(context)
+    token_key = token_key_format(username, context.token_id)
+
+    try:
+        if settings.SESSION_STRATEGY == "allowlist":
+            done = await _script(redis, LOGOUT_DELETE_SCRIPT)(
+                keys=[token_key], args=[TOKEN_ACTIVE]
+            )
+        elif settings.SESSION_STRATEGY == "denylist":
+            # NX: تسجيل الخروج مرة ثانية بنفس التوكن يُرفض كما في بقية الأوضاع
+            done = await redis.set(
+                token_key, TOKEN_BLACKLISTED, px=_remaining_ttl(context) * 1000, nx=True
+            )
+        else:
+            done = await _script(redis, LOGOUT_SCRIPT)(
+                keys=[token_key],
+                args=[TOKEN_ACTIVE, TOKEN_BLACKLISTED, _remaining_ttl(context) * 1000],
+            )
+    except Exception as e:
+        logger.error("فشل أثناء تخزين التوكن المحظور في Redis", exc_info=True)
+        raise ServerErrorException("حدث خطأ أثناء محاولة تخزين التوكن المحظور في Redis")
+
+    return bool(done)
+
+
+async def set_user_epoch(redis: Redis, user_id, valid_after: float | None = None) -> None:
+    """
+    إلغاء جميع توكنات المستخدم الصادرة قبل الوقت المحدد (الآن افتراضيًا) بكتابة واحدة.
+    """
+    # الوقت يُحفظ بكسور الثانية دون تقريب كما في set_revocation_epoch: iat بالثواني الصحيحة،
+    # فالتقريب للأسفل كان يُبقي التوكنات الصادرة قبل التغيير في نفس الثانية صالحة
+    valid_after = float(valid_after if valid_after is not None else time.time())
+    try:
+        # يكفي أن يبقى المفتاح طوال مدة صلاحية أطول توكن وصول
+        await redis.set(
+            user_epoch_key(str(user_id)),
+            valid_after,
+            ex=settings.ACCESS_TOKEN_EXPIRE_24HOURS * 3600,
+        )
+    except Exception as e:
+        logger.error("فشل أثناء تحديث وقت إلغاء توكنات المستخدم في Redis", exc_info=True)
+        raise ServerErrorException("حدث خطأ أثناء محاولة إبطال جميع الجلسات السابقة")
+
+
+# ==============================
+# الإبطال الجماعي
+# ==============================
+
+# إبطال كل التوكنات (أو توكنات مجموعة) الصادرة قبل وقت معين بكتابة واحدة:
+# مسار التحقق يقرأ هذه الأوقات مع حالة التوكن في نفس طلب MGET،
+# ومسار التحديث يقارنها بوقت إنشاء رمز التحديث، دون أي مسح لمفاتيح Redis أو UPDATE على الجداول.
+
+
+def _epoch_ttl() -> int:
+    # يكفي أن يبقى الوقت طوال مدة صلاحية أطول رمز (رموز التحديث)
+    return max(
+        settings.ACCESS_TOKEN_EXPIRE_24HOURS * 3600,
+        settings.ACCESS_TOKEN_EXPIRE_WEEK * 7 * 86400,
+    )
+
+
+async def set_revocation_epoch(
+    redis: Redis, tenant: str | None = None, valid_after: float | None = None
+) -> float:
+    """
+    إبطال جميع التوكنات الصادرة قبل الوقت المحدد (الآن افتراضيًا)، لكل المستخدمين
+    أو لمجموعة واحدة فقط. ترجع الوقت الذي تم تسجيله.
+    """
+    # الوقت يُحفظ بكسور الثانية دون تقريب: توكنات الوصول الصادرة في نفس الثانية تُرفض
+    # (iat بالثواني الصحيحة)، ومقارنة وقت إنشاء رموز التحديث تبقى دقيقة
+    valid_after = float(valid_after if valid_after is not None else time.time())
+    key = tenant_epoch_key(tenant) if tenant else global_epoch_key()
+    try:
+        await redis.set(key, valid_after, ex=_epoch_ttl())
+    except Exception as e:
+        logger.error("فشل أثناء تسجيل وقت الإبطال الجماعي في Redis", exc_info=True)
+        raise ServerErrorException("حدث خطأ أثناء محاولة إبطال التوكنات")
+    return valid_after
+
+
+async def get_revocation_epoch(redis: Redis, tenant: str | None = None) -> float | None:
+    """
+    أحدث وقت إبطال جماعي ينطبق على المجموعة (العام أو الخاص بها) بطلب واحد.
+    """
+    return _latest_epoch(await redis.mget(_epoch_keys(tenant)))
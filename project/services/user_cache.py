@@ -0,0 +1,180 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Awaitable, Callable
+from uuid import UUID
+from redis.asyncio import Redis
+from project.core import logger, metrics, settings
+from project.models import AuthPrincipal
+from project.services.token_key_format import user_recent_write_key
+
+
+# ==============================
+# ذاكرة مؤقتة لبيانات المصادقة في Redis
+# ==============================
+
+# كل عنصر يحمل رقم الإصدار الذي بُني منه، وكل كتابة على المستخدم ترفع رقم الإصدار،
+# فيُهمل أي عنصر قديم تلقائيًا حتى لو كُتب بعد الكتابة (سباق القراءة/الكتابة).
+# القراءة تتم بطلب واحد (MGET للإصدار والعنصر معًا).
+
+
+def user_cache_key(user_id: str) -> str:
+    return f"user_cache:{user_id}"
+
+
+def user_cache_version_key(user_id: str) -> str:
+    return f"user_cache_version:{user_id}"
+
+
+def user_cache_lock_key(user_id: str) -> str:
+    return f"user_cache_lock:{user_id}"
+
+
+# عمليات التحميل الجارية داخل هذا العامل، حتى لا يُحمّل نفس المستخدم أكثر من مرة بالتزامن
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _dump(principal: AuthPrincipal, version: int) -> str:
+    return json.dumps(
+        {
+            "v": version,
+            "id": str(principal.id),
+            "username": principal.username,
+            "isActive": principal.isActive,
+            "last_password_change": (
+                principal.last_password_change.isoformat()
+                if principal.last_password_change
+                else None
+            ),
+            "tenant": principal.tenant,
+        }
+    )
+
+
+def _load(raw: str | None, version: int) -> AuthPrincipal | None:
+    if raw is None:
+        return None
+    data = json.loads(raw)
+    if data.pop("v", None) != version:
+        return None
+    return AuthPrincipal(
+        id=UUID(data["id"]),
+        username=data["username"],
+        isActive=data["isActive"],
+        last_password_change=(
+            datetime.fromisoformat(data["last_password_change"])
+            if data["last_password_change"]
+            else None
+        ),
+        tenant=data.get("tenant"),
+    )
+
+
+async def _read(redis: Redis, user_id: str) -> tuple[int, AuthPrincipal | None]:
+    version, raw = await redis.mget(
+        user_cache_version_key(user_id), user_cache_key(user_id)
+    )
+    version = int(version or 0)
+    return version, _load(raw, version)
+
+
+async def get_cached_principal(
+    redis: Redis,
+    user_id: str,
+    loader: Callable[[], Awaitable[AuthPrincipal | None]],
+) -> AuthPrincipal | None:
+    """
+    قراءة بيانات مصادقة المستخدم من Redis، أو تحميلها من قاعدة البيانات مرة واحدة
+    فقط عند غيابها مهما كان عدد الطلبات المتزامنة.
+    """
+    if not settings.USER_CACHE_ENABLED:
+        return await loader()
+
+    version, principal = await _read(redis, user_id)
+    if principal is not None:
+        metrics.incr("user_cache.hits")
+        return principal
+    metrics.incr("user_cache.misses")
+
+    # طلب آخر في نفس العامل يحمّل هذا المستخدم حاليًا
+    pending = _in_flight.get(user_id)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[user_id] = future
+    try:
+        principal = await _fill(redis, user_id, version, loader)
+        future.set_result(principal)
+        return principal
+    except BaseException as e:
+        future.set_exception(e)
+        # منع تحذير "استثناء لم يُسترجع" عند عدم وجود منتظرين
+        future.exception()
+        raise
+    finally:
+        _in_flight.pop(user_id, None)
+
+
+async def _fill(
+    redis: Redis,
+    user_id: str,
+    version: int,
+    loader: Callable[[], Awaitable[AuthPrincipal | None]],
+) -> AuthPrincipal | None:
+    lock_key = user_cache_lock_key(user_id)
+    lock_ttl = settings.USER_CACHE_LOCK_MILLISECONDS
+
+    # قفل قصير بين العمال: عامل واحد فقط يقرأ من قاعدة البيانات، والبقية تنتظر النتيجة
+    acquired = await redis.set(lock_key, 1, nx=True, px=lock_ttl)
+    if not acquired:
+        for _ in range(max(1, lock_ttl // 25)):
+            await asyncio.sleep(0.025)
+            version, principal = await _read(redis, user_id)
+            if principal is not None:
+                return principal
+        logger.debug("انتهت مهلة انتظار تحميل المستخدم من عامل آخر")
+
+    try:
+        metrics.incr("user_cache.loads")
+        principal = await loader()
+        if principal is not None:
+            await redis.set(
+                user_cache_key(user_id),
+                _dump(principal, version),
+                ex=settings.USER_CACHE_TTL_SECONDS,
+            )
+        return principal
+    finally:
+        if acquired:
+            await redis.delete(lock_key)
+
+
+async def bump_user_cache_version(redis: Redis, user_id) -> None:
+    """
+    إبطال بيانات المستخدم المخزنة برفع رقم إصدارها (يُستدعى بعد كل كتابة على المستخدم).
+    """
+    user_id = str(user_id)
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(user_cache_version_key(user_id))
+            # يجب أن يعيش رقم الإصدار أطول من أي عنصر بُني عليه
+            pipe.expire(user_cache_version_key(user_id), settings.USER_CACHE_TTL_SECONDS * 2)
+            pipe.delete(user_cache_key(user_id))
+            # قراءة المستخدم من قاعدة البيانات الأساسية حتى تلحق بها النسخ المتماثلة
+            if settings.DATABASE_REPLICA_URLS:
+                pipe.set(
+                    user_recent_write_key(user_id), 1, ex=settings.REPLICA_STICKY_SECONDS
+                )
+            await pipe.execute()
+    except Exception as e:
+        logger.error("فشل في إبطال بيانات المستخدم المخزنة في Redis", exc_info=True)
+
+
+async def has_recent_write(redis: Redis, user_id) -> bool:
+    """
+    هل كُتب على المستخدم مؤخرًا بحيث قد لا تحتوي النسخ المتماثلة على آخر تعديل له.
+    """
+    if not settings.DATABASE_REPLICA_URLS:
+        return False
+    return bool(await redis.exists(user_recent_write_key(str(user_id))))
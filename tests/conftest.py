@@ -0,0 +1,200 @@
+import math
+import os
+import tempfile
+import time
+from functools import partial
+
+
+# ==============================
+# إعدادات بيئة الاختبار
+# ==============================
+
+# الإعدادات تُقرأ عند استيراد project، لذلك تُضبط قبل أي استيراد منه:
+# قاعدة بيانات SQLite مؤقتة (أو TEST_DATABASE_URL)، و Redis وهمي في الذاكرة
+# عبر fakeredis (مع lupa لتشغيل سكربتات Lua).
+_tmp_dir = tempfile.mkdtemp(prefix="auth-tests-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite+aiosqlite:///{_tmp_dir}/test.sqlite"
+)
+for name, value in {
+    "APP_NAME": "auth-tests",
+    "VERSION": "test",
+    "ENVIRONMENT": "testing",
+    "BASE_URL": "http://testserver",
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_SECONDS": "60",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_DB": "0",
+    "MAIL_SERVER": "localhost",
+    "MAIL_PORT": "25",
+    "MAIL_USE_TLS": "false",
+    "MAIL_USERNAME": "test",
+    "MAIL_PASSWORD": "test",
+    # خيوط بدل مجمع العمليات لتسريع الاختبارات
+    "PASSWORD_HASH_WORKERS": "0",
+    "TOKEN_REAPER_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+import anyio
+import fakeredis
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+import project.core.redis as redis_module
+from project.core import Base, engine, get_redis
+from main import app
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    """
+    Redis وهمي جديد لكل اختبار، يُعاد من get_redis في كل مكان في التطبيق.
+    """
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis_module, "Redis", partial(fakeredis.FakeAsyncRedis, server=server)
+    )
+    get_redis.cache_clear()
+    yield
+    get_redis.cache_clear()
+
+
+@pytest.fixture
+async def client():
+    """
+    عميل HTTP داخلي للتطبيق بقاعدة بيانات فارغة، مع تشغيل دورة حياة التطبيق.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    try:
+        async with app.router.lifespan_context(app):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(
+                transport=transport, base_url="http://testserver"
+            ) as http_client:
+                yield http_client
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def sql_statements() -> list[str]:
+    """
+    جميع استعلامات SQL التي تُرسل إلى قاعدة البيانات أثناء الاختبار.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+async def user(client) -> dict:
+    """
+    مستخدم مسجل في قاعدة البيانات.
+    """
+    data = {
+        "firstName": "Test",
+        "lastName": "User",
+        "username": "alice",
+        "gender": True,
+        "email": "alice@example.com",
+        "hashed_password": "alice-password",
+    }
+    response = await client.post("/api/auth/register", json=data)
+    assert response.status_code == 201, response.text
+    # iat بالثواني الصحيحة، والتوكن الصادر في نفس ثانية last_password_change مرفوض
+    now = time.time()
+    await anyio.sleep(math.ceil(now) - now + 0.01)
+    return data
+
+
+@pytest.fixture
+async def tokens(client, user) -> dict:
+    """
+    رمزا الوصول والتحديث للمستخدم بعد تسجيل الدخول.
+    """
+    response = await client.post(
+        "/api/auth/login",
+        json={"username": user["username"], "password": user["hashed_password"]},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+@pytest.fixture
+def auth_headers(tokens) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@pytest.fixture
+def auth_requests(client, user, tokens, auth_headers) -> dict:
+    """
+    طلبات المسارات الأساسية للمستخدم المسجل دخوله، حسب اسم المسار
+    (لاختبارات تُكرر نفس الفحص على عدة مسارات).
+    """
+
+    async def register():
+        return await client.post(
+            "/api/auth/register",
+            json={**user, "username": "bob", "email": "bob@example.com"},
+        )
+
+    async def login():
+        return await client.post(
+            "/api/auth/login",
+            json={"username": user["username"], "password": user["hashed_password"]},
+        )
+
+    async def me():
+        return await client.get("/api/auth/me", headers=auth_headers)
+
+    async def refresh():
+        return await client.post(
+            "/api/auth/refresh-token", json={"refresh_token": tokens["refresh_token"]}
+        )
+
+    async def logout():
+        return await client.post("/api/auth/logout", headers=auth_headers)
+
+    async def update_profile():
+        return await client.patch(
+            "/api/auth/update-profile", json={"firstName": "Alicia"}, headers=auth_headers
+        )
+
+    async def change_password():
+        return await client.put(
+            "/api/auth/change-password",
+            json={"old_password": user["hashed_password"], "new_password": "new-password"},
+            headers=auth_headers,
+        )
+
+    async def deactivate_account():
+        return await client.patch("/api/auth/deactivate-account", headers=auth_headers)
+
+    return {
+        request.__name__: request
+        for request in (
+            register,
+            login,
+            me,
+            refresh,
+            logout,
+            update_profile,
+            change_password,
+            deactivate_account,
+        )
+    }
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from project.core import engine, get_redis
+
+pytestmark = pytest.mark.anyio
+
+
+# ==============================
+# عدد عمليات الحفظ لكل مسار
+# ==============================
+
+# في وضع وحدة العمل (DB_UNIT_OF_WORK) يُحفظ كل طلب مرة واحدة فقط في نهايته.
+# تُعد فقط المعاملات التي كتبت شيئًا، لأن release_connection تنهي معاملات القراءة
+# بـ commit دون أي كتابة فعلية.
+
+
+@pytest.fixture
+def write_commits() -> list[list[str]]:
+    """
+    عمليات الحفظ التي تضمنت كتابة، مع الاستعلامات المكتوبة في كل منها.
+    """
+    commits = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            conn.info.setdefault("pending_writes", []).append(statement.split()[0].upper())
+
+    def on_commit(conn):
+        writes = conn.info.pop("pending_writes", None)
+        if writes:
+            commits.append(writes)
+
+    def on_rollback(conn):
+        conn.info.pop("pending_writes", None)
+
+    listeners = (
+        ("before_cursor_execute", before_cursor_execute),
+        ("commit", on_commit),
+        ("rollback", on_rollback),
+    )
+    for name, listener in listeners:
+        event.listen(engine.sync_engine, name, listener)
+    yield commits
+    for name, listener in listeners:
+        event.remove(engine.sync_engine, name, listener)
+
+
+@pytest.mark.parametrize(
+    "request_path",
+    [
+        "register",
+        "login",
+        "refresh",
+        "logout",
+        "update_profile",
+        "change_password",
+        "deactivate_account",
+    ],
+)
+async def test_each_request_commits_at_most_once(auth_requests, write_commits, request_path):
+    write_commits.clear()
+
+    response = await auth_requests[request_path]()
+
+    assert response.status_code in (200, 201), response.text
+    assert len(write_commits) <= 1, write_commits
+
+
+async def test_change_password_revokes_sessions_only_after_commit(
+    client, auth_headers, auth_requests, monkeypatch
+):
+    commit = AsyncSession.commit
+
+    async def failing_commit(self):
+        # فشل الحفظ النهائي للطلب فقط، وليس إنهاء معاملة القراءة في release_connection
+        if self.info.get("after_commit"):
+            raise RuntimeError("commit failed")
+        await commit(self)
+
+    monkeypatch.setattr(AsyncSession, "commit", failing_commit)
+    response = await auth_requests["change_password"]()
+    monkeypatch.undo()
+
+    assert response.status_code == 500, response.text
+    # الحفظ فشل، لذلك تبقى الجلسات الحالية صالحة
+    assert await get_redis().keys("user_epoch:*") == []
+    response = await client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == 200, response.text
@@ -0,0 +1,203 @@
+import sqlite3
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from project.core import settings
+from project.core.db_pool import (
+    InstrumentedQueuePool,
+    PoolAutoscaler,
+    connection_budget,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+# التحجيم التكيفي يعتمد على _max_overflow الداخلية في QueuePool،
+# لذلك تُختبر السعة عبر حجز اتصالات فعلية وليس فقط عبر قراءة القيمة.
+
+
+def make_pool(pool_size: int, max_overflow: int) -> InstrumentedQueuePool:
+    return InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:"),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+
+
+def record_window(
+    pool: InstrumentedQueuePool,
+    waits: int = 0,
+    wait_ms: float = 0.0,
+    timeouts: int = 0,
+    peak: int = 0,
+) -> None:
+    pool.window_waits = waits
+    pool.window_wait_total = waits * wait_ms / 1000
+    pool.window_timeouts = timeouts
+    pool.window_peak = peak
+
+
+@pytest.fixture
+def autoscaler() -> PoolAutoscaler:
+    return PoolAutoscaler()
+
+
+@pytest.fixture
+async def pool_engine(tmp_path):
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.sqlite",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+    )
+    yield async_engine
+    await async_engine.dispose()
+
+
+def test_pool_fails_loudly_without_max_overflow(monkeypatch):
+    original = AsyncAdaptedQueuePool.__init__
+
+    def init_without_max_overflow(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        del self._max_overflow
+
+    monkeypatch.setattr(AsyncAdaptedQueuePool, "__init__", init_without_max_overflow)
+
+    with pytest.raises(RuntimeError):
+        make_pool(pool_size=2, max_overflow=0)
+
+
+def test_set_capacity_only_changes_overflow():
+    pool = make_pool(pool_size=4, max_overflow=2)
+    assert pool.capacity() == 6
+
+    pool.set_capacity(10)
+    assert (pool.size(), pool.capacity()) == (4, 10)
+
+    # لا يمكن النزول تحت الحجم الثابت
+    pool.set_capacity(1)
+    assert (pool.size(), pool.capacity()) == (4, 4)
+
+
+async def test_set_capacity_limits_real_checkouts(pool_engine):
+    pool = pool_engine.sync_engine.pool
+
+    pool.set_capacity(2)
+    async with pool_engine.connect(), pool_engine.connect():
+        assert pool.checkedout() == 2
+
+    pool.set_capacity(1)
+    async with pool_engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            async with pool_engine.connect():
+                pass
+        assert pool.take_window()[2] == 1
+
+
+@pytest.mark.parametrize(
+    ("capacity", "expected"),
+    [
+        (8, 10),  # خطوة 25%
+        (12, 15),
+        (3, 4),  # الخطوة لا تقل عن اتصال واحد
+        (19, 20),  # لا تتجاوز الحد الأعلى
+        (20, 20),
+    ],
+)
+def test_adjust_grows_on_slow_waits(autoscaler, capacity, expected):
+    pool = make_pool(pool_size=2, max_overflow=capacity - 2)
+    record_window(pool, waits=10, wait_ms=settings.POOL_WAIT_THRESHOLD_MS * 2, peak=capacity)
+
+    assert autoscaler.adjust(pool, lower=2, upper=20) == expected
+    assert pool.capacity() == expected
+
+
+def test_adjust_grows_on_timeouts_even_with_fast_waits(autoscaler):
+    pool = make_pool(pool_size=2, max_overflow=6)
+    record_window(pool, waits=10, wait_ms=0.0, timeouts=1, peak=8)
+
+    assert autoscaler.adjust(pool, lower=2, upper=20) == 10
+
+
+@pytest.mark.parametrize(
+    ("capacity", "expected"),
+    [
+        (16, 12),  # خطوة 25%
+        (5, 4),
+        (3, 2),  # الخطوة لا تقل عن اتصال واحد
+        (2, 2),  # لا تنزل تحت الحد الأدنى
+    ],
+)
+def test_adjust_shrinks_when_idle(autoscaler, capacity, expected):
+    pool = make_pool(pool_size=2, max_overflow=capacity - 2)
+    record_window(pool, waits=10, wait_ms=0.0, peak=0)
+
+    assert autoscaler.adjust(pool, lower=2, upper=20) == expected
+    assert pool.capacity() == expected
+
+
+def test_adjust_keeps_capacity_when_busy_but_not_waiting(autoscaler):
+    pool = make_pool(pool_size=2, max_overflow=6)
+    # لا انتظار، لكن الحجز تجاوز نصف السعة
+    record_window(pool, waits=10, wait_ms=0.0, peak=5)
+
+    assert autoscaler.adjust(pool, lower=2, upper=20) == 8
+
+
+def test_adjust_starts_a_new_window(autoscaler):
+    pool = make_pool(pool_size=2, max_overflow=6)
+    record_window(pool, waits=10, wait_ms=settings.POOL_WAIT_THRESHOLD_MS * 2, peak=8)
+
+    autoscaler.adjust(pool, lower=2, upper=20)
+
+    assert pool.take_window() == (0, 0.0, 0, 0)
+
+
+async def test_connection_budget_splits_connections_between_workers(
+    monkeypatch, pool_engine
+):
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 100)
+    monkeypatch.setattr(settings, "DB_RESERVED_CONNECTIONS", 10)
+    monkeypatch.setattr(settings, "APP_WORKERS", 4)
+
+    assert await connection_budget(pool_engine) == 22
+
+
+async def test_connection_budget_is_unknown_without_max_connections(
+    monkeypatch, pool_engine
+):
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 0)
+
+    assert await connection_budget(pool_engine) is None
+
+
+async def test_autoscaler_caps_growth_at_the_connection_budget(
+    monkeypatch, autoscaler, pool_engine
+):
+    monkeypatch.setattr(settings, "POOL_ADAPTIVE", True)
+    monkeypatch.setattr(settings, "POOL_MAX_CONNECTIONS", 40)
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 30)
+    monkeypatch.setattr(settings, "DB_RESERVED_CONNECTIONS", 10)
+    monkeypatch.setattr(settings, "APP_WORKERS", 4)
+    pool = pool_engine.sync_engine.pool
+
+    await autoscaler.start(pool_engine)
+    try:
+        assert autoscaler._limits[pool] == (1, 5)
+        for _ in range(10):
+            record_window(pool, timeouts=1)
+            autoscaler.adjust(pool, *autoscaler._limits[pool])
+        assert pool.capacity() == 5
+    finally:
+        await autoscaler.stop()
+
+
+async def test_autoscaler_does_nothing_when_disabled(monkeypatch, autoscaler, pool_engine):
+    monkeypatch.setattr(settings, "POOL_ADAPTIVE", False)
+
+    await autoscaler.start(pool_engine)
+
+    assert autoscaler._task is None
+    assert not autoscaler._limits
@@ -0,0 +1,38 @@
+import pytest
+from project.core import settings
+
+pytestmark = pytest.mark.anyio
+
+API_KEY = "test-introspection-key"
+
+
+@pytest.fixture
+def introspection_headers(monkeypatch) -> dict:
+    monkeypatch.setattr(settings, "INTROSPECTION_API_KEYS", [API_KEY])
+    return {"X-API-Key": API_KEY}
+
+
+async def test_introspection_returns_one_result_per_token(
+    client, tokens, introspection_headers
+):
+    response = await client.post(
+        "/api/auth/introspect",
+        json={"tokens": [tokens["access_token"], "not-a-token"]},
+        headers=introspection_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    results = response.json()["data"]["tokens"]
+    assert [result["active"] for result in results] == [True, False]
+
+
+async def test_oversized_batch_is_rejected_before_introspection(
+    client, introspection_headers
+):
+    response = await client.post(
+        "/api/auth/introspect",
+        json={"tokens": ["token"] * (settings.INTROSPECTION_MAX_TOKENS + 1)},
+        headers=introspection_headers,
+    )
+
+    assert response.status_code == 422, response.text
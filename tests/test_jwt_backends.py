@@ -0,0 +1,127 @@
+import time
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from project.core.jwt_backend import (
+    InvalidTokenError,
+    JWTBackend,
+    JoseBackend,
+    PyJWTBackend,
+)
+
+
+# ==============================
+# توافق مكتبات JWT
+# ==============================
+
+# جميع المكتبات يجب أن تقبل وترفض نفس التوكنات، وإلا تغير سلوك الخدمة عند تغيير JWT_BACKEND.
+
+BACKENDS = [JoseBackend(), PyJWTBackend()]
+
+
+def _pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+PEMS = {
+    "HS256": "test-secret-key-with-enough-length-for-hs256",
+    "ES256": _pem(ec.generate_private_key(ec.SECP256R1())),
+    "EdDSA": _pem(ed25519.Ed25519PrivateKey.generate()),
+}
+
+# python-jose لا يدعم EdDSA
+CASES = [
+    (backend, algorithm)
+    for backend in BACKENDS
+    for algorithm in PEMS
+    if not (algorithm == "EdDSA" and backend.name == "jose")
+]
+
+
+def _keys(backend: JWTBackend, algorithm: str):
+    private_key = backend.load_private_key(PEMS[algorithm], algorithm)
+    if algorithm == "HS256":
+        return private_key, private_key
+    return private_key, backend.public_key(private_key)
+
+
+@pytest.fixture(params=CASES, ids=lambda case: f"{case[0].name}-{case[1]}")
+def case(request):
+    backend, algorithm = request.param
+    private_key, public_key = _keys(backend, algorithm)
+
+    def encode(**claims) -> str:
+        return backend.encode(claims, private_key, algorithm)
+
+    def decode(token: str) -> dict:
+        return backend.decode(token, public_key, [algorithm])
+
+    return encode, decode
+
+
+def test_jwt_backend_is_abstract():
+    with pytest.raises(TypeError):
+        JWTBackend()
+
+
+def test_valid_claims_round_trip(case):
+    encode, decode = case
+    now = int(time.time())
+    claims = {"sub": "alice", "iat": now, "exp": now + 60, "jti": "abc"}
+
+    assert decode(encode(**claims)) == claims
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"sub": "alice", "exp": int(time.time()) - 60},
+        {"sub": "alice", "exp": "tomorrow"},
+        {"sub": "alice", "nbf": int(time.time()) + 600},
+        {"sub": "alice", "iat": "yesterday"},
+        {"sub": 42},
+    ],
+    ids=["expired", "exp-not-a-number", "not-before", "iat-not-a-number", "sub-not-a-string"],
+)
+def test_invalid_claims_are_rejected(case, claims):
+    encode, decode = case
+
+    with pytest.raises(InvalidTokenError):
+        decode(encode(**claims))
+
+
+def test_iat_in_the_future_is_accepted(case):
+    # python-jose لا يرفض iat في المستقبل، و PyJWT مضبوط على نفس السلوك
+    encode, decode = case
+    claims = {"sub": "alice", "iat": int(time.time()) + 600}
+
+    assert decode(encode(**claims)) == claims
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "ES256"])
+def test_tokens_are_interchangeable_between_backends(algorithm):
+    jose, pyjwt = BACKENDS
+    claims = {"sub": "alice", "iat": int(time.time())}
+    jose_private, jose_public = _keys(jose, algorithm)
+    pyjwt_private, pyjwt_public = _keys(pyjwt, algorithm)
+
+    assert pyjwt.decode(jose.encode(claims, jose_private, algorithm), pyjwt_public, [algorithm]) == claims
+    assert jose.decode(pyjwt.encode(claims, pyjwt_private, algorithm), jose_public, [algorithm]) == claims
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda backend: backend.name)
+def test_wrong_signature_and_algorithm_are_rejected(backend):
+    private_key, _ = _keys(backend, "ES256")
+    other_key = backend.load_private_key(_pem(ec.generate_private_key(ec.SECP256R1())), "ES256")
+    token = backend.encode({"sub": "alice"}, private_key, "ES256")
+
+    with pytest.raises(InvalidTokenError):
+        backend.decode(token, backend.public_key(other_key), ["ES256"])
+    with pytest.raises(InvalidTokenError):
+        backend.decode(token, backend.public_key(private_key), ["HS256"])
+    with pytest.raises(InvalidTokenError):
+        backend.get_unverified_header("not-a-token")
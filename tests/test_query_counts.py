@@ -0,0 +1,49 @@
+import pytest
+from project.core import get_redis, verified_token_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("auth_cache", [False, True], ids=["auth-cache-off", "auth-cache-on"])
+async def test_me_issues_one_sql_statement(
+    client, auth_headers, sql_statements, monkeypatch, auth_cache
+):
+    monkeypatch.setattr(verified_token_cache, "enabled", auth_cache)
+    verified_token_cache.clear()
+
+    # الطلب الأول يملأ الذاكرة المؤقتة عند تفعيلها، والثاني يستخدمها
+    for _ in range(2):
+        sql_statements.clear()
+        response = await client.get("/api/auth/me", headers=auth_headers)
+
+        assert response.status_code == 200, response.text
+        assert len(sql_statements) == 1, sql_statements
+        assert sql_statements[0].lstrip().upper().startswith("SELECT")
+
+    verified_token_cache.clear()
+
+
+async def test_refresh_uses_at_most_two_sql_round_trips(client, tokens, sql_statements):
+    sql_statements.clear()
+    response = await client.post(
+        "/api/auth/refresh-token", json={"refresh_token": tokens["refresh_token"]}
+    )
+
+    assert response.status_code == 200, response.text
+    # UPDATE يعطّل الرمز القديم ويرجع بيانات المستخدم، ثم INSERT للرمز الجديد
+    assert len(sql_statements) <= 2, sql_statements
+    assert [statement.split()[0].upper() for statement in sql_statements] == [
+        "UPDATE",
+        "INSERT",
+    ]
+
+
+async def test_refresh_with_inactive_token_is_rejected(client, tokens):
+    payload = {"refresh_token": tokens["refresh_token"]}
+    response = await client.post("/api/auth/refresh-token", json=payload)
+    assert response.status_code == 200, response.text
+
+    # نتيجة التحديث السابقة محفوظة لمهلة قصيرة، لذلك تُحذف لاختبار الرمز المعطّل نفسه
+    await get_redis().flushall()
+    response = await client.post("/api/auth/refresh-token", json=payload)
+    assert response.status_code == 401, response.text
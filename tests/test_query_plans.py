@@ -0,0 +1,92 @@
+import re
+import pytest
+from sqlalchemy import event
+from project.core import engine, verified_token_cache
+from project.services import TokenReaper
+
+pytestmark = pytest.mark.anyio
+
+
+# ==============================
+# خطط تنفيذ الاستعلامات الساخنة
+# ==============================
+
+# تُلتقط الاستعلامات التي يرسلها كل مسار فعليًا، ثم يُطلب من قاعدة البيانات خطة تنفيذ
+# كل منها. يفشل الاختبار إذا احتاج أي استعلام إلى مسح كامل لجدول users أو tokens:
+# - SQLite: سطر "SCAN <الجدول>" في EXPLAIN QUERY PLAN
+# - PostgreSQL: "Seq Scan" بعد تعطيل enable_seqscan، فيبقى فقط إذا لم يوجد فهرس مناسب
+
+HOT_TABLES = ("users", "tokens")
+
+SQLITE_FULL_SCAN = re.compile(rf"^SCAN (TABLE )?({'|'.join(HOT_TABLES)})(_\d+)?\b")
+POSTGRES_FULL_SCAN = re.compile(rf"Seq Scan on ({'|'.join(HOT_TABLES)})\w*")
+
+
+@pytest.fixture
+def sql_queries() -> list[tuple[str, object]]:
+    """
+    الاستعلامات مع معاملاتها، لإعادة تنفيذها داخل EXPLAIN.
+    """
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield queries
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def full_table_scans(queries) -> list[tuple[str, str]]:
+    """
+    أسطر خطط التنفيذ التي تمسح جدولًا ساخنًا بالكامل، مع الاستعلام الخاص بكل منها.
+    """
+    # نسخة من القائمة، لأن استعلامات EXPLAIN نفسها تُلتقط أيضًا
+    queries = list(queries)
+    scans = []
+    async with engine.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in queries:
+            if statement.lstrip().upper().startswith("INSERT"):
+                continue
+            if postgres:
+                result = await conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+                lines = [row[0] for row in result.all()]
+                pattern = POSTGRES_FULL_SCAN
+            else:
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+                lines = [row[-1] for row in result.all()]
+                pattern = SQLITE_FULL_SCAN
+            scans.extend((line, statement) for line in lines if pattern.search(line))
+        await conn.rollback()
+    return scans
+
+
+@pytest.mark.parametrize(
+    "request_path",
+    ["me", "refresh", "login", "change_password", "deactivate_account"],
+)
+async def test_hot_queries_use_indexes(auth_requests, sql_queries, monkeypatch, request_path):
+    # بدون الذاكرة المؤقتة حتى يصل /me إلى قاعدة البيانات
+    monkeypatch.setattr(verified_token_cache, "enabled", False)
+    sql_queries.clear()
+
+    response = await auth_requests[request_path]()
+
+    assert response.status_code == 200, response.text
+    assert sql_queries
+    assert await full_table_scans(sql_queries) == []
+
+
+async def test_token_reaper_queries_use_indexes(client, tokens, sql_queries):
+    sql_queries.clear()
+
+    await TokenReaper().run_once()
+
+    assert sql_queries
+    assert await full_table_scans(sql_queries) == []
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import event
+from project.core import engine
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def pool_checkouts() -> list:
+    """
+    عدد مرات حجز اتصال من مجمع اتصالات قاعدة البيانات أثناء الاختبار.
+    """
+    checkouts = []
+
+    def on_checkout(dbapi_connection, record, proxy):
+        checkouts.append(record)
+
+    event.listen(engine.sync_engine, "checkout", on_checkout)
+    yield checkouts
+    event.remove(engine.sync_engine, "checkout", on_checkout)
+
+
+async def test_rejected_requests_do_not_touch_the_database(client, user, pool_checkouts):
+    credentials = {"username": user["username"], "password": "wrong-password"}
+
+    # استهلاك الحد المسموح لمسار تسجيل الدخول ("10/minute")
+    for _ in range(10):
+        response = await client.post("/api/auth/login", json=credentials)
+        assert response.status_code != 429, response.text
+    assert pool_checkouts, "الطلبات المسموحة تستخدم قاعدة البيانات"
+
+    # الطلبات الزائدة تُرفض في الوسيط قبل فتح جلسة قاعدة البيانات
+    pool_checkouts.clear()
+    for _ in range(100):
+        response = await client.post("/api/auth/login", json=credentials)
+        assert response.status_code == 429, response.text
+
+    assert pool_checkouts == []
@@ -0,0 +1,129 @@
+from itertools import cycle
+from uuid import uuid4
+import pytest
+from sqlalchemy import Column, Integer, String, func, insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
+import project.core.database as database_module
+from project.core import get_redis, settings
+from project.core.database import ReadSessionLocal, use_primary
+from project.services.token_key_format import user_recent_write_key
+from project.services.user_cache import bump_user_cache_version, has_recent_write
+
+pytestmark = pytest.mark.anyio
+
+
+# كل قاعدة بيانات تحتوي على صف يحمل اسمها، فيكشف أي SELECT عن المحرك الذي أجاب عليه.
+
+ProbeBase = declarative_base()
+
+
+class Probe(ProbeBase):
+    __tablename__ = "probe"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+@pytest.fixture
+async def engines(monkeypatch, tmp_path):
+    """
+    قاعدة بيانات أساسية ونسختان متماثلتان (ملفات SQLite منفصلة) تستخدمها RoutingSession.
+    """
+    created = {
+        name: create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/{name}.sqlite")
+        for name in ("primary", "replica0", "replica1")
+    }
+    for name, async_engine in created.items():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(ProbeBase.metadata.create_all)
+            await conn.execute(insert(Probe).values(name=name))
+
+    replicas = [created["replica0"], created["replica1"]]
+    monkeypatch.setattr(database_module, "engine", created["primary"])
+    monkeypatch.setattr(database_module, "replica_engines", replicas)
+    monkeypatch.setattr(database_module, "_replica_cycle", cycle(replicas))
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", ["replica0", "replica1"])
+    try:
+        yield created
+    finally:
+        for async_engine in created.values():
+            await async_engine.dispose()
+
+
+async def answered_by(db) -> str:
+    return (await db.execute(select(Probe.name).order_by(Probe.id))).scalars().first()
+
+
+async def names(async_engine) -> list[str]:
+    async with async_engine.connect() as conn:
+        return list((await conn.execute(select(Probe.name).order_by(Probe.id))).scalars())
+
+
+async def test_selects_rotate_across_replicas(engines):
+    async with ReadSessionLocal() as db:
+        answers = [await answered_by(db) for _ in range(4)]
+
+    assert answers == ["replica0", "replica1", "replica0", "replica1"]
+
+
+async def test_use_primary_routes_selects_to_primary(engines):
+    async with ReadSessionLocal() as db:
+        assert await answered_by(db) == "replica0"
+
+        use_primary(db)
+
+        assert [await answered_by(db) for _ in range(3)] == ["primary"] * 3
+
+
+async def test_recent_write_routes_selects_to_primary(engines):
+    redis = get_redis()
+    user_id = uuid4()
+    assert not await has_recent_write(redis, user_id)
+
+    await bump_user_cache_version(redis, user_id)
+
+    # نفس ما تفعله get_current_user_profile عند وجود كتابة حديثة
+    async with ReadSessionLocal() as db:
+        if await has_recent_write(redis, user_id):
+            use_primary(db)
+        assert await answered_by(db) == "primary"
+
+
+async def test_recent_write_marker_expires_with_the_sticky_window(engines):
+    redis = get_redis()
+    user_id = uuid4()
+
+    await bump_user_cache_version(redis, user_id)
+
+    ttl = await redis.ttl(user_recent_write_key(str(user_id)))
+    assert 0 < ttl <= settings.REPLICA_STICKY_SECONDS
+
+
+async def test_flushes_and_dml_always_hit_the_primary(engines):
+    async with ReadSessionLocal() as db:
+        db.add(Probe(name="flushed"))
+        await db.flush()
+        await db.execute(insert(Probe).values(name="inserted"))
+        await db.execute(
+            update(Probe).where(Probe.name == "inserted").values(name="updated")
+        )
+        # SELECT بعد الكتابة يبقى على النسخ المتماثلة إلا إذا طُلب غير ذلك
+        assert await answered_by(db) == "replica0"
+        await db.commit()
+
+    assert await names(engines["primary"]) == ["primary", "flushed", "updated"]
+    assert await names(engines["replica0"]) == ["replica0"]
+    assert await names(engines["replica1"]) == ["replica1"]
+
+
+async def test_autoflush_before_a_select_hits_the_primary(engines):
+    async with ReadSessionLocal() as db:
+        db.add(Probe(name="pending"))
+        # الـ autoflush يسبق الاستعلام ويذهب إلى الأساسية، والاستعلام نفسه إلى نسخة متماثلة
+        count = (await db.execute(select(func.count()).select_from(Probe))).scalar()
+        await db.commit()
+
+    assert count == 1
+    assert await names(engines["primary"]) == ["primary", "pending"]
+    assert await names(engines["replica0"]) == ["replica0"]
@@ -0,0 +1,23 @@
+import pytest
+from project.core import get_redis, hash_refresh_token
+from project.services.process_refresh import refresh_result_key
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_repeated_refresh_returns_the_cached_pair_encrypted(client, tokens):
+    payload = {"refresh_token": tokens["refresh_token"]}
+    first = await client.post("/api/auth/refresh-token", json=payload)
+    second = await client.post("/api/auth/refresh-token", json=payload)
+
+    assert first.status_code == 200, first.text
+    assert second.status_code == 200, second.text
+    assert first.json()["data"] == second.json()["data"]
+
+    # الزوج الجديد لا يظهر كنص واضح في Redis
+    cached = await get_redis().get(
+        refresh_result_key(hash_refresh_token(tokens["refresh_token"]))
+    )
+    assert cached
+    assert first.json()["data"]["access_token"] not in cached
+    assert first.json()["data"]["refresh_token"] not in cached
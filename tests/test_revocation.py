@@ -0,0 +1,157 @@
+import math
+import time
+import anyio
+import pytest
+from sqlalchemy import update
+from project.core import engine, generate_token_link, get_redis, settings, verified_token_cache
+from project.models import User
+from project.services.revoke_all_tokens import revoke_all_tokens
+
+pytestmark = pytest.mark.anyio
+
+
+async def next_second() -> None:
+    # iat بالثواني الصحيحة: البدء من أول الثانية حتى يقع التوكن والإبطال في نفس الثانية
+    now = time.time()
+    await anyio.sleep(math.ceil(now) - now + 0.01)
+
+
+async def login(client, user: dict) -> dict:
+    response = await client.post(
+        "/api/auth/login",
+        json={"username": user["username"], "password": user["hashed_password"]},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def test_revoke_all_tokens_rejects_earlier_tokens(client, user, tokens, auth_headers):
+    valid_after = await revoke_all_tokens(get_redis())
+
+    # الوقت يُحفظ دون تقريب للثانية
+    assert float(await get_redis().get("revocation_epoch:global")) == valid_after
+
+    # توكن الوصول الصادر في نفس الثانية أو قبلها، ورمز التحديث الأقدم، مرفوضان
+    response = await client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == 401, response.text
+    response = await client.post(
+        "/api/auth/refresh-token", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401, response.text
+
+    # تسجيل الدخول في الثانية التالية ينتج توكنات صالحة
+    now = time.time()
+    await anyio.sleep(math.ceil(now) - now + 0.01)
+    response = await client.post(
+        "/api/auth/login",
+        json={"username": user["username"], "password": user["hashed_password"]},
+    )
+    assert response.status_code == 200, response.text
+    fresh = response.json()["data"]
+    response = await client.get(
+        "/api/auth/me", headers={"Authorization": f"Bearer {fresh['access_token']}"}
+    )
+    assert response.status_code == 200, response.text
+    response = await client.post(
+        "/api/auth/refresh-token", json={"refresh_token": fresh["refresh_token"]}
+    )
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("auth_cache", [False, True], ids=["auth-cache-off", "auth-cache-on"])
+async def test_change_password_rejects_earlier_access_tokens(
+    monkeypatch, client, user, auth_cache
+):
+    monkeypatch.setattr(verified_token_cache, "enabled", auth_cache)
+    await next_second()
+    tokens = await login(client, user)
+    # تحميل التوكن في الذاكرة المؤقتة قبل تغيير كلمة المرور
+    response = await client.get("/api/auth/me", headers=bearer(tokens))
+    assert response.status_code == 200, response.text
+
+    response = await client.put(
+        "/api/auth/change-password",
+        headers=bearer(tokens),
+        json={"old_password": user["hashed_password"], "new_password": "new-password"},
+    )
+    assert response.status_code == 200, response.text
+
+    # وقت الإبطال بكسور الثانية، فالتوكن الصادر في نفس الثانية قبل التغيير مرفوض
+    response = await client.get("/api/auth/me", headers=bearer(tokens))
+    assert response.status_code == 401, response.text
+
+
+async def test_reset_password_rejects_earlier_access_tokens(client, user):
+    await next_second()
+    tokens = await login(client, user)
+    link = generate_token_link(user["email"], "reset-password", settings.BASE_URL)
+
+    response = await client.patch(
+        "/api/auth/reset-password",
+        json={"token": link.split("token=")[1], "new_password": "new-password"},
+    )
+    assert response.status_code == 200, response.text
+
+    response = await client.get("/api/auth/me", headers=bearer(tokens))
+    assert response.status_code == 401, response.text
+
+    # تسجيل الدخول بكلمة المرور الجديدة في الثانية التالية ينتج توكنًا صالحًا
+    await next_second()
+    fresh = await login(client, {**user, "hashed_password": "new-password"})
+    response = await client.get("/api/auth/me", headers=bearer(fresh))
+    assert response.status_code == 200, response.text
+
+
+async def register(client, username: str, tenant: str | None) -> dict:
+    data = {
+        "firstName": "Test",
+        "lastName": "User",
+        "username": username,
+        "gender": True,
+        "email": f"{username}@example.com",
+        "hashed_password": f"{username}-password",
+    }
+    response = await client.post("/api/auth/register", json=data)
+    assert response.status_code == 201, response.text
+    # لا يوجد مسار لتعيين المجموعة، فتُضبط مباشرة في قاعدة البيانات قبل تسجيل الدخول
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(User).where(User.username == username).values(tenant=tenant)
+        )
+    return data
+
+
+async def test_tenant_revocation_only_rejects_that_tenants_tokens(client):
+    users = {
+        "acme": await register(client, "alice", "acme"),
+        "globex": await register(client, "bob", "globex"),
+        None: await register(client, "carol", None),
+    }
+    await next_second()
+    tokens = {tenant: await login(client, data) for tenant, data in users.items()}
+
+    await revoke_all_tokens(get_redis(), tenant="acme")
+
+    assert await get_redis().get("revocation_epoch:global") is None
+    for tenant, expected in (("acme", 401), ("globex", 200), (None, 200)):
+        response = await client.get("/api/auth/me", headers=bearer(tokens[tenant]))
+        assert response.status_code == expected, (tenant, response.text)
+        response = await client.post(
+            "/api/auth/refresh-token",
+            json={"refresh_token": tokens[tenant]["refresh_token"]},
+        )
+        assert response.status_code == expected, (tenant, response.text)
+
+    # توكنات المجموعة الصادرة بعد وقت الإبطال صالحة
+    await next_second()
+    fresh = await login(client, users["acme"])
+    response = await client.get("/api/auth/me", headers=bearer(fresh))
+    assert response.status_code == 200, response.text
+    response = await client.post(
+        "/api/auth/refresh-token", json={"refresh_token": fresh["refresh_token"]}
+    )
+    assert response.status_code == 200, response.text
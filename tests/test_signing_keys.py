@@ -0,0 +1,210 @@
+from uuid import uuid4
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from project.core import (
+    TokenExpiredException,
+    get_jwks,
+    get_jwt_backend,
+    issue_token,
+    load_signing_keys,
+    parse_token,
+    settings,
+)
+
+
+# ==============================
+# تدوير مفاتيح التوقيع
+# ==============================
+
+# كل اختبار يكتب مفاتيحه في ملفات PEM ويضبط الإعدادات كما تُضبط في التشغيل الفعلي،
+# ثم يمسح الذاكرة المؤقتة للمفاتيح والمكتبة حتى تُقرأ الإعدادات الجديدة.
+
+# python-jose لا يدعم EdDSA
+CASES = [("jose", "ES256"), ("pyjwt", "ES256"), ("pyjwt", "EdDSA")]
+
+# معاملات المفتاح الخاص في JWK (EC و OKP و oct)
+PRIVATE_JWK_MEMBERS = {"d", "p", "q", "dp", "dq", "qi", "k"}
+
+
+def _generate_pem(algorithm: str) -> str:
+    if algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def _clear_caches() -> None:
+    get_jwt_backend.cache_clear()
+    load_signing_keys.cache_clear()
+    get_jwks.cache_clear()
+
+
+@pytest.fixture(params=CASES, ids=lambda case: f"{case[0]}-{case[1]}")
+def keyring(request, monkeypatch, tmp_path):
+    """
+    ضبط مفاتيح التوقيع: configure(active, private=[kid...], public=[kid...]).
+    """
+    backend_name, algorithm = request.param
+    monkeypatch.setattr(settings, "JWT_BACKEND", backend_name)
+    monkeypatch.setattr(settings, "JWT_KEY_ALGORITHM", algorithm)
+    monkeypatch.setattr(settings, "JWT_ACCEPT_LEGACY_TOKENS", True)
+    paths = {}
+
+    def path(kid: str) -> str:
+        if kid not in paths:
+            paths[kid] = tmp_path / f"{kid}.pem"
+            paths[kid].write_text(_generate_pem(algorithm))
+        return str(paths[kid])
+
+    def public_path(kid: str) -> str:
+        backend = get_jwt_backend()
+        private_key = backend.load_private_key(open(path(kid)).read(), algorithm)
+        public_pem = tmp_path / f"{kid}.pub.pem"
+        public_pem.write_bytes(
+            _public_pem(backend.public_key(private_key), backend_name)
+        )
+        return str(public_pem)
+
+    def configure(active, private=(), public=()) -> None:
+        _clear_caches()
+        monkeypatch.setattr(settings, "JWT_ACTIVE_KID", active)
+        monkeypatch.setattr(
+            settings, "JWT_PRIVATE_KEYS", {kid: path(kid) for kid in private}
+        )
+        monkeypatch.setattr(
+            settings, "JWT_PUBLIC_KEYS", {kid: public_path(kid) for kid in public}
+        )
+        load_signing_keys()
+
+    configure.algorithm = algorithm
+    configure.private_key = lambda kid: get_jwt_backend().load_private_key(
+        open(path(kid)).read(), algorithm
+    )
+    yield configure
+    monkeypatch.undo()
+    _clear_caches()
+
+
+def _public_pem(public_key, backend_name: str) -> bytes:
+    # python-jose يغلف مفتاح cryptography، و PyJWT يعيده كما هو
+    if backend_name == "jose":
+        return public_key.to_pem()
+    return public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def _claims() -> dict:
+    return {"sub": "alice", "uid": str(uuid4())}
+
+
+def _kid(token: str):
+    return get_jwt_backend().get_unverified_header(token).get("kid")
+
+
+def _legacy_token() -> str:
+    return get_jwt_backend().encode(
+        {**_claims(), "iat": 0}, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
+
+
+def test_token_signed_under_old_kid_verifies_after_rotation(keyring):
+    keyring(active="a", private=["a", "b"])
+    old = issue_token(_claims()).token
+    assert _kid(old) == "a"
+
+    # b يصبح النشط، و a يبقى للتحقق فقط حتى تنتهي توكناته
+    keyring(active="b", private=["b"], public=["a"])
+    new = issue_token(_claims()).token
+
+    assert _kid(new) == "b"
+    assert parse_token(old).subject == "alice"
+    assert parse_token(new).subject == "alice"
+
+
+def test_token_is_rejected_once_its_kid_is_retired(keyring):
+    keyring(active="a", private=["a"])
+    old = issue_token(_claims()).token
+
+    keyring(active="b", private=["b"])
+
+    with pytest.raises(TokenExpiredException):
+        parse_token(old)
+
+
+def test_unknown_kid_is_rejected(keyring):
+    keyring(active="a", private=["a", "c"])
+    token = issue_token(_claims()).token
+    forged = get_jwt_backend().encode(
+        _claims(), keyring.private_key("c"), keyring.algorithm, headers={"kid": "z"}
+    )
+
+    keyring(active="a", private=["a"])
+
+    assert parse_token(token).subject == "alice"
+    with pytest.raises(TokenExpiredException):
+        parse_token(forged)
+
+
+def test_token_signed_with_another_key_under_a_known_kid_is_rejected(keyring):
+    keyring(active="a", private=["a", "b"])
+    forged = get_jwt_backend().encode(
+        _claims(), keyring.private_key("b"), keyring.algorithm, headers={"kid": "a"}
+    )
+
+    with pytest.raises(TokenExpiredException):
+        parse_token(forged)
+
+
+def test_asymmetric_token_without_kid_is_rejected(keyring):
+    keyring(active="a", private=["a"])
+    token = get_jwt_backend().encode(
+        _claims(), keyring.private_key("a"), keyring.algorithm
+    )
+
+    # بدون kid يُعامل كتوكن قديم بالسر المشترك، فلا يُقبل توقيعه غير المتماثل
+    with pytest.raises(TokenExpiredException):
+        parse_token(token)
+
+
+def test_legacy_hs256_token_is_accepted_only_on_the_legacy_path(keyring, monkeypatch):
+    keyring(active="a", private=["a"])
+    token = _legacy_token()
+
+    assert parse_token(token).subject == "alice"
+
+    monkeypatch.setattr(settings, "JWT_ACCEPT_LEGACY_TOKENS", False)
+    with pytest.raises(TokenExpiredException):
+        parse_token(token)
+
+
+def test_hs256_token_claiming_an_asymmetric_kid_is_rejected(keyring):
+    keyring(active="a", private=["a"])
+    # الخوارزمية المسموحة تأتي من المفتاح وليس من ترويسة التوكن
+    token = get_jwt_backend().encode(
+        _claims(), settings.SECRET_KEY, algorithm="HS256", headers={"kid": "a"}
+    )
+
+    with pytest.raises(TokenExpiredException):
+        parse_token(token)
+
+
+@pytest.mark.anyio
+async def test_jwks_publishes_public_keys_only(keyring, client):
+    keyring(active="b", private=["b"], public=["a"])
+
+    response = await client.get("/.well-known/jwks.json")
+
+    assert response.status_code == 200
+    keys = response.json()["keys"]
+    assert sorted(key["kid"] for key in keys) == ["a", "b"]
+    for key in keys:
+        assert key["use"] == "sig"
+        assert key["alg"] == keyring.algorithm
+        assert not PRIVATE_JWK_MEMBERS & key.keys()
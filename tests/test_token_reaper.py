@@ -0,0 +1,41 @@
+import importlib
+import pytest
+from project.services import TokenReaper
+
+pytestmark = pytest.mark.anyio
+
+# الاسم token_reaper في project.services يشير إلى نسخة المهمة وليس إلى الوحدة
+reaper_module = importlib.import_module("project.services.token_reaper")
+
+
+@pytest.fixture
+def partition_calls(monkeypatch) -> list:
+    """
+    استدعاءات إنشاء أقسام جدول التوكنات، وكل استدعاء يفشل.
+    """
+    calls = []
+
+    async def failing_ensure_token_partitions():
+        calls.append(True)
+        raise RuntimeError("DDL failed")
+
+    monkeypatch.setattr(
+        reaper_module, "ensure_token_partitions", failing_ensure_token_partitions
+    )
+    return calls
+
+
+async def test_start_runs_no_ddl(client, partition_calls, monkeypatch):
+    monkeypatch.setattr(reaper_module.settings, "TOKEN_REAPER_ENABLED", True)
+    reaper = TokenReaper()
+    await reaper.start()
+    await reaper.stop()
+
+    assert partition_calls == []
+
+
+async def test_partition_failure_does_not_stop_the_purge(client, partition_calls):
+    deleted = await TokenReaper().run_once()
+
+    assert partition_calls == [True]
+    assert deleted == 0
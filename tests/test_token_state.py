@@ -0,0 +1,173 @@
+from uuid import uuid4
+import pytest
+from redis.asyncio.connection import AbstractConnection
+from project.core import get_redis, issue_token, parse_token, settings
+from project.services.token_state import (
+    TOKEN_ACTIVE,
+    TOKEN_BLACKLISTED,
+    get_token_state,
+    get_token_states,
+    logout_token,
+    store_active_token,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+# كل عملية على حالة التوكن يجب أن تكون ذهابًا وإيابًا واحدًا إلى Redis (أو بلا طلبات).
+# يُحسب عدد الطلبات المرسلة فعليًا عبر الاتصال (pipeline أو سكربت = طلب واحد).
+# جميع الاختبارات تُشغّل في كل أوضاع SESSION_STRATEGY.
+
+STRATEGIES = ("hybrid", "allowlist", "denylist")
+
+# حالة مفتاح التوكن في Redis لكل وضع: بعد تسجيل الدخول، وبعد تسجيل الخروج
+STORED_STATUS = {"hybrid": TOKEN_ACTIVE, "allowlist": TOKEN_ACTIVE, "denylist": None}
+LOGGED_OUT_STATUS = {
+    "hybrid": TOKEN_BLACKLISTED,
+    "allowlist": None,
+    "denylist": TOKEN_BLACKLISTED,
+}
+
+
+@pytest.fixture(params=STRATEGIES)
+def strategy(request, monkeypatch) -> str:
+    monkeypatch.setattr(settings, "SESSION_STRATEGY", request.param)
+    return request.param
+
+
+@pytest.fixture
+def round_trips(monkeypatch) -> list:
+    sent = []
+    original = AbstractConnection.send_packed_command
+
+    async def send_packed_command(self, command, check_health=True):
+        sent.append(command)
+        return await original(self, command, check_health)
+
+    monkeypatch.setattr(AbstractConnection, "send_packed_command", send_packed_command)
+    return sent
+
+
+@pytest.fixture
+async def redis(strategy):
+    client = get_redis()
+    # إنشاء الاتصال مسبقًا حتى لا تُحتسب أوامر تهيئته
+    await client.ping()
+    # تحميل السكربتات مسبقًا: في التشغيل الفعلي تُحمّل مرة واحدة ثم تُستدعى عبر EVALSHA
+    warm_up = access_token()
+    await store_active_token(client, warm_up)
+    await logout_token(client, warm_up)
+    return client
+
+
+def access_token(username: str = "alice"):
+    return issue_token({"sub": username, "uid": str(uuid4())})
+
+
+async def test_store_active_token_is_one_round_trip(strategy, redis, round_trips):
+    context = access_token()
+    round_trips.clear()
+
+    assert await store_active_token(redis, context)
+
+    # في وضع denylist لا كتابة عند تسجيل الدخول
+    assert len(round_trips) == (0 if strategy == "denylist" else 1)
+    state = await get_token_state(redis, context)
+    assert state.status == STORED_STATUS[strategy]
+    assert state.is_active
+
+
+async def test_get_token_state_is_one_round_trip(redis, round_trips):
+    context = access_token()
+    await store_active_token(redis, context)
+    round_trips.clear()
+
+    state = await get_token_state(redis, context)
+
+    assert len(round_trips) == 1
+    assert state.is_active
+    assert state.valid_after is None
+
+
+async def test_get_token_states_is_one_round_trip_for_a_batch(strategy, redis, round_trips):
+    contexts = [access_token(f"user{index}") for index in range(10)]
+    for context in contexts[::2]:
+        await store_active_token(redis, context)
+    for context in contexts[1::4]:
+        await logout_token(redis, context)
+    round_trips.clear()
+
+    states = await get_token_states(redis, contexts)
+
+    assert len(round_trips) == 1
+    # التوكنات غير المخزنة صالحة في وضع denylist فقط، والمسجل خروجها مرفوضة دائمًا
+    expected = [
+        index % 2 == 0 or (strategy == "denylist" and index % 4 != 1)
+        for index in range(10)
+    ]
+    assert [state.is_active for state in states] == expected
+
+
+async def test_logout_token_is_one_round_trip(strategy, redis, round_trips):
+    context = access_token()
+    await store_active_token(redis, context)
+    round_trips.clear()
+
+    assert await logout_token(redis, context)
+
+    assert len(round_trips) == 1
+    state = await get_token_state(redis, context)
+    assert state.status == LOGGED_OUT_STATUS[strategy]
+    assert not state.is_active
+
+
+async def test_logout_command_per_strategy(strategy, redis, round_trips):
+    context = access_token()
+    await store_active_token(redis, context)
+    round_trips.clear()
+
+    await logout_token(redis, context)
+
+    command = b"".join(
+        part if isinstance(part, bytes) else bytes(part) for part in round_trips[0]
+    ).upper()
+    if strategy == "denylist":
+        # مفتاح الحظر فقط، بدون قراءة، ولا يُكتب فوق حظر سابق
+        assert b"SET" in command and b"NX" in command
+        assert b"EVALSHA" not in command
+    else:
+        # allowlist: حذف المفتاح، hybrid: استبداله بالحظر، ذريًا داخل سكربت Lua
+        assert b"EVALSHA" in command
+
+
+async def test_logout_token_twice_is_rejected_in_one_round_trip(redis, round_trips):
+    context = access_token()
+    await store_active_token(redis, context)
+    await logout_token(redis, context)
+    round_trips.clear()
+
+    assert not await logout_token(redis, context)
+
+    assert len(round_trips) == 1
+
+
+# ==============================
+# مسارات HTTP في كل وضع
+# ==============================
+
+
+async def test_login_writes_a_session_key_except_in_denylist(strategy, tokens):
+    context = parse_token(tokens["access_token"])
+
+    assert (await get_token_state(get_redis(), context)).status == STORED_STATUS[strategy]
+
+
+async def test_me_rejects_a_logged_out_token(strategy, client, tokens, auth_headers):
+    context = parse_token(tokens["access_token"])
+
+    response = await client.post("/api/auth/logout", headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+    assert (await get_token_state(get_redis(), context)).status == LOGGED_OUT_STATUS[strategy]
+    response = await client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == 401, response.text
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import uuid4
+import pytest
+from project.core import get_redis, settings
+from project.models import AuthPrincipal
+from project.services import user_cache
+from project.services.user_cache import (
+    _fill,
+    bump_user_cache_version,
+    get_cached_principal,
+    user_cache_lock_key,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+# الذاكرة المؤقتة يجب أن تحمّل المستخدم من قاعدة البيانات مرة واحدة فقط لكل إصدار،
+# مهما كان عدد الطلبات المتزامنة داخل العامل الواحد أو بين العمال.
+
+
+@pytest.fixture
+def principal() -> AuthPrincipal:
+    return AuthPrincipal(
+        id=uuid4(),
+        username="alice",
+        isActive=True,
+        last_password_change=datetime.now(timezone.utc),
+    )
+
+
+@pytest.fixture
+def loader(principal):
+    """
+    محمّل وهمي بدل قاعدة البيانات يحسب عدد مرات استدعائه.
+    """
+
+    async def load() -> AuthPrincipal:
+        load.calls += 1
+        await asyncio.sleep(0.05)
+        return principal
+
+    load.calls = 0
+    return load
+
+
+async def test_second_read_is_served_from_the_cache(principal, loader):
+    redis = get_redis()
+    user_id = str(principal.id)
+
+    first = await get_cached_principal(redis, user_id, loader)
+    second = await get_cached_principal(redis, user_id, loader)
+
+    assert loader.calls == 1
+    assert first == second == principal
+
+
+async def test_version_bump_makes_the_next_read_miss(principal, loader):
+    redis = get_redis()
+    user_id = str(principal.id)
+    await get_cached_principal(redis, user_id, loader)
+
+    await bump_user_cache_version(redis, principal.id)
+    await get_cached_principal(redis, user_id, loader)
+
+    assert loader.calls == 2
+    # العنصر الجديد مبني على الإصدار الجديد فيُقرأ من الذاكرة المؤقتة
+    await get_cached_principal(redis, user_id, loader)
+    assert loader.calls == 2
+
+
+async def test_entry_written_before_a_bump_is_ignored(principal, loader):
+    redis = get_redis()
+    user_id = str(principal.id)
+    # عنصر قديم كُتب بعد الكتابة على المستخدم (سباق القراءة/الكتابة)
+    await _fill(redis, user_id, 0, loader)
+    await redis.incr(user_cache.user_cache_version_key(user_id))
+
+    await get_cached_principal(redis, user_id, loader)
+
+    assert loader.calls == 2
+
+
+async def test_concurrent_misses_on_one_worker_load_once(principal, loader):
+    redis = get_redis()
+
+    results = await asyncio.gather(
+        *(get_cached_principal(redis, str(principal.id), loader) for _ in range(20))
+    )
+
+    assert loader.calls == 1
+    assert all(result == principal for result in results)
+    assert not user_cache._in_flight
+
+
+async def test_concurrent_misses_across_workers_load_once(principal, loader):
+    redis = get_redis()
+    user_id = str(principal.id)
+
+    # _fill مباشرة يتجاوز _in_flight الخاص بالعامل، فيمثل كل استدعاء عاملًا مستقلًا
+    results = await asyncio.gather(*(_fill(redis, user_id, 0, loader) for _ in range(5)))
+
+    assert loader.calls == 1
+    assert all(result == principal for result in results)
+    assert not await redis.exists(user_cache_lock_key(user_id))
+
+
+async def test_lock_timeout_falls_back_to_the_database(monkeypatch, principal, loader):
+    monkeypatch.setattr(settings, "USER_CACHE_LOCK_MILLISECONDS", 100)
+    redis = get_redis()
+    user_id = str(principal.id)
+    # عامل آخر يحمل القفل ولا يكتب النتيجة أبدًا
+    await redis.set(user_cache_lock_key(user_id), 1)
+
+    result = await get_cached_principal(redis, user_id, loader)
+
+    assert loader.calls == 1
+    assert result == principal
+    # القفل ملك العامل الآخر فلا يُحذف
+    assert await redis.exists(user_cache_lock_key(user_id))
+
+
+async def test_loader_failure_is_shared_and_not_cached(principal):
+    redis = get_redis()
+    calls = 0
+
+    async def failing_loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("database unavailable")
+
+    results = await asyncio.gather(
+        *(get_cached_principal(redis, str(principal.id), failing_loader) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert not user_cache._in_flight
+    assert not await redis.exists(user_cache_lock_key(str(principal.id)))